@@ -2,6 +2,12 @@
 ASGI config for currency_exchange_tracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served by an ASGI server, e.g.
+``uvicorn currency_exchange_tracker.asgi:application``, the asynchronous
+endpoint /api/v1/async/currency-converter/ awaits the database and provider
+calls in the event loop of the worker. The lifespan events are answered
+here, Django does not handle them, to close the pooled provider session at
+the shutdown of the server.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -15,4 +21,17 @@ os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE", "currency_exchange_tracker.settings"
 )
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """Serve the HTTP requests with Django and the lifespan events of the server."""
+    if scope["type"] == "lifespan":
+        # imported once the apps are loaded by get_asgi_application
+        from mycurrency_exchange_rates.services.providers_service.http_session import (
+            handle_lifespan,
+        )
+
+        await handle_lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
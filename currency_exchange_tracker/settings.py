@@ -198,3 +198,84 @@ CACHES = {
         },
     }
 }
+
+
+# Configuration of the currency converter endpoints
+CONVERTER_CACHE_TIMEOUT = 60 * 30
+CONVERTER_BATCH_MAX_SIZE = 1000
+CONVERTER_TIME_SERIES_MAX_DAYS = 366
+CONVERTER_DERIVED_RATES_ENABLED = True
+
+# Configuration of the in-process rate cache in front of the database
+RATE_CACHE_MAX_SIZE = 100000
+RATE_CACHE_TTL = 60 * 30
+# Seconds between two checks of the shared version of the rate cache, bumped
+# when a stored rate is updated
+RATE_CACHE_CHECK_INTERVAL = 5
+
+# Configuration of the coalescing of the concurrent provider fetches
+SINGLE_FLIGHT_TIMEOUT = 30
+SINGLE_FLIGHT_LOCK_TIMEOUT = 60
+
+# Configuration of the pooled HTTP sessions of the providers
+PROVIDER_HTTP_POOL_LIMIT = 100
+PROVIDER_HTTP_POOL_LIMIT_PER_HOST = 20
+PROVIDER_HTTP_KEEPALIVE_TIMEOUT = 60
+PROVIDER_HTTP_TIMEOUT = 30
+PROVIDER_HTTP_CONNECT_TIMEOUT = 10
+# the seconds a synchronous worker waits for a provider call, its retries
+# included, before the call is cancelled
+PROVIDER_HTTP_CALL_TIMEOUT = 60
+
+# Base url of the currency beacon api, e.g. http://127.0.0.1:8010/v1 to use
+# the local stand-in server of the command run_currency_beacon_stub
+CURRENCY_BEACON_BASE_URL = os.getenv(
+    "CURRENCY_BEACON_BASE_URL", "https://api.currencybeacon.com/v1"
+)
+
+# Circuit breakers of the providers, their state is shared by the workers
+# through the Redis instance of the default cache, reached at the first
+# provider call and again every retry interval while it is down
+PROVIDER_CIRCUIT_BREAKER_SHARED = True
+PROVIDER_CIRCUIT_BREAKER_RETRY_INTERVAL = 30
+PROVIDER_CIRCUIT_BREAKER_FAIL_MAX = 5
+PROVIDER_CIRCUIT_BREAKER_RESET_TIMEOUT = 120
+
+# Hedged provider calls: when the active provider is slower than its
+# PROVIDER_HEDGING_PERCENTILE latency, the provider of next priority is
+# called too and the first ok answer is kept, the pool of workers runs the
+# provider calls of the synchronous views
+PROVIDER_HEDGING_ENABLED = False
+PROVIDER_HEDGING_PERCENTILE = 95
+PROVIDER_HEDGING_WINDOW_SIZE = 200
+PROVIDER_HEDGING_MIN_SAMPLES = 20
+PROVIDER_HEDGING_MIN_DELAY = 0.05
+PROVIDER_HEDGING_MAX_DELAY = 2.0
+PROVIDER_HEDGING_MAX_WORKERS = 16
+
+# Mock provider: deterministic rates seeded per currency and date, and the
+# latency (seconds) and failure rate injected in its calls, e.g. for load tests
+MOCK_PROVIDER_DETERMINISTIC = False
+MOCK_PROVIDER_SEED = 0
+MOCK_PROVIDER_LATENCY = 0
+MOCK_PROVIDER_LATENCY_JITTER = 0
+MOCK_PROVIDER_FAILURE_RATE = 0
+
+# Request all the known currencies of a base and a date on a provider miss
+PROVIDER_PREFETCH_ALL_SYMBOLS = True
+
+# Seconds between two checks of the shared version of the currency registry
+CURRENCY_REGISTRY_CHECK_INTERVAL = 5
+
+# Seconds between two checks of the shared version of the provider registry
+PROVIDER_REGISTRY_CHECK_INTERVAL = 5
+
+# Number of rates written by statement in the bulk stores
+EXCHANGE_RATES_BATCH_SIZE = 1000
+
+# Configuration of the historical bulk imports
+BULK_IMPORT_CHUNK_DAYS = 180
+BULK_IMPORT_CONCURRENCY = 4
+BULK_IMPORT_RETRIES = 5
+SYNC_EXCHANGE_RATES_DAYS = 7
+BULK_IMPORT_STREAM_CHUNK_SIZE = 64 * 1024
@@ -2,11 +2,17 @@
 
 from django.contrib import admin
 
-from .models import Currency, CurrencyExchangeRate, ExchangeRateProvider
+from .models import (
+    Currency,
+    CurrencyExchangeRate,
+    ExchangeRateProvider,
+    ImportCheckpoint,
+)
 
 admin.site.register(ExchangeRateProvider)
 admin.site.register(Currency)
 admin.site.register(CurrencyExchangeRate)
+admin.site.register(ImportCheckpoint)
 
 admin.site.site_header = "Back office for My Currency App"
 admin.site.site_title = "My Currency App web admin"
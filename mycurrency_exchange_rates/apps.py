@@ -9,3 +9,7 @@ class MycurrencyExchangeRatesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mycurrency_exchange_rates"
     verbose_name = "My Currency App"
+
+    def ready(self):
+        """Connect the receivers of the signals sent by the models."""
+        from . import signals  # noqa: F401
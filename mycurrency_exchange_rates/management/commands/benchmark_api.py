@@ -0,0 +1,521 @@
+"""Benchmark the currency converter and currency endpoints under realistic workloads."""
+
+import contextlib
+import json
+import random
+import statistics
+import time
+import uuid
+from concurrent import futures
+
+import arrow
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from mycurrency_exchange_rates.models import (
+    CurrencyExchangeRate,
+    ExchangeRateProvider,
+)
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    bulk_store_exchange_rates,
+    rate_cache,
+)
+from mycurrency_exchange_rates.services.database_managers.provider_registry import (
+    provider_registry,
+)
+from mycurrency_exchange_rates.services.providers_service.mock_provider import (
+    get_rate_value,
+)
+
+from .create_currencies import add_currencies
+
+CONVERTER_URL = "/api/v1/currency-converter/?from_currency={}&to_currency={}&valuation_date={}"
+CURRENCY_URL = "/api/v1/currency/"
+SCENARIOS = [
+    "cold-cache",
+    "warm-cache",
+    "db-only",
+    "provider-miss",
+    "currency-list",
+]
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    """Create an empty test database for the run of the benchmark, destroyed at the end.
+
+    The test database of the DATABASES setting is used, e.g. SQLite, so the
+    database of the application is never modified.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_database(stored_dates: list) -> int:
+    """Store the currencies, the mock provider and the rates of all the pairs at the stored dates.
+
+    Args:
+        stored_dates (list): the dates of the stored rates.
+
+    Returns:
+        int: the number of stored rates.
+    """
+    add_currencies()
+    ExchangeRateProvider.objects.create(
+        provider_name="mock", priority=1, active_flag=True, active_status=True
+    )
+    currencies = currency_registry.get_ids()
+    return bulk_store_exchange_rates(
+        CurrencyExchangeRate(
+            source_currency_id=currencies[from_code],
+            exchanged_currency_id=currencies[to_code],
+            valuation_date=valuation_date,
+            rate_value=get_rate_value(from_code, to_code, valuation_date),
+        )
+        for from_code, to_code in get_pairs(currencies)
+        for valuation_date in stored_dates
+    )
+
+
+def get_pairs(currency_codes) -> list:
+    """Give all the pairs of distinct currencies.
+
+    Args:
+        currency_codes (iterable): the codes of the currencies.
+
+    Returns:
+        list: the tuples (base currency code, target currency code), sorted.
+    """
+    currency_codes = sorted(currency_codes)
+    return [
+        (from_code, to_code)
+        for from_code in currency_codes
+        for to_code in currency_codes
+        if from_code != to_code
+    ]
+
+
+def get_zipf_weights(size: int, exponent: float) -> list:
+    """Give the weights of the ranks of a Zipf distribution.
+
+    Args:
+        size (int): the number of ranks.
+        exponent (float): the exponent of the distribution, the higher the hotter the first ranks.
+
+    Returns:
+        list: the weight of each rank, the first one being the heaviest.
+    """
+    return [1 / rank**exponent for rank in range(1, size + 1)]
+
+
+def get_workload(
+    pairs: list,
+    dates: list,
+    requests: int,
+    exponent: float,
+    generator: random.Random,
+) -> list:
+    """Draw the keys of the requests of a workload.
+
+    The pairs follow a Zipf distribution over a random ranking, so a few
+    pairs are hot. The dates, sorted from the most recent, follow a Zipf
+    distribution too, so the old dates form a long tail.
+
+    Args:
+        pairs (list): the pairs of currencies.
+        dates (list): the dates, from the most recent.
+        requests (int): the number of requests.
+        exponent (float): the exponent of the Zipf distributions.
+        generator (random.Random): the seeded random generator.
+
+    Returns:
+        list: tuples (base currency code, target currency code, date).
+    """
+    ranked_pairs = list(pairs)
+    generator.shuffle(ranked_pairs)
+    drawn_pairs = generator.choices(
+        ranked_pairs,
+        weights=get_zipf_weights(len(ranked_pairs), exponent),
+        k=requests,
+    )
+    drawn_dates = generator.choices(
+        dates, weights=get_zipf_weights(len(dates), exponent), k=requests
+    )
+    return [
+        (from_code, to_code, valuation_date)
+        for (from_code, to_code), valuation_date in zip(
+            drawn_pairs, drawn_dates
+        )
+    ]
+
+
+def get_converter_urls(keys: list) -> list:
+    """Give the urls of the currency converter for the keys of a workload."""
+    return [
+        CONVERTER_URL.format(from_code, to_code, valuation_date.isoformat())
+        for from_code, to_code, valuation_date in keys
+    ]
+
+
+def get_percentiles(latencies: list) -> dict:
+    """Give the p50, p95 and p99 of latencies.
+
+    Args:
+        latencies (list): the latencies in seconds.
+
+    Returns:
+        dict: the percentiles in milliseconds.
+    """
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0, 0]
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+    }
+
+
+def is_error(response) -> bool:
+    """Indicate if a response of the endpoints is an error."""
+    if response.status_code != 200:
+        return True
+    body = response.json()
+    return (
+        isinstance(body, list)
+        and bool(body)
+        and isinstance(body[0], dict)
+        and "ko" in body[0].get("status", "")
+    )
+
+
+def run_requests(urls: list, concurrency: int) -> dict:
+    """Send the requests of a workload through the whole Django stack and measure them.
+
+    Args:
+        urls (list): the urls to get.
+        concurrency (int): the number of clients sending the requests at once.
+
+    Returns:
+        dict: the number of requests and of errors, the duration in seconds, the throughput in requests per second and the latency percentiles.
+    """
+
+    def run_client(client_urls):
+        client = Client()
+        latencies = []
+        errors = 0
+        try:
+            for url in client_urls:
+                start_time = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - start_time)
+                errors += is_error(response)
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+        return latencies, errors
+
+    start_time = time.perf_counter()
+    if concurrency > 1:
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(
+                executor.map(
+                    run_client,
+                    [urls[index::concurrency] for index in range(concurrency)],
+                )
+            )
+    else:
+        results = [run_client(urls)]
+    duration = time.perf_counter() - start_time
+
+    latencies = [latency for result in results for latency in result[0]]
+    return {
+        "requests": len(latencies),
+        "errors": sum(result[1] for result in results),
+        "duration": round(duration, 6),
+        "throughput": round(len(latencies) / max(duration, 1e-9), 3),
+        **get_percentiles(latencies),
+    }
+
+
+def get_cache_settings(cache_backend: str, isolated=True) -> dict:
+    """Give the CACHES setting of a scenario.
+
+    Args:
+        cache_backend (str): configured to use the cache of the settings (Redis), locmem for a local memory cache, or dummy for no cache.
+        isolated (bool, optional): give a new key prefix, so that the cache starts empty without being flushed. Defaults to True.
+
+    Returns:
+        dict: the CACHES setting.
+    """
+    if cache_backend == "dummy":
+        default = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    elif cache_backend == "locmem":
+        default = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "benchmark",
+        }
+    else:
+        default = dict(settings.CACHES["default"])
+    if isolated:
+        default["KEY_PREFIX"] = "benchmark-{}".format(uuid.uuid4().hex)
+    return {**settings.CACHES, "default": default}
+
+
+def run_scenario(
+    scenario: str,
+    workload_urls: list,
+    miss_urls: list,
+    cache_backend: str,
+    concurrency: int,
+) -> dict:
+    """Run a scenario of the benchmark.
+
+    - cold-cache: the workload with empty caches, the stored rates are read from the database.
+    - warm-cache: the workload once all its conversions are cached.
+    - db-only: the workload without any cache, every request reads the database.
+    - provider-miss: requests of distinct rates not stored, without prefetch nor derived rates, so each one calls the mock provider. The number of provider calls is reported.
+    - currency-list: the list of the currencies.
+
+    Args:
+        scenario (str): one of SCENARIOS.
+        workload_urls (list): the urls of the Zipf workload of stored rates.
+        miss_urls (list): the urls of distinct rates not stored.
+        cache_backend (str): configured, locmem or dummy, see get_cache_settings.
+        concurrency (int): the number of clients sending the requests at once.
+
+    Returns:
+        dict: the measures of run_requests, with the provider calls of the provider-miss scenario.
+    """
+    rate_cache.clear()
+    if scenario == "db-only":
+        rate_cache_max_size = rate_cache.max_size
+        rate_cache.max_size = 0
+        try:
+            with override_settings(CACHES=get_cache_settings("dummy")):
+                return run_requests(workload_urls, concurrency)
+        finally:
+            rate_cache.max_size = rate_cache_max_size
+
+    with override_settings(CACHES=get_cache_settings(cache_backend)):
+        if scenario == "warm-cache":
+            run_requests(list(dict.fromkeys(workload_urls)), concurrency)
+        if scenario == "provider-miss":
+            stored_rates = CurrencyExchangeRate.objects.count()
+            with override_settings(
+                PROVIDER_PREFETCH_ALL_SYMBOLS=False,
+                CONVERTER_DERIVED_RATES_ENABLED=False,
+            ):
+                measures = run_requests(miss_urls, concurrency)
+            # without prefetch, each provider call stores its requested rate
+            measures["provider_calls"] = (
+                CurrencyExchangeRate.objects.count() - stored_rates
+            )
+            return measures
+        if scenario == "currency-list":
+            return run_requests(
+                [CURRENCY_URL] * len(workload_urls), concurrency
+            )
+        return run_requests(workload_urls, concurrency)
+
+
+def run_benchmark(
+    scenarios: list = None,
+    requests: int = 1000,
+    stored_days: int = 365,
+    exponent: float = 1.1,
+    concurrency: int = 1,
+    cache_backend: str = "configured",
+    seed: int = 0,
+) -> dict:
+    """Run the scenarios of the benchmark on a test database seeded with the rates of the mock provider.
+
+    Args:
+        scenarios (list, optional): the scenarios to run. Defaults to all the SCENARIOS.
+        requests (int, optional): the number of requests per scenario. Defaults to 1000.
+        stored_days (int, optional): the number of days of stored rates, until yesterday. Defaults to 365.
+        exponent (float, optional): the exponent of the Zipf distributions of the pairs and the dates. Defaults to 1.1.
+        concurrency (int, optional): the number of clients sending the requests at once. Defaults to 1.
+        cache_backend (str, optional): configured (the cache of the settings, e.g. Redis) or locmem. Defaults to configured.
+        seed (int, optional): the seed of the workloads. Defaults to 0.
+
+    Returns:
+        dict: the parameters of the run and the measures of each scenario.
+    """
+    scenarios = scenarios or SCENARIOS
+    yesterday = arrow.utcnow().floor("day").shift(days=-1)
+    stored_dates = [
+        yesterday.shift(days=-day).date() for day in range(stored_days)
+    ]
+    # the dates of the provider misses are older than the stored ones
+    miss_dates = [
+        yesterday.shift(days=-stored_days - day).date()
+        for day in range(stored_days)
+    ]
+
+    report = {
+        "parameters": {
+            "requests": requests,
+            "stored_days": stored_days,
+            "zipf_exponent": exponent,
+            "concurrency": concurrency,
+            "cache": cache_backend,
+            "seed": seed,
+            "database": settings.DATABASES["default"]["ENGINE"],
+        },
+        "scenarios": {},
+    }
+    with override_settings(
+        MOCK_PROVIDER_DETERMINISTIC=True,
+        MOCK_PROVIDER_LATENCY=0,
+        MOCK_PROVIDER_LATENCY_JITTER=0,
+        MOCK_PROVIDER_FAILURE_RATE=0,
+    ), benchmark_database():
+        currency_registry.clear()
+        provider_registry.clear()
+        report["parameters"]["stored_rates"] = seed_database(stored_dates)
+
+        generator = random.Random(seed)
+        pairs = get_pairs(currency_registry.get_ids())
+        workload_urls = get_converter_urls(
+            get_workload(pairs, stored_dates, requests, exponent, generator)
+        )
+        miss_keys = [
+            (from_code, to_code, valuation_date)
+            for valuation_date in miss_dates
+            for from_code, to_code in pairs
+        ]
+        generator.shuffle(miss_keys)
+        miss_urls = get_converter_urls(miss_keys[:requests])
+
+        for scenario in scenarios:
+            report["scenarios"][scenario] = run_scenario(
+                scenario, workload_urls, miss_urls, cache_backend, concurrency
+            )
+        currency_registry.clear()
+        provider_registry.clear()
+    rate_cache.clear()
+    return report
+
+
+class Command(BaseCommand):
+    """Provide a CLI option for manage.py to benchmark the currency converter and currency endpoints."""
+
+    help = (
+        "Benchmark the converter and currency endpoints on a test database"
+        " with the mock provider, and write the throughput and latency"
+        " percentiles of each scenario to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument(
+            "--scenarios",
+            type=lambda value: [
+                scenario.strip() for scenario in value.split(",") if scenario
+            ],
+            default=SCENARIOS,
+            help="Comma separated scenarios among {}.".format(
+                ", ".join(SCENARIOS)
+            ),
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of requests per scenario.",
+        )
+        parser.add_argument(
+            "--stored-days",
+            type=int,
+            default=365,
+            help="Number of days of stored rates, until yesterday.",
+        )
+        parser.add_argument(
+            "--zipf-exponent",
+            type=float,
+            default=1.1,
+            help="Exponent of the Zipf distributions of the pairs and dates.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of clients sending requests at once.",
+        )
+        parser.add_argument(
+            "--cache",
+            choices=["configured", "locmem"],
+            default="configured",
+            help="Cache of the scenarios: the one of the settings (Redis) or a local memory one.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            default="benchmark-api.json",
+            help="Path of the JSON report.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the manage py command."""
+        for option in ["requests", "stored_days", "concurrency"]:
+            if options[option] < 1:
+                raise CommandError(
+                    "The option {} must be positive !".format(option)
+                )
+        unknown_scenarios = set(options["scenarios"]) - set(SCENARIOS)
+        if unknown_scenarios:
+            raise CommandError(
+                "The scenarios {} are unknown !".format(
+                    ", ".join(sorted(unknown_scenarios))
+                )
+            )
+
+        report = run_benchmark(
+            scenarios=options["scenarios"],
+            requests=options["requests"],
+            stored_days=options["stored_days"],
+            exponent=options["zipf_exponent"],
+            concurrency=options["concurrency"],
+            cache_backend=options["cache"],
+            seed=options["seed"],
+        )
+        with open(options["output"], "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+        for scenario, measures in report["scenarios"].items():
+            self.stdout.write(
+                "{:<14} {:>9.1f} req/s  p50 {:>8.3f} ms  p95 {:>8.3f} ms"
+                "  p99 {:>8.3f} ms  {} errors".format(
+                    scenario,
+                    measures["throughput"],
+                    measures["p50_ms"],
+                    measures["p95_ms"],
+                    measures["p99_ms"],
+                    measures["errors"],
+                )
+            )
+            if "provider_calls" in measures:
+                self.stdout.write(
+                    "{:<14} {} provider calls".format(
+                        "", measures["provider_calls"]
+                    )
+                )
+        self.stdout.write("Report written to {}.".format(options["output"]))
@@ -0,0 +1,346 @@
+"""Micro-benchmark the managers and the service layer against datasets of growing sizes."""
+
+import itertools
+import json
+import statistics
+import string
+import time
+
+import arrow
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from mycurrency_exchange_rates.models import Currency, CurrencyExchangeRate
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    bulk_store_exchange_rates,
+    exists_currency_rates_during_interval_for_pair_of_currencies,
+    get_conversion_from_database,
+    rate_cache,
+    store_conversion_to_DB,
+)
+from mycurrency_exchange_rates.tools.arrow_date_tools import (
+    validate_arrow_date,
+)
+
+from .benchmark_api import benchmark_database, get_cache_settings, get_pairs
+from .bulk_import_exchange_rates_dataset import record_data
+from .create_currencies import add_currencies
+
+SIZES = [10_000, 1_000_000, 10_000_000]
+INTERVAL_DAYS = 30
+
+
+def get_synthetic_currency_codes(number: int) -> list:
+    """Give the codes of the currencies added to the real ones to reach the size of a dataset.
+
+    Args:
+        number (int): the number of codes, at most 676.
+
+    Returns:
+        list: the codes XAA, XAB, ... which are not real currency codes.
+    """
+    codes = (
+        "X" + first + second
+        for first, second in itertools.product(
+            string.ascii_uppercase, repeat=2
+        )
+    )
+    return list(itertools.islice(codes, number))
+
+
+def get_dataset_shape(max_size: int, days: int) -> int:
+    """Give the number of currencies whose pairs over a number of days hold the largest dataset.
+
+    Args:
+        max_size (int): the number of rows of the largest dataset.
+        days (int): the number of days of stored rates.
+
+    Returns:
+        int: the number of currencies, at least the 4 real ones.
+    """
+    currencies = 4
+    while currencies * (currencies - 1) * days < max_size:
+        currencies += 1
+    return currencies
+
+
+def generate_exchange_rates(currency_ids: dict, days: int):
+    """Generate the rates of all the pairs, day by day from yesterday.
+
+    The most recent days are complete first, whatever the size of the
+    dataset, so the benchmarked lookups always hit stored rates.
+
+    Args:
+        currency_ids (dict): the ids of the currencies indexed by code.
+        days (int): the number of days.
+
+    Yields:
+        CurrencyExchangeRate: the rates, not saved.
+    """
+    yesterday = arrow.utcnow().floor("day").shift(days=-1)
+    pairs = [
+        (currency_ids[from_code], currency_ids[to_code])
+        for from_code, to_code in get_pairs(currency_ids)
+    ]
+    for day in range(days):
+        valuation_date = yesterday.shift(days=-day).date()
+        for index, (from_id, to_id) in enumerate(pairs):
+            yield CurrencyExchangeRate(
+                source_currency_id=from_id,
+                exchanged_currency_id=to_id,
+                valuation_date=valuation_date,
+                rate_value="{:.6f}".format(1 + (index + day) % 1000 / 1000),
+            )
+
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """Measure the wall time and the ORM queries of the calls of a function.
+
+    Args:
+        function (function): the function to call, without arguments.
+        repeat (int): the number of calls.
+        setup (function, optional): a function called before each call, out of the measure. Defaults to None.
+
+    Returns:
+        dict: the number of calls, the median, minimum and maximum wall times in milliseconds and the number of queries per call.
+    """
+    wall_times = []
+    queries = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as context:
+            start_time = time.perf_counter()
+            function()
+            wall_times.append(time.perf_counter() - start_time)
+        queries.append(len(context.captured_queries))
+    return {
+        "calls": repeat,
+        "median_ms": round(statistics.median(wall_times) * 1000, 4),
+        "min_ms": round(min(wall_times) * 1000, 4),
+        "max_ms": round(max(wall_times) * 1000, 4),
+        "queries": round(statistics.mean(queries), 2),
+    }
+
+
+def get_benchmarks() -> dict:
+    """Give the benchmarked calls, each one on the stored rates of EUR to USD.
+
+    Returns:
+        dict: the tuples (function, setup) indexed by benchmark name.
+    """
+    yesterday = arrow.utcnow().floor("day").shift(days=-1)
+    interval_start = yesterday.shift(days=-INTERVAL_DAYS + 1)
+    time_series = [
+        (
+            "EUR",
+            {
+                "response": {
+                    day.format("YYYY-MM-DD"): {
+                        "USD": "1.100000",
+                        "GBP": "0.85",
+                    }
+                    for day in arrow.Arrow.range(
+                        "day", interval_start, yesterday
+                    )
+                }
+            },
+        )
+    ]
+    return {
+        # the in-process rate cache is emptied, the rate is read from the db
+        "get_conversion_from_database": (
+            lambda: get_conversion_from_database(
+                "EUR", "USD", yesterday.date()
+            ),
+            rate_cache.clear,
+        ),
+        "exists_currency_rates_during_interval_for_pair_of_currencies": (
+            lambda: exists_currency_rates_during_interval_for_pair_of_currencies(
+                "EUR", "USD", interval_start, yesterday
+            ),
+            None,
+        ),
+        "store_conversion_to_DB": (
+            lambda: store_conversion_to_DB(
+                "EUR", "USD", "1.100000", yesterday.date()
+            ),
+            None,
+        ),
+        "validate_arrow_date": (
+            lambda: validate_arrow_date(
+                yesterday.year, yesterday.month, yesterday.day
+            ),
+            None,
+        ),
+        "record_data": (lambda: record_data(time_series), None),
+    }
+
+
+def run_benchmarks(
+    sizes: list = None,
+    days: int = 3650,
+    repeat: int = 50,
+    benchmarks: list = None,
+) -> dict:
+    """Run the benchmarks on a test database grown to each size of dataset.
+
+    Args:
+        sizes (list, optional): the numbers of stored rates, growing. Defaults to SIZES.
+        days (int, optional): the number of days of the largest dataset, the currencies are added to reach its size. Defaults to 3650.
+        repeat (int, optional): the number of calls of each benchmark per size. Defaults to 50.
+        benchmarks (list, optional): the names of the benchmarks to run. Defaults to all of them.
+
+    Returns:
+        dict: the parameters of the run and the measures of each benchmark per size, with the slowdown of its median against the smallest dataset.
+    """
+    sizes = sorted(sizes or SIZES)
+    number_of_currencies = get_dataset_shape(sizes[-1], days)
+    report = {
+        "parameters": {
+            "sizes": sizes,
+            "days": days,
+            "currencies": number_of_currencies,
+            "repeat": repeat,
+            "database": settings.DATABASES["default"]["ENGINE"],
+        },
+        "sizes": {},
+    }
+
+    with override_settings(
+        CACHES=get_cache_settings("locmem")
+    ), benchmark_database():
+        add_currencies()
+        Currency.objects.bulk_create(
+            Currency(code=code, name="Currency {}".format(code), symbol=code)
+            for code in get_synthetic_currency_codes(number_of_currencies - 4)
+        )
+        currency_registry.clear()
+        exchange_rates = generate_exchange_rates(
+            currency_registry.get_ids(), days
+        )
+
+        stored_rates = 0
+        all_benchmarks = get_benchmarks()
+        for size in sizes:
+            start_time = time.perf_counter()
+            stored_rates += bulk_store_exchange_rates(
+                itertools.islice(exchange_rates, size - stored_rates),
+                ignore_conflicts=True,
+            )
+            results = {
+                "stored_rates": stored_rates,
+                "seed_duration": round(time.perf_counter() - start_time, 3),
+                "benchmarks": {},
+            }
+            for name in benchmarks or all_benchmarks:
+                function, setup = all_benchmarks[name]
+                results["benchmarks"][name] = measure(function, repeat, setup)
+            report["sizes"][str(size)] = results
+        currency_registry.clear()
+    rate_cache.clear()
+
+    smallest = report["sizes"][str(sizes[0])]["benchmarks"]
+    for results in report["sizes"].values():
+        for name, measures in results["benchmarks"].items():
+            measures["slowdown"] = round(
+                measures["median_ms"] / max(smallest[name]["median_ms"], 1e-6),
+                2,
+            )
+    return report
+
+
+class Command(BaseCommand):
+    """Provide a CLI option for manage.py to micro-benchmark the managers against growing datasets."""
+
+    help = (
+        "Micro-benchmark the managers and the service layer on a test"
+        " database seeded with 10k, 1M and 10M rates, and write the wall"
+        " times and ORM query counts to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument(
+            "--sizes",
+            type=lambda value: [
+                int(size.replace("_", "")) for size in value.split(",") if size
+            ],
+            default=SIZES,
+            help="Comma separated numbers of stored rates.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=3650,
+            help="Number of days of the largest dataset.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Number of calls of each benchmark per size.",
+        )
+        parser.add_argument(
+            "--benchmarks",
+            type=lambda value: [name for name in value.split(",") if name],
+            default=None,
+            help="Comma separated names of the benchmarks to run.",
+        )
+        parser.add_argument(
+            "--output",
+            default="benchmark-managers.json",
+            help="Path of the JSON report.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the manage py command."""
+        if min(options["sizes"]) < 1 or options["days"] < INTERVAL_DAYS:
+            raise CommandError(
+                "The sizes must be positive and the days at least {} !".format(
+                    INTERVAL_DAYS
+                )
+            )
+        if options["repeat"] < 1:
+            raise CommandError("The option repeat must be positive !")
+        unknown_benchmarks = set(options["benchmarks"] or []) - set(
+            get_benchmarks()
+        )
+        if unknown_benchmarks:
+            raise CommandError(
+                "The benchmarks {} are unknown !".format(
+                    ", ".join(sorted(unknown_benchmarks))
+                )
+            )
+
+        report = run_benchmarks(
+            sizes=options["sizes"],
+            days=options["days"],
+            repeat=options["repeat"],
+            benchmarks=options["benchmarks"],
+        )
+        with open(options["output"], "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+        for size, results in report["sizes"].items():
+            self.stdout.write(
+                "{} rates (seeded in {} s)".format(
+                    size, results["seed_duration"]
+                )
+            )
+            for name, measures in results["benchmarks"].items():
+                self.stdout.write(
+                    "  {:<62} {:>9.3f} ms  {:>5} queries  x{}".format(
+                        name,
+                        measures["median_ms"],
+                        measures["queries"],
+                        measures["slowdown"],
+                    )
+                )
+        self.stdout.write("Report written to {}.".format(options["output"]))
@@ -1,117 +1,574 @@
 """Import a dataset of rates for various currencies."""
 
 import asyncio
+import datetime
+import itertools
 import logging
 import os
+import time
 from decimal import Decimal
 
-import aiohttp
 import arrow
-from django.core.management.base import BaseCommand
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
-from mycurrency_exchange_rates.models import Currency, CurrencyExchangeRate
+from mycurrency_exchange_rates.models import (
+    CurrencyExchangeRate,
+    ImportCheckpoint,
+)
+from mycurrency_exchange_rates.services.database_managers.coverage import (
+    get_missing_intervals_by_source,
+)
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    bulk_store_exchange_rates,
+    store_rates_list_to_DB,
+)
 from mycurrency_exchange_rates.services.providers_service.currency_beacon_provider import (
     CURRENCY_RATES_URL,
 )
+from mycurrency_exchange_rates.services.providers_service.http_session import (
+    aclose_session,
+    get_session,
+)
+from mycurrency_exchange_rates.services.providers_service.json_stream import (
+    iter_json_object_items,
+)
+
+logger = logging.getLogger(__name__)
 
 currencies = ["CHF", "GBP", "EUR", "USD"]
 
 
-def record_data(list_exchange_rates: list):
+def record_data(
+    list_exchange_rates: list, batch_size: int = None, ignore_conflicts=False
+) -> int:
     """Store the exchange rate results in the database.
 
+    The rates are inserted by batch, and the rates already stored are updated.
+
     Args:
-        list_exchange_rates (list): the list of exchange rates coming from the provider api call.
-    """
-    for i in range(0, len(currencies)):
-        date_keys = list_exchange_rates[i]["response"].keys()
-        for date_key in date_keys:
-            dest_currency_keys = list_exchange_rates[i]["response"][
-                date_key
-            ].keys()
-            for currency_key in dest_currency_keys:
-                rate_value = list_exchange_rates[i]["response"][date_key][
-                    currency_key
-                ]
-
-                CurrencyExchangeRate.objects.create(
-                    source_currency=Currency.objects.filter(
-                        code=currencies[i]
-                    ).first(),
-                    exchanged_currency=Currency.objects.filter(
-                        code=currency_key
-                    ).first(),
-                    valuation_date=arrow.get(date_key, "YYYY-MM-DD").date(),
-                    rate_value=Decimal(rate_value),
+        list_exchange_rates (list): the list of tuples (source currency code, response of the provider api call).
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        int: the number of stored rates.
+    """
+    stored_rates = 0
+    for source_currency, exchange_rates in list_exchange_rates:
+        rates = {
+            arrow.get(date_key, "YYYY-MM-DD").date(): day_rates
+            for date_key, day_rates in exchange_rates["response"].items()
+        }
+        stored_rates += store_rates_list_to_DB(
+            source_currency, rates, batch_size, ignore_conflicts
+        )
+    return stored_rates
+
+
+def get_checkpoint_key(api_call: tuple) -> tuple:
+    """Give the key identifying the checkpoint of an api call.
+
+    Args:
+        api_call (tuple): a call given by get_api_calls
+
+    Returns:
+        tuple: the source currency code, the start date and the end date of the call.
+    """
+    src_currency, _, from_date, to_date = api_call
+    return src_currency, from_date.date(), to_date.date()
+
+
+def is_covered(from_date, to_date, intervals: list) -> bool:
+    """Indicate if a range of dates is covered by the union of intervals.
+
+    Args:
+        from_date (date): the start date of the range
+        to_date (date): the end date of the range
+        intervals (list): the tuples (start date, end date), both included.
+
+    Returns:
+        bool: True if each day of the range is in an interval.
+    """
+    covered_until = from_date - datetime.timedelta(days=1)
+    for start_date, end_date in sorted(intervals):
+        if start_date > covered_until + datetime.timedelta(days=1):
+            break
+        covered_until = max(covered_until, end_date)
+        if covered_until >= to_date:
+            return True
+    return False
+
+
+def remove_completed_api_calls(api_calls: list) -> list:
+    """Remove the api calls already stored by a previous run of the import.
+
+    A call is completed when the checkpoints of its base currency cover its
+    dates for all its symbols, whatever the windows of the previous run.
+
+    Args:
+        api_calls (list): the calls given by get_api_calls
+
+    Returns:
+        list: the calls not covered by the checkpoints.
+    """
+    checkpoints = {}
+    for (
+        src_currency,
+        symbols,
+        from_date,
+        to_date,
+    ) in ImportCheckpoint.objects.filter(
+        source_currency_code__in={api_call[0] for api_call in api_calls}
+    ).values_list(
+        "source_currency_code", "symbols", "from_date", "to_date"
+    ):
+        checkpoints.setdefault(src_currency, []).append(
+            (set(symbols.split(",")), from_date, to_date)
+        )
+
+    return [
+        api_call
+        for api_call in api_calls
+        if not is_covered(
+            api_call[2].date(),
+            api_call[3].date(),
+            [
+                (from_date, to_date)
+                for symbols, from_date, to_date in checkpoints.get(
+                    api_call[0], []
                 )
+                if symbols.issuperset(api_call[1])
+            ],
+        )
+    ]
 
 
-def get_api_calls(session, from_date: arrow.Arrow, to_date: arrow.Arrow):
-    """Put all the api calls in a bucket to rigger all of themn at once.
+def save_checkpoint(api_call: tuple, stored_rates: int):
+    """Record that the response of an api call is stored.
+
+    The symbols of a checkpoint of the same window are kept, their rates
+    are still stored.
+
+    Args:
+        api_call (tuple): the call given by get_api_calls
+        stored_rates (int): the number of stored rates.
+    """
+    src_currency, from_date, to_date = get_checkpoint_key(api_call)
+    (
+        checkpoint,
+        created,
+    ) = ImportCheckpoint.objects.select_for_update().get_or_create(
+        source_currency_code=src_currency,
+        from_date=from_date,
+        to_date=to_date,
+        defaults={
+            "symbols": ",".join(sorted(api_call[1])),
+            "stored_rates": stored_rates,
+        },
+    )
+    if not created:
+        checkpoint.symbols = ",".join(
+            sorted(set(checkpoint.symbols.split(",")).union(api_call[1]))
+        )
+        checkpoint.stored_rates += stored_rates
+        checkpoint.save()
+
+
+def store_last_batch(
+    batch: list,
+    batch_size: int = None,
+    ignore_conflicts=False,
+    api_call: tuple = None,
+    stored_rates: int = 0,
+) -> int:
+    """Store the last batch of a time series and its checkpoint in one transaction.
+
+    A checkpoint thus exists only once all the rates of its call are
+    stored. A call interrupted before, e.g. by a crash, is imported again.
 
     Args:
-        session (ClientSession): the session for the async call
+        batch (list): the CurrencyExchangeRate objects of the last batch.
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+        api_call (tuple, optional): the call given by get_api_calls, to checkpoint. Defaults to None.
+        stored_rates (int, optional): the number of rates of the call stored by the previous batches. Defaults to 0.
+
+    Returns:
+        int: the number of stored rates of the last batch.
+    """
+    with transaction.atomic():
+        last_stored_rates = bulk_store_exchange_rates(
+            batch, batch_size, ignore_conflicts
+        )
+        if api_call is not None:
+            save_checkpoint(api_call, stored_rates + last_stored_rates)
+    return last_stored_rates
+
+
+def delete_checkpoints(
+    source_currencies: list, from_date: arrow.Arrow, to_date: arrow.Arrow
+) -> int:
+    """Delete the checkpoints of an import, once it is completed.
+
+    Args:
+        source_currencies (list): the codes of the imported currencies
+        from_date (arrow.Arrow): the start date of the import
+        to_date (arrow.Arrow): the end date of the import
+
+    Returns:
+        int: the number of deleted checkpoints.
+    """
+    return ImportCheckpoint.objects.filter(
+        source_currency_code__in=source_currencies,
+        from_date__gte=from_date.date(),
+        to_date__lte=to_date.date(),
+    ).delete()[0]
+
+
+def get_date_windows(
+    from_date: arrow.Arrow, to_date: arrow.Arrow, chunk_days: int
+) -> list:
+    """Split a range of dates into windows small enough for a single provider call.
+
+    Args:
+        from_date (arrow.Arrow): the start date for the bulk data
+        to_date (arrow.Arrow): the end date for the bulk data
+        chunk_days (int): the maximal number of days of a window
+
+    Returns:
+        list: the tuples (start date, end date) of the windows, both included.
+    """
+    return [
+        (window_start, min(window_start.shift(days=chunk_days - 1), to_date))
+        for window_start in itertools.islice(
+            arrow.Arrow.range("day", from_date, to_date), 0, None, chunk_days
+        )
+    ]
+
+
+def get_api_calls(
+    source_currencies: list,
+    from_date: arrow.Arrow,
+    to_date: arrow.Arrow,
+    chunk_days: int,
+    only_missing=False,
+) -> list:
+    """List the api calls needed to import a range of dates for a list of currencies.
+
+    Args:
+        source_currencies (list): the codes of the currencies to import
         from_date (arrow.Arrow): the start date for the bulk data
         to_date (arrow.Arrow): the end date for the bulk data
+        chunk_days (int): the maximal number of days requested by call
+        only_missing (bool, optional): request only the intervals of dates and the currencies without stored rates. Defaults to False.
 
     Returns:
-        list: list of bulk api calls to trigger.
-    """
-    api_calls = []
-    for src_currency in currencies:
-        api_calls.append(
-            session.get(
-                CURRENCY_RATES_URL.format(
-                    os.getenv("CURRENCY_BEACON_API_KEY"),
-                    src_currency,
-                    from_date.format("YYYY-MM-DD"),
-                    to_date.format("YYYY-MM-DD"),
-                    ",".join(
-                        [
-                            dest_currency
-                            for dest_currency in currencies
-                            if dest_currency != src_currency
-                        ]
-                    ),
-                ),
-                ssl=False,
+        list: the tuples (source currency code, symbols, start date, end date) of the calls.
+    """
+    if only_missing:
+        return [
+            (src_currency, symbols, window_start, window_end)
+            for src_currency, intervals in get_missing_intervals_by_source(
+                source_currencies,
+                source_currencies,
+                from_date.date(),
+                to_date.date(),
+            ).items()
+            for start_date, end_date, symbols in intervals
+            for window_start, window_end in get_date_windows(
+                arrow.get(start_date), arrow.get(end_date), chunk_days
             )
+        ]
+
+    return [
+        (
+            src_currency,
+            [
+                dest_currency
+                for dest_currency in source_currencies
+                if dest_currency != src_currency
+            ],
+            window_start,
+            window_end,
         )
+        for src_currency in source_currencies
+        for window_start, window_end in get_date_windows(
+            from_date, to_date, chunk_days
+        )
+    ]
 
-    return api_calls
+
+async def stream_time_series(
+    src_currency, symbols: list, from_date: arrow.Arrow, to_date: arrow.Arrow
+):
+    """Request a time series to the provider and yield its days as they are received.
+
+    Args:
+        src_currency (str): the code of the base currency
+        symbols (list): the codes of the target currencies
+        from_date (arrow.Arrow): the start date of the time series
+        to_date (arrow.Arrow): the end date of the time series
+
+    Yields:
+        tuple: the date as YYYY-MM-DD and the rates of the day indexed by target currency code.
+    """
+    async with get_session().get(
+        CURRENCY_RATES_URL.format(
+            os.getenv("CURRENCY_BEACON_API_KEY"),
+            src_currency,
+            from_date.format("YYYY-MM-DD"),
+            to_date.format("YYYY-MM-DD"),
+            ",".join(symbols),
+        ),
+        ssl=False,
+    ) as response:
+        response.raise_for_status()
+        async for date_key, day_rates in iter_json_object_items(
+            response.content.iter_chunked(
+                settings.BULK_IMPORT_STREAM_CHUNK_SIZE
+            ),
+            "response",
+        ):
+            yield date_key, day_rates
+
+
+async def store_time_series(
+    src_currency,
+    days,
+    batch_size: int = None,
+    ignore_conflicts=False,
+    api_call: tuple = None,
+) -> int:
+    """Store the days of a time series by batches, while they are received.
+
+    Only one batch of rates is kept in memory at a time. The last batch is
+    stored with the checkpoint of the call, see store_last_batch.
+
+    Args:
+        src_currency (str): the code of the base currency
+        days (async iterable): the tuples (date as YYYY-MM-DD, rates of the day indexed by target currency code)
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+        api_call (tuple, optional): the call given by get_api_calls, checkpointed with the last batch. Defaults to None.
+
+    Returns:
+        int: the number of stored rates.
+    """
+    batch_size = batch_size or settings.EXCHANGE_RATES_BATCH_SIZE
+    currencies = await sync_to_async(currency_registry.get_ids)()
+    store_batch = sync_to_async(bulk_store_exchange_rates)
+
+    stored_rates = 0
+    batch = []
+    async for date_key, day_rates in days:
+        valuation_date = arrow.get(date_key, "YYYY-MM-DD").date()
+        batch.extend(
+            CurrencyExchangeRate(
+                source_currency_id=currencies[src_currency],
+                exchanged_currency_id=currencies[exchanged_code],
+                valuation_date=valuation_date,
+                rate_value=Decimal(str(rate_value)),
+            )
+            for exchanged_code, rate_value in day_rates.items()
+            if src_currency in currencies and exchanged_code in currencies
+        )
+        if len(batch) >= batch_size:
+            stored_rates += await store_batch(
+                batch, batch_size, ignore_conflicts
+            )
+            batch = []
+
+    stored_rates += await sync_to_async(store_last_batch)(
+        batch, batch_size, ignore_conflicts, api_call, stored_rates
+    )
+    return stored_rates
+
+
+async def import_api_call(
+    semaphore: asyncio.Semaphore,
+    api_call: tuple,
+    retries: int,
+    batch_size: int = None,
+    ignore_conflicts=False,
+) -> int:
+    """Request an api call, store its response while it is received and record its checkpoint.
+
+    The call is retried with an exponential backoff. The rates stored by a
+    failed attempt are stored again by the next one. The checkpoint is
+    written in the transaction of the last batch of rates.
+
+    Args:
+        semaphore (asyncio.Semaphore): the semaphore bounding the calls in flight
+        api_call (tuple): the call given by get_api_calls
+        retries (int): the maximal number of attempts of the call
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        int: the number of stored rates.
+    """
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(retries),
+        wait=wait_exponential(multiplier=1, min=1, max=30),
+        reraise=True,
+    ):
+        with attempt:
+            async with semaphore:
+                return await store_time_series(
+                    api_call[0],
+                    stream_time_series(*api_call),
+                    batch_size,
+                    ignore_conflicts,
+                    api_call,
+                )
 
 
 async def retrieve_exchange_rates(
-    from_date: arrow.Arrow, to_date: arrow.Arrow
-) -> dict:
-    """Lookup for the exchange rates in a date range.
+    api_calls: list,
+    concurrency: int,
+    retries: int,
+    batch_size: int = None,
+    ignore_conflicts=False,
+) -> list:
+    """Lookup for the exchange rates of a list of api calls and store each of them.
+
+    At most concurrency calls are in flight at once. A failed call does not
+    stop the others.
 
     Args:
-        from_date (arrow.Arrow): the start date for the bulk data
-        to_date (arrow.Arrow): the end date for the bulk data
+        api_calls (list): the calls given by get_api_calls
+        concurrency (int): the maximal number of calls in flight
+        retries (int): the maximal number of attempts of a call
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        list: the number of stored rates of each call, or the exception which made it fail.
     """
-    results = []
-    async with aiohttp.ClientSession() as session:
-        api_calls = get_api_calls(session, from_date, to_date)
-        responses = await asyncio.gather(*api_calls)
-        for response in responses:
-            results.append(await response.json())
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        return await asyncio.gather(
+            *[
+                import_api_call(
+                    semaphore, api_call, retries, batch_size, ignore_conflicts
+                )
+                for api_call in api_calls
+            ],
+            return_exceptions=True,
+        )
+    finally:
+        await aclose_session()
+
 
-    return results
+def import_bulk_data(
+    source_currencies: list = None,
+    from_date: arrow.Arrow = None,
+    to_date: arrow.Arrow = None,
+    chunk_days: int = None,
+    concurrency: int = None,
+    retries: int = None,
+    batch_size: int = None,
+    ignore_conflicts=False,
+    only_missing=False,
+    resume=True,
+) -> dict:
+    """Import historic exchange data for a list of currencies.
 
+    Each response of the provider is parsed and stored by batches while it
+    is received, its last batch with its checkpoint, so that a new run
+    resumes an interrupted import. The checkpoints are deleted once the
+    import is completed.
 
-def import_bulk_data():
-    """Import historic exchange data for 4 currencies."""
-    from_date = arrow.Arrow(2024, 3, 1)
-    # to_date = arrow.utcnow()
-    to_date = arrow.Arrow(2024, 3, 31)
+    Args:
+        source_currencies (list, optional): the codes of the currencies to import. Defaults to CHF, GBP, EUR and USD.
+        from_date (arrow.Arrow, optional): the start date for the bulk data. Defaults to 2024-03-01.
+        to_date (arrow.Arrow, optional): the end date for the bulk data. Defaults to 2024-03-31.
+        chunk_days (int, optional): the maximal number of days requested by call. Defaults to the setting BULK_IMPORT_CHUNK_DAYS.
+        concurrency (int, optional): the maximal number of calls in flight. Defaults to the setting BULK_IMPORT_CONCURRENCY.
+        retries (int, optional): the maximal number of attempts of a call. Defaults to the setting BULK_IMPORT_RETRIES.
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+        only_missing (bool, optional): request only the intervals of dates and the currencies without stored rates. Defaults to False.
+        resume (bool, optional): skip the calls stored by a previous run. Defaults to True.
+
+    Returns:
+        dict: the number of provider calls, of calls resumed and failed, the number of stored rates and the duration of the import in seconds.
+    """
+    source_currencies = source_currencies or currencies
+    from_date = from_date or arrow.Arrow(2024, 3, 1)
+    to_date = to_date or arrow.Arrow(2024, 3, 31)
 
     if to_date < from_date:
         raise Exception("The start date can not be higher than the end date !")
 
-    results = asyncio.run(retrieve_exchange_rates(from_date, to_date))
-    logging.info(results)
-    record_data(list_exchange_rates=results)
+    start_time = time.perf_counter()
+    api_calls = get_api_calls(
+        source_currencies,
+        from_date,
+        to_date,
+        chunk_days or settings.BULK_IMPORT_CHUNK_DAYS,
+        only_missing,
+    )
+    remaining_api_calls = (
+        remove_completed_api_calls(api_calls) if resume else api_calls
+    )
+    results = asyncio.run(
+        retrieve_exchange_rates(
+            remaining_api_calls,
+            concurrency or settings.BULK_IMPORT_CONCURRENCY,
+            retries or settings.BULK_IMPORT_RETRIES,
+            batch_size,
+            ignore_conflicts,
+        )
+    )
+
+    failed_api_calls = 0
+    for api_call, result in zip(remaining_api_calls, results):
+        if isinstance(result, BaseException):
+            failed_api_calls += 1
+            logger.warning(
+                "The import of {} from {} to {} failed: {!r}".format(
+                    *get_checkpoint_key(api_call), result
+                )
+            )
+    if not failed_api_calls:
+        delete_checkpoints(source_currencies, from_date, to_date)
+
+    return {
+        "api_calls": len(api_calls),
+        "resumed_api_calls": len(api_calls) - len(remaining_api_calls),
+        "failed_api_calls": failed_api_calls,
+        "stored_rates": sum(
+            result for result in results if isinstance(result, int)
+        ),
+        "duration": time.perf_counter() - start_time,
+    }
+
+
+def parse_date(value: str) -> arrow.Arrow:
+    """Parse a date option of the command.
+
+    Args:
+        value (str): the date as YYYY-MM-DD.
+
+    Returns:
+        arrow.Arrow: the parsed date.
+    """
+    try:
+        return arrow.get(value, "YYYY-MM-DD")
+    except (arrow.parser.ParserError, ValueError):
+        raise CommandError(
+            "The date {} is incorrect, the expected format is YYYY-MM-DD !".format(
+                value
+            )
+        )
 
 
 class Command(BaseCommand):
@@ -123,8 +580,110 @@ class Command(BaseCommand):
 
     help = "Import historical bulk data."
 
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument(
+            "--from-date",
+            type=parse_date,
+            default=arrow.Arrow(2024, 3, 1),
+            help="First date to import, as YYYY-MM-DD.",
+        )
+        parser.add_argument(
+            "--to-date",
+            type=parse_date,
+            default=arrow.Arrow(2024, 3, 31),
+            help="Last date to import, as YYYY-MM-DD.",
+        )
+        parser.add_argument(
+            "--currencies",
+            type=lambda value: [
+                code.strip().upper()
+                for code in value.split(",")
+                if code.strip()
+            ],
+            default=currencies,
+            help="Comma separated codes of the currencies to import.",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=settings.BULK_IMPORT_CHUNK_DAYS,
+            help="Maximal number of days requested by provider call.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.BULK_IMPORT_CONCURRENCY,
+            help="Maximal number of provider calls in flight.",
+        )
+        parser.add_argument(
+            "--retries",
+            type=int,
+            default=settings.BULK_IMPORT_RETRIES,
+            help="Maximal number of attempts of a provider call.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EXCHANGE_RATES_BATCH_SIZE,
+            help="Number of rates written by statement.",
+        )
+        parser.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Keep the rates already stored instead of updating them.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Request again the chunks stored by a previous run.",
+        )
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="Request only the dates and currencies without stored rates.",
+        )
+
     def handle(self, *args, **options):
         """Handle the manage py command."""
-        import_bulk_data()
+        for option in ["chunk_days", "concurrency", "retries", "batch_size"]:
+            if options[option] < 1:
+                raise CommandError(
+                    "The option {} must be positive !".format(option)
+                )
+        if options["to_date"] < options["from_date"]:
+            raise CommandError(
+                "The start date can not be higher than the end date !"
+            )
+
+        report = import_bulk_data(
+            source_currencies=options["currencies"],
+            from_date=options["from_date"],
+            to_date=options["to_date"],
+            chunk_days=options["chunk_days"],
+            concurrency=options["concurrency"],
+            retries=options["retries"],
+            batch_size=options["batch_size"],
+            ignore_conflicts=options["skip_existing"],
+            only_missing=options["only_missing"],
+            resume=not options["restart"],
+        )
+
+        self.stdout.write(
+            "{} provider calls ({} resumed, {} failed), stored {} rates in"
+            " {:.2f}s ({:.0f} rows/s).".format(
+                report["api_calls"],
+                report["resumed_api_calls"],
+                report["failed_api_calls"],
+                report["stored_rates"],
+                report["duration"],
+                report["stored_rates"] / max(report["duration"], 1e-9),
+            )
+        )
+        if report["failed_api_calls"]:
+            raise CommandError(
+                "Some chunks were not imported, run the command again to"
+                " resume the import."
+            )
 
         # logging.info("Added providers.")
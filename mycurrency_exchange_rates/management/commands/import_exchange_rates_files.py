@@ -0,0 +1,320 @@
+"""Import a dataset of rates from local files, without any provider call."""
+
+import csv
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from xml.etree import ElementTree
+
+import arrow
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mycurrency_exchange_rates.models import CurrencyExchangeRate
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    bulk_store_exchange_rates,
+)
+from mycurrency_exchange_rates.services.database_managers.rate_graph import (
+    RATE_PRECISION,
+)
+
+FILE_FORMATS = ["csv", "ecb"]
+
+
+def parse_rate(value: str) -> Decimal | None:
+    """Parse a rate value of a file.
+
+    Args:
+        value (str): the rate value, e.g. 1.0812 or N/A.
+
+    Returns:
+        Decimal: the rate value, None if the rate is missing or not positive.
+    """
+    try:
+        rate_value = Decimal(value.strip())
+    except (InvalidOperation, AttributeError):
+        return None
+    return rate_value if rate_value.is_finite() and rate_value > 0 else None
+
+
+def read_csv_rates(path: str, currency_codes: set):
+    """Read the rates of a CSV file, one day at a time.
+
+    The file has one row per day, with the date as YYYY-MM-DD in the first
+    column and one column per target currency, like the ECB eurofxref-hist
+    CSV file. The columns of the unknown currencies are not parsed.
+
+    Args:
+        path (str): the path of the file.
+        currency_codes (set): the codes of the currencies to read.
+
+    Yields:
+        tuple: the date and the rates of the day indexed by target currency code.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, [])
+        columns = [
+            (index, code.strip().upper())
+            for index, code in enumerate(header)
+            if index and code.strip().upper() in currency_codes
+        ]
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+
+            day_rates = {}
+            for index, code in columns:
+                rate_value = (
+                    parse_rate(row[index]) if index < len(row) else None
+                )
+                if rate_value is not None:
+                    day_rates[code] = rate_value
+            yield arrow.get(row[0].strip(), "YYYY-MM-DD").date(), day_rates
+
+
+def read_ecb_rates(path: str, currency_codes: set):
+    """Read the rates of an ECB eurofxref XML file, one day at a time.
+
+    The file is parsed incrementally, each day is released once it is read.
+
+    Args:
+        path (str): the path of the file.
+        currency_codes (set): the codes of the currencies to read.
+
+    Yields:
+        tuple: the date and the rates of the day indexed by target currency code.
+    """
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if (
+            element.tag.rsplit("}", 1)[-1] != "Cube"
+            or "time" not in element.attrib
+        ):
+            continue
+
+        day_rates = {}
+        for rate_element in element:
+            code = rate_element.get("currency", "").upper()
+            rate_value = parse_rate(rate_element.get("rate"))
+            if code in currency_codes and rate_value is not None:
+                day_rates[code] = rate_value
+        yield arrow.get(element.get("time"), "YYYY-MM-DD").date(), day_rates
+        element.clear()
+
+
+def get_file_format(path: str) -> str:
+    """Give the format of a file from its extension.
+
+    Args:
+        path (str): the path of the file.
+
+    Returns:
+        str: ecb for the XML files, csv otherwise.
+    """
+    return "ecb" if path.lower().endswith(".xml") else "csv"
+
+
+def get_day_rates(
+    base_currency: str, day_rates: dict, derive_cross=False
+) -> list:
+    """Give the rates of the pairs of currencies of a day.
+
+    Args:
+        base_currency (str): the code of the base currency of the file.
+        day_rates (dict): the rates of the base currency indexed by target currency code.
+        derive_cross (bool, optional): derive the inverse and the cross rates of all the pairs. Defaults to False.
+
+    Returns:
+        list: tuples (source currency code, target currency code, rate value).
+    """
+    if not derive_cross:
+        return [
+            (base_currency, code, rate_value)
+            for code, rate_value in day_rates.items()
+            if code != base_currency
+        ]
+
+    day_rates = {**day_rates, base_currency: Decimal(1)}
+    return [
+        (from_code, to_code, to_rate / from_rate)
+        for from_code, from_rate in day_rates.items()
+        for to_code, to_rate in day_rates.items()
+        if from_code != to_code
+    ]
+
+
+def get_exchange_rates(
+    days, base_currency: str, currencies: dict, derive_cross, report: dict
+):
+    """Build the rates to store from the days of a file.
+
+    Args:
+        days (iterable): tuples (date, rates of the day indexed by target currency code).
+        base_currency (str): the code of the base currency of the file.
+        currencies (dict): the ids of the currencies to store, indexed by code.
+        derive_cross (bool): derive the inverse and the cross rates of all the pairs.
+        report (dict): the report of the import, its number of days is incremented.
+
+    Yields:
+        CurrencyExchangeRate: the rates to store.
+    """
+    for valuation_date, day_rates in days:
+        report["days"] += 1
+        for from_code, to_code, rate_value in get_day_rates(
+            base_currency, day_rates, derive_cross
+        ):
+            if from_code in currencies and to_code in currencies:
+                yield CurrencyExchangeRate(
+                    source_currency_id=currencies[from_code],
+                    exchanged_currency_id=currencies[to_code],
+                    valuation_date=valuation_date,
+                    rate_value=rate_value.quantize(RATE_PRECISION),
+                )
+
+
+def import_files(
+    paths: list,
+    file_format: str = None,
+    base_currency: str = "EUR",
+    currency_codes: list = None,
+    derive_cross=False,
+    batch_size: int = None,
+    ignore_conflicts=False,
+) -> dict:
+    """Import the rates of local files.
+
+    The files are read one day at a time and the rates are written by
+    batches, so the memory used does not depend on the size of the files.
+
+    Args:
+        paths (list): the paths of the files.
+        file_format (str, optional): csv or ecb. Defaults to the format given by the extension of each file.
+        base_currency (str, optional): the code of the base currency of the files. Defaults to EUR.
+        currency_codes (list, optional): the codes of the currencies to import. Defaults to all the stored currencies.
+        derive_cross (bool, optional): derive the inverse and the cross rates of all the pairs. Defaults to False.
+        batch_size (int, optional): the number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        dict: the number of files, of days and of stored rates and the duration of the import in seconds.
+    """
+    currencies = currency_registry.get_ids()
+    if currency_codes:
+        currencies = {
+            code: currency_id
+            for code, currency_id in currencies.items()
+            if code in currency_codes or code == base_currency
+        }
+
+    start_time = time.perf_counter()
+    report = {
+        "files": len(paths),
+        "days": 0,
+        "stored_rates": 0,
+    }
+    for path in paths:
+        read_rates = (
+            read_ecb_rates
+            if (file_format or get_file_format(path)) == "ecb"
+            else read_csv_rates
+        )
+        report["stored_rates"] += bulk_store_exchange_rates(
+            get_exchange_rates(
+                read_rates(path, set(currencies)),
+                base_currency,
+                currencies,
+                derive_cross,
+                report,
+            ),
+            batch_size,
+            ignore_conflicts,
+        )
+
+    report["duration"] = time.perf_counter() - start_time
+    return report
+
+
+class Command(BaseCommand):
+    """Provide a CLI option for manage.py to import exchange rates from local CSV or ECB XML files."""
+
+    help = "Import historical rates from local CSV or ECB XML files."
+
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            help="Paths of the CSV or ECB eurofxref XML files.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FILE_FORMATS,
+            default=None,
+            help="Format of the files. Defaults to the extension of each file.",
+        )
+        parser.add_argument(
+            "--base-currency",
+            type=lambda value: value.strip().upper(),
+            default="EUR",
+            help="Code of the base currency of the files.",
+        )
+        parser.add_argument(
+            "--currencies",
+            type=lambda value: [
+                code.strip().upper()
+                for code in value.split(",")
+                if code.strip()
+            ],
+            default=None,
+            help="Comma separated codes of the currencies to import.",
+        )
+        parser.add_argument(
+            "--derive-cross",
+            action="store_true",
+            help="Store the inverse and the cross rates of all the pairs.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EXCHANGE_RATES_BATCH_SIZE,
+            help="Number of rates written by statement.",
+        )
+        parser.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Keep the rates already stored instead of updating them.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the manage py command."""
+        if options["batch_size"] < 1:
+            raise CommandError("The option batch_size must be positive !")
+        for path in options["paths"]:
+            if not os.path.isfile(path):
+                raise CommandError("The file {} does not exist !".format(path))
+
+        try:
+            report = import_files(
+                options["paths"],
+                file_format=options["format"],
+                base_currency=options["base_currency"],
+                currency_codes=options["currencies"],
+                derive_cross=options["derive_cross"],
+                batch_size=options["batch_size"],
+                ignore_conflicts=options["skip_existing"],
+            )
+        except (ValueError, ElementTree.ParseError) as error:
+            raise CommandError("The file is invalid: {}".format(error))
+
+        self.stdout.write(
+            "{} files, {} days, stored {} rates in {:.2f}s ({:.0f} rows/s).".format(
+                report["files"],
+                report["days"],
+                report["stored_rates"],
+                report["duration"],
+                report["stored_rates"] / max(report["duration"], 1e-9),
+            )
+        )
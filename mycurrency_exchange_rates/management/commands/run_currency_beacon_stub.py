@@ -0,0 +1,93 @@
+"""Run a local stand-in server of the currency beacon api."""
+
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandError
+
+from mycurrency_exchange_rates.tools.currency_beacon_stub import (
+    LATENCY_DISTRIBUTIONS,
+    STATS_KEY,
+    create_stub_app,
+)
+
+
+class Command(BaseCommand):
+    """Provide a CLI option for manage.py to serve the currency beacon endpoints locally, e.g. for the benchmarks."""
+
+    help = (
+        "Serve the convert, historical and timeseries endpoints of currency"
+        " beacon, with injected latencies, errors and rate limiting. Point"
+        " the provider at it with CURRENCY_BEACON_BASE_URL="
+        "http://<host>:<port>/v1."
+    )
+
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8010)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Typical latency of the responses in seconds.",
+        )
+        parser.add_argument(
+            "--latency-distribution",
+            choices=LATENCY_DISTRIBUTIONS,
+            default="constant",
+            help="Distribution of the latencies around the typical one.",
+        )
+        parser.add_argument(
+            "--latency-sigma",
+            type=float,
+            default=0.5,
+            help="Shape of the lognormal distribution, the higher the longer its tail.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0,
+            help="Probability of a response to be an error 500.",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=0,
+            help="Requests allowed per second, the others get an error 429.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the latencies and the errors.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the manage py command."""
+        if not 0 <= options["error_rate"] <= 1:
+            raise CommandError(
+                "The option error_rate must be between 0 and 1 !"
+            )
+        for option in ["latency", "latency_sigma", "rate_limit"]:
+            if options[option] < 0:
+                raise CommandError(
+                    "The option {} can not be negative !".format(option)
+                )
+
+        app = create_stub_app(
+            latency=options["latency"],
+            latency_distribution=options["latency_distribution"],
+            latency_sigma=options["latency_sigma"],
+            error_rate=options["error_rate"],
+            rate_limit=options["rate_limit"],
+            seed=options["seed"],
+        )
+        web.run_app(
+            app,
+            host=options["host"],
+            port=options["port"],
+            print=self.stdout.write,
+        )
+        self.stdout.write(
+            "{requests} requests, {errors} errors, {rate_limited} rate"
+            " limited.".format(**app[STATS_KEY])
+        )
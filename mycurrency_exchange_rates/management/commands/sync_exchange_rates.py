@@ -0,0 +1,75 @@
+"""Top up the rates of the last days missing in the database."""
+
+import arrow
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+
+from .bulk_import_exchange_rates_dataset import import_bulk_data
+
+
+def sync_exchange_rates(days: int, source_currencies: list = None) -> dict:
+    """Import only the rates missing over the last days, until yesterday.
+
+    Args:
+        days (int): the number of days to check, yesterday included.
+        source_currencies (list, optional): the codes of the currencies to sync. Defaults to all the stored currencies.
+
+    Returns:
+        dict: the report of import_bulk_data.
+    """
+    to_date = arrow.utcnow().floor("day").shift(days=-1)
+    return import_bulk_data(
+        source_currencies=source_currencies
+        or sorted(currency_registry.get_ids()),
+        from_date=to_date.shift(days=-(days - 1)),
+        to_date=to_date,
+        only_missing=True,
+    )
+
+
+class Command(BaseCommand):
+    """Provide a CLI option for manage.py to top up the rates of the last days, e.g. every night."""
+
+    help = "Import the rates missing over the last days."
+
+    def add_arguments(self, parser):
+        """Declare the options of the command."""
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SYNC_EXCHANGE_RATES_DAYS,
+            help="Number of days to check, yesterday included.",
+        )
+        parser.add_argument(
+            "--currencies",
+            type=lambda value: [
+                code.strip().upper()
+                for code in value.split(",")
+                if code.strip()
+            ],
+            default=None,
+            help="Comma separated codes of the currencies to sync.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the manage py command."""
+        if options["days"] < 1:
+            raise CommandError("The option days must be positive !")
+
+        report = sync_exchange_rates(options["days"], options["currencies"])
+
+        self.stdout.write(
+            "{} provider calls ({} failed), stored {} rates.".format(
+                report["api_calls"],
+                report["failed_api_calls"],
+                report["stored_rates"],
+            )
+        )
+        if report["failed_api_calls"]:
+            raise CommandError(
+                "Some rates were not imported, run the command again."
+            )
@@ -0,0 +1,81 @@
+# Generated by Django 5.2 on 2026-10-18 18:07
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicated_exchange_rates(apps, schema_editor):
+    """Keep only the last stored rate of each pair of currencies and date."""
+    CurrencyExchangeRate = apps.get_model(
+        "mycurrency_exchange_rates", "CurrencyExchangeRate"
+    )
+    exchange_rates = CurrencyExchangeRate.objects.using(
+        schema_editor.connection.alias
+    )
+    duplicated_groups = (
+        exchange_rates.values(
+            "source_currency_id", "exchanged_currency_id", "valuation_date"
+        )
+        .annotate(last_id=Max("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in duplicated_groups:
+        exchange_rates.filter(
+            source_currency_id=group["source_currency_id"],
+            exchanged_currency_id=group["exchanged_currency_id"],
+            valuation_date=group["valuation_date"],
+        ).exclude(id=group["last_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "mycurrency_exchange_rates",
+            "0004_alter_exchangerateprovider_provider_name",
+        ),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="currency",
+            options={
+                "verbose_name": "Currency",
+                "verbose_name_plural": "Currencies",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="currencyexchangerate",
+            options={
+                "ordering": ["source_currency"],
+                "verbose_name": "Currency Exchange Rate",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="exchangerateprovider",
+            options={
+                "ordering": ["-priority"],
+                "verbose_name": "Provider for exchange rates",
+                "verbose_name_plural": "Providers for exchange rates",
+            },
+        ),
+        migrations.AlterField(
+            model_name="currencyexchangerate",
+            name="rate_value",
+            field=models.DecimalField(decimal_places=6, max_digits=18),
+        ),
+        migrations.RunPython(
+            remove_duplicated_exchange_rates, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="currencyexchangerate",
+            constraint=models.UniqueConstraint(
+                fields=(
+                    "source_currency",
+                    "exchanged_currency",
+                    "valuation_date",
+                ),
+                name="unique_exchange_rate_per_day",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "mycurrency_exchange_rates",
+            "0005_currencyexchangerate_unique_per_day",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source_currency_code", models.CharField(max_length=3)),
+                ("symbols", models.CharField(max_length=1000)),
+                ("from_date", models.DateField()),
+                ("to_date", models.DateField()),
+                ("stored_rates", models.IntegerField(default=0)),
+                ("completed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Import checkpoint",
+                "verbose_name_plural": "Import checkpoints",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "source_currency_code",
+                            "from_date",
+                            "to_date",
+                        ),
+                        name="unique_import_checkpoint",
+                    )
+                ],
+            },
+        ),
+    ]
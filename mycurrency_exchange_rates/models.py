@@ -51,9 +51,7 @@ class CurrencyExchangeRate(models.Model):
     )
     exchanged_currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
     valuation_date = models.DateField(db_index=True)
-    rate_value = models.DecimalField(
-        db_index=True, decimal_places=6, max_digits=18
-    )
+    rate_value = models.DecimalField(decimal_places=6, max_digits=18)
 
     def __str__(self):
         """Add readibility for the model."""
@@ -68,4 +66,46 @@ class CurrencyExchangeRate(models.Model):
         """Set properties about the model and its behaviour."""
 
         ordering = ["source_currency"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "source_currency",
+                    "exchanged_currency",
+                    "valuation_date",
+                ],
+                name="unique_exchange_rate_per_day",
+            )
+        ]
         verbose_name = "Currency Exchange Rate"
+
+
+class ImportCheckpoint(models.Model):
+    """Define a window of dates of a bulk import whose rates of a base currency are stored for the symbols."""
+
+    source_currency_code = models.CharField(max_length=3)
+    symbols = models.CharField(max_length=1000)
+    from_date = models.DateField()
+    to_date = models.DateField()
+    stored_rates = models.IntegerField(default=0)
+    completed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """Add readibility for the model."""
+        return "Import of {} -> {} - from {} to {}".format(
+            self.source_currency_code,
+            self.symbols,
+            self.from_date,
+            self.to_date,
+        )
+
+    class Meta:
+        """Set properties about the model and its behaviour."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_currency_code", "from_date", "to_date"],
+                name="unique_import_checkpoint",
+            )
+        ]
+        verbose_name = "Import checkpoint"
+        verbose_name_plural = "Import checkpoints"
@@ -0,0 +1,185 @@
+"""Define the cache service managers."""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+CONVERSION_CACHE_KEY_PREFIX = "c-exchange_rates"
+VERSION_CACHE_KEY_PREFIX = "version"
+
+
+def get_conversion_cache_key(
+    from_currency, to_currency, valuation_date
+) -> str:
+    """Give the cache key of a conversion from its normalized parameters.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+
+    Returns:
+        str: the cache key, identical for every spelling of the same query.
+    """
+    return "{}-{}-{}-{}".format(
+        CONVERSION_CACHE_KEY_PREFIX,
+        from_currency.strip().upper(),
+        to_currency.strip().upper(),
+        valuation_date.isoformat(),
+    )
+
+
+def get_cached_conversion(from_currency, to_currency, valuation_date):
+    """Retrieve the cached answer of a conversion.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+
+    Returns:
+        dict: The cached answer of the conversion or None, also if the cache is not reachable.
+    """
+    try:
+        return cache.get(
+            get_conversion_cache_key(
+                from_currency, to_currency, valuation_date
+            )
+        )
+    except RedisError:
+        logger.warning(
+            "The cached conversion can not be read, it is computed again."
+        )
+        return None
+
+
+async def aget_cached_conversion(from_currency, to_currency, valuation_date):
+    """Retrieve the cached answer of a conversion, asynchronously.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+
+    Returns:
+        dict: The cached answer of the conversion or None, also if the cache is not reachable.
+    """
+    try:
+        return await cache.aget(
+            get_conversion_cache_key(
+                from_currency, to_currency, valuation_date
+            )
+        )
+    except RedisError:
+        logger.warning(
+            "The cached conversion can not be read, it is computed again."
+        )
+        return None
+
+
+def set_cached_conversion(
+    from_currency, to_currency, valuation_date, result: dict
+) -> bool:
+    """Cache the answer of a conversion if it holds a rate value.
+
+    The errors and the answers without rate are not cached, so that they are
+    computed again at the next call.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        result (dict): The answer of the conversion.
+
+    Returns:
+        bool: True if the answer was cached, False otherwise, e.g. if the cache is not reachable.
+    """
+    if "ok" not in result.get("status", "") or "rate_value" not in result:
+        return False
+
+    try:
+        cache.set(
+            get_conversion_cache_key(
+                from_currency, to_currency, valuation_date
+            ),
+            result,
+            settings.CONVERTER_CACHE_TIMEOUT,
+        )
+    except RedisError:
+        logger.warning("The conversion can not be cached.")
+        return False
+    return True
+
+
+async def aset_cached_conversion(
+    from_currency, to_currency, valuation_date, result: dict
+) -> bool:
+    """Cache the answer of a conversion if it holds a rate value, asynchronously.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        result (dict): The answer of the conversion.
+
+    Returns:
+        bool: True if the answer was cached, False otherwise, e.g. if the cache is not reachable.
+    """
+    if "ok" not in result.get("status", "") or "rate_value" not in result:
+        return False
+
+    try:
+        await cache.aset(
+            get_conversion_cache_key(
+                from_currency, to_currency, valuation_date
+            ),
+            result,
+            settings.CONVERTER_CACHE_TIMEOUT,
+        )
+    except RedisError:
+        logger.warning("The conversion can not be cached.")
+        return False
+    return True
+
+
+def get_cache_version(name: str) -> int | None:
+    """Read the version shared by all the workers of an in-process data.
+
+    Args:
+        name (str): The name of the versioned data.
+
+    Returns:
+        int: The current version, 0 if it was never bumped, or None if the cache is not reachable.
+    """
+    try:
+        return cache.get("{}-{}".format(VERSION_CACHE_KEY_PREFIX, name), 0)
+    except RedisError:
+        logger.warning("The version of {} can not be read.".format(name))
+        return None
+
+
+def bump_cache_version(name: str) -> int | None:
+    """Increment the version of an in-process data, so that the other workers reload it.
+
+    Args:
+        name (str): The name of the versioned data.
+
+    Returns:
+        int: The new version, or None if the cache is not reachable.
+    """
+    key = "{}-{}".format(VERSION_CACHE_KEY_PREFIX, name)
+    try:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # the version was never bumped, or was evicted from the cache
+            if cache.add(key, 1, timeout=None):
+                return 1
+            return cache.incr(key)
+    except RedisError:
+        logger.warning("The version of {} can not be bumped.".format(name))
+        return None
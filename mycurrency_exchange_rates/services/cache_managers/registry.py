@@ -0,0 +1,76 @@
+"""Define the base of the in-process registries, kept in line between the workers by a version shared in the cache."""
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+from .managers import bump_cache_version, get_cache_version
+
+
+class VersionedRegistry:
+    """Keep data read from the database once per process, reloaded when its shared version changes.
+
+    The registry is emptied in the process writing the data, e.g. by the
+    signals of its model. The other workers see the change through a
+    version shared in the cache, read at most once per check interval.
+
+    The subclasses give the name of the version and load the data.
+    """
+
+    version_name = None
+
+    def __init__(self, check_interval):
+        """Init an empty registry.
+
+        Args:
+            check_interval (int): The seconds between two reads of the shared version.
+        """
+        self.check_interval = check_interval
+        self._data = None
+        self._version = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the data of the registry from the database."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Empty the registry of the process, it is reloaded at the next lookup."""
+        with self._lock:
+            self._data = None
+
+    def invalidate(self):
+        """Empty the registry of the process and make the other workers reload theirs."""
+        self.clear()
+        bump_cache_version(self.version_name)
+
+    def _is_stale(self) -> bool:
+        return self._data is None or time.monotonic() >= self._next_check
+
+    async def _arefresh(self):
+        # the database and the cache are only queried when the registry must
+        # be checked, the other lookups stay in the event loop
+        data = self._data
+        if data is None or self._is_stale():
+            data = await sync_to_async(self._refresh)()
+        return data
+
+    def _refresh(self):
+        data = self._data
+        if data is not None and not self._is_stale():
+            return data
+
+        with self._lock:
+            if not self._is_stale():
+                return self._data
+
+            version = get_cache_version(self.version_name)
+            if self._data is None or version != self._version:
+                # the version is read before the data, a change made in
+                # between is seen at the next check
+                self._data = self.load()
+                self._version = version
+            self._next_check = time.monotonic() + self.check_interval
+            return self._data
@@ -0,0 +1,112 @@
+"""Define the coalescing of the concurrent fetches of a same key."""
+
+import contextlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_KEY_PREFIX = "single-flight"
+
+
+class _Call:
+    """Hold the state of a fetch in flight for a key."""
+
+    def __init__(self):
+        """Init the fetch in flight."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _distributed_lock(key: str):
+    """Hold the lock of a key shared by all the workers through the cache."""
+    lock_factory = getattr(cache, "lock", None)
+    if lock_factory is None:
+        # the cache backend can not share a lock between the workers
+        yield
+        return
+
+    lock = lock_factory(
+        "{}-{}".format(SINGLE_FLIGHT_KEY_PREFIX, key),
+        timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT,
+    )
+    acquired = False
+    try:
+        acquired = lock.acquire(
+            blocking=True, blocking_timeout=settings.SINGLE_FLIGHT_TIMEOUT
+        )
+    except RedisError:
+        logger.warning(
+            "The lock of {} can not be acquired, the fetch is not"
+            " coalesced between the workers.".format(key)
+        )
+
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except RedisError:
+                logger.warning("The lock of {} was lost.".format(key))
+
+
+def single_flight(key: str, fetch, lookup=None):
+    """Run only one fetch of a key at a time and share its result with the concurrent callers.
+
+    In the process, the callers arriving while a fetch of the key is in
+    flight wait for its result. Between the workers, the fetches of the key
+    are serialized by a lock in the cache. Once the lock is held, the data
+    is looked up again, whether the lock was waited for or not, since a
+    previous fetch may have stored it and released the lock just before.
+
+    Args:
+        key (str): The key identifying the fetched data.
+        fetch (function): The function fetching (and storing) the data.
+        lookup (function, optional): The function reading the data stored by another worker. It returns None when the data is missing. Defaults to None.
+
+    Returns:
+        The result of the lookup or of the fetch.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = _calls[key] = _Call()
+
+    if not is_leader:
+        if not call.done.wait(settings.SINGLE_FLIGHT_TIMEOUT):
+            logger.warning(
+                "The fetch in flight of {} is too long, fetching again.".format(
+                    key
+                )
+            )
+            return fetch()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        with _distributed_lock(key):
+            result = lookup() if lookup is not None else None
+            if result is None:
+                result = fetch()
+        call.result = result
+        return result
+    except Exception as error:
+        call.error = error
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
@@ -0,0 +1,174 @@
+"""Define the coverage of the stored rates over intervals of dates."""
+
+import datetime
+import functools
+import operator
+
+from django.db.models import Count, Q
+
+from mycurrency_exchange_rates.models import CurrencyExchangeRate
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def get_missing_intervals(pairs: list, from_date, to_date) -> dict:
+    """Find the exact intervals of dates without stored rate for pairs of currencies.
+
+    The stored days of all the pairs are counted with one grouped query.
+    The pairs fully covered or not covered at all are answered by their
+    count, only the dates of the partially covered pairs are read, with one
+    more query.
+
+    Args:
+        pairs (list): tuples (base currency code, target currency code).
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+
+    Returns:
+        dict: lists of tuples (start date, end date) of the missing days, indexed by pair.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    currencies = currency_registry.get_ids()
+    pair_ids = {
+        (currencies[from_code], currencies[to_code]): (from_code, to_code)
+        for from_code, to_code in pairs
+        if from_code in currencies and to_code in currencies
+    }
+    missing_intervals = {pair: [(from_date, to_date)] for pair in pairs}
+    if not pair_ids or to_date < from_date:
+        return missing_intervals
+
+    exchange_rates = CurrencyExchangeRate.objects.filter(
+        source_currency_id__in={ids[0] for ids in pair_ids},
+        exchanged_currency_id__in={ids[1] for ids in pair_ids},
+        valuation_date__range=[from_date, to_date],
+    )
+    nb_days = (to_date - from_date).days + 1
+    partial_pairs = []
+    for source_id, exchanged_id, stored_days in (
+        exchange_rates.values("source_currency_id", "exchanged_currency_id")
+        .annotate(stored_days=Count("id"))
+        .values_list(
+            "source_currency_id", "exchanged_currency_id", "stored_days"
+        )
+        .order_by()
+    ):
+        pair = pair_ids.get((source_id, exchanged_id))
+        if pair is None:
+            continue
+        if stored_days >= nb_days:
+            missing_intervals[pair] = []
+        else:
+            partial_pairs.append((source_id, exchanged_id))
+
+    if not partial_pairs:
+        return missing_intervals
+
+    stored_dates = {}
+    for source_id, exchanged_id, valuation_date in (
+        exchange_rates.filter(
+            functools.reduce(
+                operator.or_,
+                [
+                    Q(
+                        source_currency_id=source_id,
+                        exchanged_currency_id=exchanged_id,
+                    )
+                    for source_id, exchanged_id in partial_pairs
+                ],
+            )
+        )
+        .values_list(
+            "source_currency_id", "exchanged_currency_id", "valuation_date"
+        )
+        .order_by("valuation_date")
+    ):
+        stored_dates.setdefault(
+            pair_ids[(source_id, exchanged_id)], []
+        ).append(valuation_date)
+
+    for pair, dates in stored_dates.items():
+        missing_intervals[pair] = get_gaps(dates, from_date, to_date)
+    return missing_intervals
+
+
+def get_gaps(stored_dates: list, from_date, to_date) -> list:
+    """Give the intervals of an interval of dates not covered by sorted stored dates.
+
+    Args:
+        stored_dates (list): The sorted dates stored in the interval.
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+
+    Returns:
+        list: tuples (start date, end date) of the missing days.
+    """
+    gaps = []
+    next_date = from_date
+    for stored_date in stored_dates:
+        if stored_date > next_date:
+            gaps.append((next_date, stored_date - ONE_DAY))
+        next_date = max(next_date, stored_date + ONE_DAY)
+    if next_date <= to_date:
+        gaps.append((next_date, to_date))
+    return gaps
+
+
+def get_missing_intervals_by_source(
+    source_currencies: list, to_currencies: list, from_date, to_date
+) -> dict:
+    """Merge the missing intervals of the pairs of each base currency.
+
+    The overlapping or adjacent missing intervals of the target currencies
+    of a base currency are merged, so that each merged interval can be
+    requested with one provider call.
+
+    Args:
+        source_currencies (list): The currency codes for the base currencies
+        to_currencies (list): The currency codes for the target currencies
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+
+    Returns:
+        dict: lists of tuples (start date, end date, sorted missing target currency codes), indexed by base currency code.
+    """
+    missing_intervals = get_missing_intervals(
+        [
+            (from_code, to_code)
+            for from_code in source_currencies
+            for to_code in to_currencies
+            if from_code != to_code
+        ],
+        from_date,
+        to_date,
+    )
+
+    intervals_by_source = {}
+    for from_code in source_currencies:
+        intervals = sorted(
+            (start_date, end_date, to_code)
+            for (pair_from_code, to_code), gaps in missing_intervals.items()
+            if pair_from_code == from_code
+            for start_date, end_date in gaps
+        )
+        merged_intervals = []
+        for start_date, end_date, to_code in intervals:
+            if (
+                merged_intervals
+                and start_date <= merged_intervals[-1][1] + ONE_DAY
+            ):
+                merged_intervals[-1][1] = max(
+                    merged_intervals[-1][1], end_date
+                )
+                merged_intervals[-1][2].add(to_code)
+            else:
+                merged_intervals.append([start_date, end_date, {to_code}])
+
+        intervals_by_source[from_code] = [
+            (start_date, end_date, sorted(to_codes))
+            for start_date, end_date, to_codes in merged_intervals
+        ]
+    return intervals_by_source
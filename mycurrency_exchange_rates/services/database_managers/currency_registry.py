@@ -0,0 +1,58 @@
+"""Define the in-process registry of the known currencies."""
+
+from django.conf import settings
+
+from mycurrency_exchange_rates.models import Currency
+from mycurrency_exchange_rates.services.cache_managers.registry import (
+    VersionedRegistry,
+)
+
+CURRENCY_REGISTRY_VERSION_NAME = "currency-registry"
+
+
+class CurrencyRegistry(VersionedRegistry):
+    """Map the codes of the stored currencies to their ids, loaded once per process.
+
+    The registry is emptied by the signals of the Currency model.
+    """
+
+    version_name = CURRENCY_REGISTRY_VERSION_NAME
+
+    def load(self) -> dict:
+        """Read the ids of the currencies, indexed by code."""
+        return dict(Currency.objects.values_list("code", "id"))
+
+    def get_id(self, currency_code: str) -> int | None:
+        """Give the id of a currency.
+
+        Args:
+            currency_code (str): The code for the currency to lookup.
+
+        Returns:
+            int: The id of the currency or None if it is unknown.
+        """
+        return self._refresh().get(currency_code)
+
+    async def aget_id(self, currency_code: str) -> int | None:
+        """Give the id of a currency, asynchronously.
+
+        Args:
+            currency_code (str): The code for the currency to lookup.
+
+        Returns:
+            int: The id of the currency or None if it is unknown.
+        """
+        return (await self._arefresh()).get(currency_code)
+
+    def get_ids(self) -> dict:
+        """Give the ids of all the currencies.
+
+        Returns:
+            dict: The ids indexed by currency code.
+        """
+        return self._refresh()
+
+
+currency_registry = CurrencyRegistry(
+    check_interval=settings.CURRENCY_REGISTRY_CHECK_INTERVAL
+)
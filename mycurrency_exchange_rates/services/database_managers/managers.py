@@ -1,26 +1,216 @@
 """Define the databse service managers."""
 
+import itertools
+import threading
+import time
+from collections import OrderedDict
 from decimal import Decimal
 
 import arrow
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 
 from mycurrency_exchange_rates.models import (
-    Currency,
     CurrencyExchangeRate,
     ExchangeRateProvider,
 )
+from mycurrency_exchange_rates.services.cache_managers.managers import (
+    bump_cache_version,
+    get_cache_version,
+)
+from mycurrency_exchange_rates.services.database_managers.coverage import (
+    get_missing_intervals,
+)
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.rate_graph import (
+    RATE_PRECISION,
+    build_rate_graph,
+    resolve_cross_rate,
+)
+
+UPSERT_OPTIONS = {
+    "update_conflicts": True,
+    "unique_fields": [
+        "source_currency",
+        "exchanged_currency",
+        "valuation_date",
+    ],
+    "update_fields": ["rate_value"],
+}
+
+RATE_CACHE_VERSION_NAME = "rate-cache"
+
+
+class RateCache:
+    """Keep the rate values of pairs of currencies in a bounded in-process LRU cache.
+
+    The entries are keyed by (source currency code, exchanged currency code,
+    valuation date). The rates of the current day expire after a time to
+    live. The rates of the past days leave the cache when it is full, or
+    when a stored rate is updated: the update bumps a version shared in the
+    cache by the workers, read at most once per check interval, and each
+    worker seeing a new version empties its rate cache.
+    """
+
+    def __init__(self, max_size: int, ttl: float, check_interval: float):
+        """Init the cache.
+
+        Args:
+            max_size (int): the maximum number of entries kept in the cache.
+            ttl (float): the time to live in seconds of the rates of the current day.
+            check_interval (float): the seconds between two reads of the shared version.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        if time.monotonic() < self._next_check:
+            return
+
+        version = get_cache_version(RATE_CACHE_VERSION_NAME)
+        with self._lock:
+            # the entries cached before the first read of the version are
+            # fresh, and the updates can not be shared while the cache is not
+            # reachable, the entries are kept in both cases
+            if self._next_check and version not in (None, self._version):
+                self._entries.clear()
+            if version is not None:
+                self._version = version
+            self._next_check = time.monotonic() + self.check_interval
+
+    def get(self, key: tuple):
+        """Give the cached value of a key.
+
+        Args:
+            key (tuple): (source currency code, exchanged currency code, valuation date)
+
+        Returns:
+            tuple: the tuple (rate value, derivation) or None if the key is not cached.
+        """
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry[1] is not None and entry[1] < time.monotonic()
+            ):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    async def aget(self, key: tuple):
+        """Give the cached value of a key, the shared version is read out of the event loop.
+
+        Args:
+            key (tuple): (source currency code, exchanged currency code, valuation date)
+
+        Returns:
+            tuple: the tuple (rate value, derivation) or None if the key is not cached.
+        """
+        if time.monotonic() >= self._next_check:
+            await sync_to_async(self._check_version)()
+        return self.get(key)
+
+    def set(self, key: tuple, rate_value: Decimal, derivation=None):
+        """Cache the rate value of a key.
+
+        Args:
+            key (tuple): (source currency code, exchanged currency code, valuation date)
+            rate_value (Decimal): the rate value of the pair of currencies at the date.
+            derivation (dict, optional): How the rate was derived from other stored rates. Defaults to None.
+        """
+        if self.max_size <= 0:
+            return
+
+        expires_at = None
+        if key[2] >= arrow.utcnow().date():
+            expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._entries[key] = ((rate_value, derivation), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all the entries of the cache of the process and reset its counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self._next_check = 0
+
+    def invalidate(self):
+        """Remove all the entries of the cache and make the other workers empty theirs."""
+        version = bump_cache_version(RATE_CACHE_VERSION_NAME)
+        with self._lock:
+            self._entries.clear()
+            if version is not None:
+                self._version = version
+
+    def stats(self) -> dict:
+        """Give the counters of the cache.
+
+        Returns:
+            dict: the number of hits, misses and entries, and the maximum size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+rate_cache = RateCache(
+    max_size=settings.RATE_CACHE_MAX_SIZE,
+    ttl=settings.RATE_CACHE_TTL,
+    check_interval=settings.RATE_CACHE_CHECK_INTERVAL,
+)
 
 
-def is_valid_currency(currency_code: str) -> Currency | None:
+def is_valid_currency(currency_code: str) -> int | None:
     """Indicate if a currency exist in the database.
 
+    The lookup is made in the in-process currency registry.
+
+    Args:
+        currency_code (str): The code for the currency to lookup.
+
+    Returns:
+        int: Return the id of the currency or None.
+    """
+    return currency_registry.get_id(currency_code)
+
+
+async def ais_valid_currency(currency_code: str) -> int | None:
+    """Indicate if a currency exist in the database, asynchronously.
+
     Args:
         currency_code (str): The code for the currency to lookup.
 
     Returns:
-        bool: Return the currency object or None.
+        int: Return the id of the currency or None.
     """
-    return Currency.objects.filter(code=currency_code).first()
+    return await currency_registry.aget_id(currency_code)
 
 
 def get_conversion_from_database(
@@ -43,7 +233,20 @@ def get_conversion_from_database(
             "message": "A rate value cannot be read in the future",
         }
 
-    if not is_valid_currency(from_currency):
+    cache_key = (from_currency, to_currency, valuation_date)
+    cached_rate = rate_cache.get(cache_key)
+    if cached_rate is not None:
+        rate_value, derivation = cached_rate
+        return build_conversion_result(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate_value=rate_value,
+            amount=amount,
+            derivation=derivation,
+        )
+
+    from_currency_id = is_valid_currency(from_currency)
+    if not from_currency_id:
         return {
             "status": "ko",
             "message": (
@@ -52,7 +255,8 @@ def get_conversion_from_database(
             ),
         }
 
-    if not is_valid_currency(to_currency):
+    to_currency_id = is_valid_currency(to_currency)
+    if not to_currency_id:
         return {
             "status": "ko",
             "message": (
@@ -61,35 +265,539 @@ def get_conversion_from_database(
             ),
         }
 
-    conversion_rate = (
+    # the currencies are known by id, the rate is read without any join
+    rate_value = (
         CurrencyExchangeRate.objects.filter(
-            source_currency__code=from_currency,
-            exchanged_currency__code=to_currency,
+            source_currency_id=from_currency_id,
+            exchanged_currency_id=to_currency_id,
             valuation_date=valuation_date,
         )
-        .select_related()
+        .values_list("rate_value", flat=True)
         .first()
     )
-    if conversion_rate:
-        converted_amount = conversion_rate.rate_value * amount
-        result = dict(
-            status="ok",
-            provider="BDD",
+    if rate_value is not None:
+        rate_cache.set(cache_key, rate_value)
+        return build_conversion_result(
             from_currency=from_currency,
             to_currency=to_currency,
-            rate_value=str(conversion_rate.rate_value),
+            rate_value=rate_value,
             amount=amount,
-            converted_amount=str(converted_amount),
         )
-        return result
-    else:
+
+    if settings.CONVERTER_DERIVED_RATES_ENABLED:
+        rate_graphs = get_rate_graphs(
+            {from_currency, to_currency}, {valuation_date}
+        )
+        derived_rate = resolve_cross_rate(
+            rate_graphs.get(valuation_date, {}), from_currency, to_currency
+        )
+        if derived_rate:
+            rate_cache.set(
+                cache_key,
+                derived_rate["rate_value"],
+                derived_rate["derivation"],
+            )
+            return build_conversion_result(
+                from_currency=from_currency,
+                to_currency=to_currency,
+                rate_value=derived_rate["rate_value"],
+                amount=amount,
+                derivation=derived_rate["derivation"],
+            )
+
+    return build_missing_rate_result(
+        from_currency, to_currency, valuation_date
+    )
+
+
+async def aget_conversion_from_database(
+    from_currency, to_currency, valuation_date, amount=1
+) -> dict:
+    """Retrieve the rate values for a couple base currency to target currency, asynchronously.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): date for which to find a rate value.
+        amount (int, optional): The amount to translate if indicated. Defaults to 1.
+
+    Returns:
+        dict: The same answer as get_conversion_from_database.
+    """
+    if valuation_date >= arrow.utcnow().shift(days=1).date():
         return {
-            "status": "ok",
-            "message": "No rate available for {} -> {} at {}.".format(
-                from_currency, to_currency, valuation_date
+            "status": "ko",
+            "message": "A rate value cannot be read in the future",
+        }
+
+    cache_key = (from_currency, to_currency, valuation_date)
+    cached_rate = await rate_cache.aget(cache_key)
+    if cached_rate is not None:
+        rate_value, derivation = cached_rate
+        return build_conversion_result(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate_value=rate_value,
+            amount=amount,
+            derivation=derivation,
+        )
+
+    from_currency_id = await ais_valid_currency(from_currency)
+    if not from_currency_id:
+        return {
+            "status": "ko",
+            "message": (
+                "The specified source currency code {} is not available at the"
+                " moment.".format(from_currency)
             ),
         }
 
+    to_currency_id = await ais_valid_currency(to_currency)
+    if not to_currency_id:
+        return {
+            "status": "ko",
+            "message": (
+                "The specified destination currency code {} is not available"
+                " at the moment.".format(to_currency)
+            ),
+        }
+
+    rate_value = await (
+        CurrencyExchangeRate.objects.filter(
+            source_currency_id=from_currency_id,
+            exchanged_currency_id=to_currency_id,
+            valuation_date=valuation_date,
+        )
+        .values_list("rate_value", flat=True)
+        .afirst()
+    )
+    if rate_value is not None:
+        rate_cache.set(cache_key, rate_value)
+        return build_conversion_result(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate_value=rate_value,
+            amount=amount,
+        )
+
+    if settings.CONVERTER_DERIVED_RATES_ENABLED:
+        rate_graphs = await aget_rate_graphs(
+            {from_currency, to_currency}, {valuation_date}
+        )
+        derived_rate = resolve_cross_rate(
+            rate_graphs.get(valuation_date, {}), from_currency, to_currency
+        )
+        if derived_rate:
+            rate_cache.set(
+                cache_key,
+                derived_rate["rate_value"],
+                derived_rate["derivation"],
+            )
+            return build_conversion_result(
+                from_currency=from_currency,
+                to_currency=to_currency,
+                rate_value=derived_rate["rate_value"],
+                amount=amount,
+                derivation=derived_rate["derivation"],
+            )
+
+    return build_missing_rate_result(
+        from_currency, to_currency, valuation_date
+    )
+
+
+def get_rate_graphs(currency_codes: set, valuation_dates: set) -> dict:
+    """Build the graphs of the stored rates involving some currencies, for each date.
+
+    The rates are read with one query: every stored rate whose source or
+    exchanged currency is one of the currencies, at one of the dates.
+
+    Args:
+        currency_codes (set): The codes of the currencies to reach.
+        valuation_dates (set): The dates of the rates.
+
+    Returns:
+        dict: The rate graphs indexed by date.
+    """
+    return _build_rate_graphs(
+        _get_rate_graphs_queryset(currency_codes, valuation_dates)
+    )
+
+
+async def aget_rate_graphs(currency_codes: set, valuation_dates: set) -> dict:
+    """Build the graphs of the stored rates involving some currencies, for each date, asynchronously.
+
+    Args:
+        currency_codes (set): The codes of the currencies to reach.
+        valuation_dates (set): The dates of the rates.
+
+    Returns:
+        dict: The rate graphs indexed by date.
+    """
+    return _build_rate_graphs(
+        [
+            row
+            async for row in _get_rate_graphs_queryset(
+                currency_codes, valuation_dates
+            )
+        ]
+    )
+
+
+def _get_rate_graphs_queryset(currency_codes: set, valuation_dates: set):
+    return (
+        CurrencyExchangeRate.objects.filter(valuation_date__in=valuation_dates)
+        .filter(
+            Q(source_currency__code__in=currency_codes)
+            | Q(exchanged_currency__code__in=currency_codes)
+        )
+        .values_list(
+            "source_currency__code",
+            "exchanged_currency__code",
+            "valuation_date",
+            "rate_value",
+        )
+    )
+
+
+def _build_rate_graphs(rows) -> dict:
+    exchange_rates = {}
+    for source_code, exchanged_code, valuation_date, rate_value in rows:
+        exchange_rates.setdefault(valuation_date, []).append(
+            (source_code, exchanged_code, rate_value)
+        )
+
+    return {
+        valuation_date: build_rate_graph(day_rates)
+        for valuation_date, day_rates in exchange_rates.items()
+    }
+
+
+def build_conversion_result(
+    from_currency, to_currency, rate_value: Decimal, amount=1, derivation=None
+) -> dict:
+    """Build the answer of a conversion found in the database.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        rate_value (Decimal): The rate value stored for the pair of currencies
+        amount (int, optional): The amount to translate. Defaults to 1.
+        derivation (dict, optional): How the rate was derived from other stored rates. Defaults to None for a stored rate.
+
+    Returns:
+        dict: A dictionary containing the status, a recap of the input, the rate value and the calculated amount.
+    """
+    converted_amount = rate_value * amount
+    result = dict(
+        status="ok",
+        provider="BDD",
+        from_currency=from_currency,
+        to_currency=to_currency,
+        rate_value=str(rate_value),
+        amount=amount,
+        converted_amount=str(converted_amount),
+    )
+    if derivation is not None:
+        result["derived"] = True
+        result["derivation"] = derivation
+    return result
+
+
+def build_missing_rate_result(from_currency, to_currency, valuation_date):
+    """Build the answer when no rate is stored for a pair of currencies at a date.
+
+    Args:
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+        valuation_date (date): The date of the missing rate
+
+    Returns:
+        dict: A dictionary with an ok status and a message explaining that the rate is missing.
+    """
+    return {
+        "status": "ok",
+        "message": "No rate available for {} -> {} at {}.".format(
+            from_currency, to_currency, valuation_date
+        ),
+    }
+
+
+def get_conversions_from_database(conversion_requests: list) -> list:
+    """Retrieve the rate values for many couples of currencies and dates at once.
+
+    The rates found in the in-process rate cache are answered first. For the
+    others, the currencies are checked in the currency registry and all the
+    rates are read with one set-based query, whatever the number of
+    requested conversions. The rates missing are derived from the other stored rates
+    with one more query.
+
+    Args:
+        conversion_requests (list): list of dictionaries with the keys from_currency, to_currency, valuation_date and amount.
+
+    Returns:
+        list: The results of get_conversion_from_database for each request, in the same order.
+    """
+    tomorrow = arrow.utcnow().shift(days=1).date()
+    cached_rates = {}
+    currency_codes = set()
+    valuation_dates = set()
+    for conversion in conversion_requests:
+        key = (
+            conversion["from_currency"],
+            conversion["to_currency"],
+            conversion["valuation_date"],
+        )
+        if key[2] >= tomorrow or key in cached_rates:
+            continue
+
+        cached_rate = rate_cache.get(key)
+        if cached_rate is not None:
+            cached_rates[key] = cached_rate
+        else:
+            currency_codes.update(key[:2])
+            valuation_dates.add(key[2])
+
+    available_codes = set()
+    stored_rates = {}
+    rate_graphs = {}
+    if currency_codes:
+        currency_ids = currency_registry.get_ids()
+        available_codes = currency_codes.intersection(currency_ids)
+        # the rates are filtered on the ids, without joining the currencies
+        codes = {currency_ids[code]: code for code in available_codes}
+        stored_rates = {
+            (codes[source_id], codes[exchanged_id], valuation_date): rate_value
+            for (
+                source_id,
+                exchanged_id,
+                valuation_date,
+                rate_value,
+            ) in CurrencyExchangeRate.objects.filter(
+                source_currency_id__in=codes,
+                exchanged_currency_id__in=codes,
+                valuation_date__in=valuation_dates,
+            ).values_list(
+                "source_currency_id",
+                "exchanged_currency_id",
+                "valuation_date",
+                "rate_value",
+            )
+        }
+
+    if settings.CONVERTER_DERIVED_RATES_ENABLED:
+        missing_keys = {
+            (
+                conversion["from_currency"],
+                conversion["to_currency"],
+                conversion["valuation_date"],
+            )
+            for conversion in conversion_requests
+            if conversion["from_currency"] in available_codes
+            and conversion["to_currency"] in available_codes
+            and conversion["valuation_date"] in valuation_dates
+        }.difference(stored_rates, cached_rates)
+        if missing_keys:
+            rate_graphs = get_rate_graphs(
+                {code for key in missing_keys for code in key[:2]},
+                {key[2] for key in missing_keys},
+            )
+
+    results = []
+    for conversion in conversion_requests:
+        from_currency = conversion["from_currency"]
+        to_currency = conversion["to_currency"]
+        valuation_date = conversion["valuation_date"]
+        key = (from_currency, to_currency, valuation_date)
+
+        if valuation_date >= tomorrow:
+            results.append(
+                {
+                    "status": "ko",
+                    "message": "A rate value cannot be read in the future",
+                }
+            )
+        elif key in cached_rates:
+            rate_value, derivation = cached_rates[key]
+            results.append(
+                build_conversion_result(
+                    from_currency=from_currency,
+                    to_currency=to_currency,
+                    rate_value=rate_value,
+                    amount=conversion.get("amount", 1),
+                    derivation=derivation,
+                )
+            )
+        elif from_currency not in available_codes:
+            results.append(
+                {
+                    "status": "ko",
+                    "message": (
+                        "The specified source currency code {} is not"
+                        " available at the moment.".format(from_currency)
+                    ),
+                }
+            )
+        elif to_currency not in available_codes:
+            results.append(
+                {
+                    "status": "ko",
+                    "message": (
+                        "The specified destination currency code {} is not"
+                        " available at the moment.".format(to_currency)
+                    ),
+                }
+            )
+        elif key in stored_rates:
+            cached_rates[key] = (stored_rates[key], None)
+            rate_cache.set(key, stored_rates[key])
+            results.append(
+                build_conversion_result(
+                    from_currency=from_currency,
+                    to_currency=to_currency,
+                    rate_value=stored_rates[key],
+                    amount=conversion.get("amount", 1),
+                )
+            )
+        else:
+            derived_rate = resolve_cross_rate(
+                rate_graphs.get(valuation_date, {}), from_currency, to_currency
+            )
+            if derived_rate:
+                cached_rates[key] = (
+                    derived_rate["rate_value"],
+                    derived_rate["derivation"],
+                )
+                rate_cache.set(
+                    key,
+                    derived_rate["rate_value"],
+                    derived_rate["derivation"],
+                )
+                results.append(
+                    build_conversion_result(
+                        from_currency=from_currency,
+                        to_currency=to_currency,
+                        rate_value=derived_rate["rate_value"],
+                        amount=conversion.get("amount", 1),
+                        derivation=derived_rate["derivation"],
+                    )
+                )
+            else:
+                results.append(
+                    build_missing_rate_result(
+                        from_currency, to_currency, valuation_date
+                    )
+                )
+
+    return results
+
+
+def get_currency_rates_from_database(
+    from_currency, to_currencies: list, from_date, to_date
+) -> dict:
+    """Retrieve the stored rate values of a base currency for many target currencies over an interval.
+
+    Args:
+        from_currency (str): The currency code for the base currency
+        to_currencies (list): The currency codes for the target currencies
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+
+    Returns:
+        dict: The rate values indexed by date, then by target currency code.
+    """
+    stored_rates = {}
+    for (
+        exchanged_code,
+        valuation_date,
+        rate_value,
+    ) in CurrencyExchangeRate.objects.filter(
+        source_currency__code=from_currency,
+        exchanged_currency__code__in=to_currencies,
+        valuation_date__range=[from_date, to_date],
+    ).values_list(
+        "exchanged_currency__code", "valuation_date", "rate_value"
+    ):
+        stored_rates.setdefault(valuation_date, {})[
+            exchanged_code
+        ] = rate_value
+
+    return stored_rates
+
+
+def get_missing_rates_intervals(
+    stored_rates: dict, to_currencies: list, from_date, to_date
+) -> list:
+    """Find the sub-intervals of dates for which some rates are not stored.
+
+    Args:
+        stored_rates (dict): The rate values indexed by date, then by target currency code.
+        to_currencies (list): The currency codes for the expected target currencies
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+
+    Returns:
+        list: tuples (start date, end date, missing target currency codes) of consecutive incomplete days.
+    """
+    intervals = []
+    current_interval = None
+    for a_tuple in arrow.Arrow.span_range(
+        "day", arrow.get(from_date), arrow.get(to_date)
+    ):
+        day = a_tuple[0].date()
+        missing_currencies = set(to_currencies) - set(
+            stored_rates.get(day, {})
+        )
+        if not missing_currencies:
+            current_interval = None
+            continue
+
+        if current_interval is None:
+            current_interval = [day, day, missing_currencies]
+            intervals.append(current_interval)
+        else:
+            current_interval[1] = day
+            current_interval[2] |= missing_currencies
+
+    return [
+        (start_date, end_date, sorted(missing_currencies))
+        for start_date, end_date, missing_currencies in intervals
+    ]
+
+
+def get_prefetch_currencies(
+    from_currency, to_currency, valuation_date
+) -> list:
+    """Give the codes of the currencies to prefetch along with a missing conversion.
+
+    They are all the known currencies without a rate from the base currency
+    stored for the date, other than the base and the target currencies.
+
+    Args:
+        from_currency (str): The currency code for the base currency
+        to_currency (str): The currency code for the target currency
+        valuation_date (date): The date of the rate value
+
+    Returns:
+        list: The sorted currency codes to prefetch.
+    """
+    currencies = currency_registry.get_ids()
+    if from_currency not in currencies:
+        return []
+
+    stored_ids = set(
+        CurrencyExchangeRate.objects.filter(
+            source_currency_id=currencies[from_currency],
+            valuation_date=valuation_date,
+        ).values_list("exchanged_currency_id", flat=True)
+    )
+    return sorted(
+        currency_code
+        for currency_code, currency_id in currencies.items()
+        if currency_code not in (from_currency, to_currency)
+        and currency_id not in stored_ids
+    )
+
 
 def get_number_of_consecutive_days(
     from_currency, to_currency, from_date, to_date
@@ -105,15 +813,11 @@ def get_number_of_consecutive_days(
     Returns:
         int: The number of existing consecutives days of rating for the pair currency A / currency B
     """
-    return (
-        CurrencyExchangeRate.objects.filter(
-            source_currency__code=from_currency,
-            exchanged_currency__code=to_currency,
-            valuation_date__range=[from_date, to_date],
-        )
-        .select_related()
-        .count()
-    )
+    return CurrencyExchangeRate.objects.filter(
+        source_currency__code=from_currency,
+        exchanged_currency__code=to_currency,
+        valuation_date__range=[from_date, to_date],
+    ).count()
 
 
 def exists_currency_rates_during_interval_for_pair_of_currencies(
@@ -133,12 +837,10 @@ def exists_currency_rates_during_interval_for_pair_of_currencies(
     Returns:
         bool: True if the interval is filled by rates. False otherwise.
     """
-    return get_number_of_consecutive_days(
-        from_currency=from_currency_code,
-        to_currency=to_currency_code,
-        from_date=from_date.date(),
-        to_date=to_date.date(),
-    ) == len(list(arrow.Arrow.span_range("day", from_date, to_date)))
+    pair = (from_currency_code, to_currency_code)
+    return not get_missing_intervals([pair], from_date.date(), to_date.date())[
+        pair
+    ]
 
 
 def set_next_provider_by_priority() -> dict:
@@ -174,21 +876,198 @@ def set_next_provider_by_priority() -> dict:
     }
 
 
+def has_updated_rates(exchange_rates: list) -> bool:
+    """Indicate if storing exchange rates changes the value of rates already stored.
+
+    Only these updates can make the cached rates outdated, the new rates are
+    cached by the managers storing them.
+
+    Args:
+        exchange_rates (list): The CurrencyExchangeRate objects to store.
+
+    Returns:
+        bool: True if a stored rate has another value, False otherwise.
+    """
+    rate_values = {
+        (
+            exchange_rate.source_currency_id,
+            exchange_rate.exchanged_currency_id,
+            str(exchange_rate.valuation_date),
+        ): (
+            Decimal(exchange_rate.rate_value).quantize(RATE_PRECISION)
+        )
+        for exchange_rate in exchange_rates
+    }
+    stored_rates = CurrencyExchangeRate.objects.filter(
+        source_currency_id__in={key[0] for key in rate_values},
+        exchanged_currency_id__in={key[1] for key in rate_values},
+        valuation_date__in={key[2] for key in rate_values},
+    ).values_list(
+        "source_currency_id",
+        "exchanged_currency_id",
+        "valuation_date",
+        "rate_value",
+    )
+    return any(
+        rate_values.get(
+            (source_id, exchanged_id, str(valuation_date)), rate_value
+        )
+        != rate_value
+        for source_id, exchanged_id, valuation_date, rate_value in stored_rates
+    )
+
+
+def upsert_exchange_rates(exchange_rates: list) -> list:
+    """Insert the exchange rates, or update the rate value of those already stored.
+
+    The rates are written with one statement relying on the unique
+    constraint of a pair of currencies and a date, so that the concurrent
+    or repeated stores of a same rate never duplicate it. When a stored
+    rate value changes, the rate cache of all the workers is invalidated
+    once the transaction is committed.
+
+    Args:
+        exchange_rates (list): The CurrencyExchangeRate objects to store.
+
+    Returns:
+        list: The stored objects.
+    """
+    updated_rates = has_updated_rates(exchange_rates)
+    stored_rates = CurrencyExchangeRate.objects.bulk_create(
+        exchange_rates, **UPSERT_OPTIONS
+    )
+    if updated_rates:
+        transaction.on_commit(rate_cache.invalidate)
+    return stored_rates
+
+
 def store_conversion_to_DB(
     from_currency_code: str, to_currency_code: str, rate_value, valuated_date
 ):
     """Store a rate conversion to the database."""
-    print("from_currency_code => {}".format(from_currency_code))
-    print("to_currency_code => {}".format(to_currency_code))
-    print("rate_value => {}".format(rate_value))
-    print("valuated_date => {}".format(valuated_date))
-    CurrencyExchangeRate.objects.create(
-        source_currency=Currency.objects.filter(
-            code=from_currency_code
-        ).first(),
-        exchanged_currency=Currency.objects.filter(
-            code=to_currency_code
-        ).first(),
-        valuation_date=valuated_date,
-        rate_value=Decimal(rate_value),
+    upsert_exchange_rates(
+        [
+            CurrencyExchangeRate(
+                source_currency_id=currency_registry.get_id(
+                    from_currency_code
+                ),
+                exchanged_currency_id=currency_registry.get_id(
+                    to_currency_code
+                ),
+                valuation_date=valuated_date,
+                rate_value=Decimal(rate_value),
+            )
+        ]
+    )
+    rate_cache.set(
+        (from_currency_code, to_currency_code, valuated_date),
+        Decimal(rate_value).quantize(RATE_PRECISION),
+    )
+
+
+def bulk_store_exchange_rates(
+    exchange_rates, batch_size: int = None, ignore_conflicts=False
+) -> int:
+    """Store exchange rates by batches, each batch written by one statement in its own transaction.
+
+    When a stored rate value is updated, the rate cache of all the workers
+    is invalidated once the rates are committed.
+
+    Args:
+        exchange_rates (iterable): The CurrencyExchangeRate objects to store, it can be a generator.
+        batch_size (int, optional): The number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): Keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        int: The number of rates sent to the database.
+    """
+    batch_size = batch_size or settings.EXCHANGE_RATES_BATCH_SIZE
+    options = (
+        {"ignore_conflicts": True} if ignore_conflicts else UPSERT_OPTIONS
+    )
+
+    stored_rates = 0
+    updated_rates = False
+    exchange_rates = iter(exchange_rates)
+    while batch := list(itertools.islice(exchange_rates, batch_size)):
+        with transaction.atomic():
+            # the stored rates are only read until an update is found
+            if not (ignore_conflicts or updated_rates):
+                updated_rates = has_updated_rates(batch)
+            CurrencyExchangeRate.objects.bulk_create(batch, **options)
+        stored_rates += len(batch)
+
+    if updated_rates:
+        transaction.on_commit(rate_cache.invalidate)
+    return stored_rates
+
+
+def store_rates_list_to_DB(
+    from_currency_code: str,
+    rates: dict,
+    batch_size: int = None,
+    ignore_conflicts=False,
+) -> int:
+    """Store a time series of rates for a base currency to the database.
+
+    Args:
+        from_currency_code (str): The currency code for the base currency
+        rates (dict): The rate values indexed by date, then by target currency code.
+        batch_size (int, optional): The number of rates per batch. Defaults to the setting EXCHANGE_RATES_BATCH_SIZE.
+        ignore_conflicts (bool, optional): Keep the rates already stored instead of updating them. Defaults to False.
+
+    Returns:
+        int: The number of stored rates.
+    """
+    currencies = currency_registry.get_ids()
+    if from_currency_code not in currencies:
+        return 0
+
+    exchange_rates = [
+        CurrencyExchangeRate(
+            source_currency_id=currencies[from_currency_code],
+            exchanged_currency_id=currencies[exchanged_code],
+            valuation_date=valuation_date,
+            rate_value=Decimal(str(rate_value)),
+        )
+        for valuation_date, day_rates in rates.items()
+        for exchanged_code, rate_value in day_rates.items()
+        if exchanged_code in currencies
+    ]
+    bulk_store_exchange_rates(exchange_rates, batch_size, ignore_conflicts)
+    if ignore_conflicts:
+        # the stored rates may differ from the given ones, they are not cached
+        return len(exchange_rates)
+
+    for valuation_date, day_rates in rates.items():
+        for exchanged_code, rate_value in day_rates.items():
+            if exchanged_code in currencies:
+                rate_cache.set(
+                    (from_currency_code, exchanged_code, valuation_date),
+                    Decimal(str(rate_value)).quantize(RATE_PRECISION),
+                )
+    return len(exchange_rates)
+
+
+async def astore_conversion_to_DB(
+    from_currency_code: str, to_currency_code: str, rate_value, valuated_date
+):
+    """Store a rate conversion to the database, asynchronously."""
+    await sync_to_async(upsert_exchange_rates)(
+        [
+            CurrencyExchangeRate(
+                source_currency_id=await currency_registry.aget_id(
+                    from_currency_code
+                ),
+                exchanged_currency_id=await currency_registry.aget_id(
+                    to_currency_code
+                ),
+                valuation_date=valuated_date,
+                rate_value=Decimal(rate_value),
+            )
+        ]
+    )
+    rate_cache.set(
+        (from_currency_code, to_currency_code, valuated_date),
+        Decimal(rate_value).quantize(RATE_PRECISION),
     )
@@ -0,0 +1,82 @@
+"""Define the in-process registry of the stored exchange rate providers."""
+
+from django.conf import settings
+
+from mycurrency_exchange_rates.models import ExchangeRateProvider
+from mycurrency_exchange_rates.services.cache_managers.registry import (
+    VersionedRegistry,
+)
+
+PROVIDER_REGISTRY_VERSION_NAME = "provider-registry"
+
+
+class ProviderRegistry(VersionedRegistry):
+    """Keep the stored providers, loaded once per process, to resolve the active one without query.
+
+    The registry is emptied by the signals of the ExchangeRateProvider model.
+    """
+
+    version_name = PROVIDER_REGISTRY_VERSION_NAME
+
+    def load(self) -> list:
+        """Read the names, priorities and flags of the providers."""
+        # the providers are in the default ordering of the model, the active
+        # one is the first active as with a query
+        return list(
+            ExchangeRateProvider.objects.values_list(
+                "provider_name", "priority", "active_flag", "active_status"
+            )
+        )
+
+    def get_active_name(self) -> str | None:
+        """Give the name of the active provider.
+
+        Returns:
+            str: The name of the provider or None if no provider is active.
+        """
+        return self._get_active_name(self._refresh())
+
+    async def aget_active_name(self) -> str | None:
+        """Give the name of the active provider, asynchronously.
+
+        Returns:
+            str: The name of the provider or None if no provider is active.
+        """
+        return self._get_active_name(await self._arefresh())
+
+    def get_next_name(self) -> str | None:
+        """Give the name of the available provider of next priority, e.g. to hedge the calls of the active one.
+
+        Returns:
+            str: The name of the provider or None if no other provider is available.
+        """
+        return self._get_next_name(self._refresh())
+
+    async def aget_next_name(self) -> str | None:
+        """Give the name of the available provider of next priority, asynchronously.
+
+        Returns:
+            str: The name of the provider or None if no other provider is available.
+        """
+        return self._get_next_name(await self._arefresh())
+
+    @staticmethod
+    def _get_active_name(providers: list) -> str | None:
+        return next(
+            (name for name, _, _, active_status in providers if active_status),
+            None,
+        )
+
+    @staticmethod
+    def _get_next_name(providers: list) -> str | None:
+        available_providers = [
+            (priority, name)
+            for name, priority, active_flag, active_status in providers
+            if active_flag and not active_status
+        ]
+        return min(available_providers)[1] if available_providers else None
+
+
+provider_registry = ProviderRegistry(
+    check_interval=settings.PROVIDER_REGISTRY_CHECK_INTERVAL
+)
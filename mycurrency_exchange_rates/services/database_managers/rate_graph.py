@@ -0,0 +1,92 @@
+"""Define the resolver of cross rates from the rates stored for a date."""
+
+from decimal import Decimal
+
+RATE_PRECISION = Decimal("0.000001")
+
+
+def build_rate_graph(exchange_rates) -> dict:
+    """Build the graph of the known rates between currencies.
+
+    Each stored rate A -> B gives a direct edge A -> B and, when no rate
+    B -> A is stored, an inverse edge B -> A valued 1 / rate.
+
+    Args:
+        exchange_rates (iterable): tuples (source currency code, exchanged currency code, rate value).
+
+    Returns:
+        dict: The edges indexed by source currency code, then by target currency code, as tuples (rate value, is_inverse).
+    """
+    graph = {}
+    for source_code, exchanged_code, rate_value in exchange_rates:
+        graph.setdefault(source_code, {})[exchanged_code] = (
+            Decimal(rate_value),
+            False,
+        )
+
+    for source_code, edges in list(graph.items()):
+        for exchanged_code, (rate_value, is_inverse) in list(edges.items()):
+            if is_inverse or not rate_value:
+                continue
+            if source_code not in graph.setdefault(exchanged_code, {}):
+                graph[exchanged_code][source_code] = (1 / rate_value, True)
+
+    return graph
+
+
+def resolve_cross_rate(graph: dict, from_currency, to_currency) -> dict | None:
+    """Compute the rate of a pair of currencies from the edges of a rate graph.
+
+    The inverse rate is preferred, then a path of two legs through a pivot
+    currency, choosing the pivot with the fewest inverse legs.
+
+    Args:
+        graph (dict): The graph given by build_rate_graph.
+        from_currency (str): The code of the base currency
+        to_currency (str): The code for the target currency
+
+    Returns:
+        dict: The derived rate value and how it was derived, None if the rate can not be derived.
+    """
+    edges = graph.get(from_currency, {})
+    if to_currency in edges:
+        rate_value, is_inverse = edges[to_currency]
+        return {
+            "rate_value": rate_value.quantize(RATE_PRECISION),
+            "derivation": {
+                "method": "inverse" if is_inverse else "direct",
+                "legs": ["{}->{}".format(from_currency, to_currency)],
+            },
+        }
+
+    candidates = []
+    for pivot_currency, (first_rate, first_inverse) in edges.items():
+        if pivot_currency == to_currency:
+            continue
+        second_edge = graph.get(pivot_currency, {}).get(to_currency)
+        if second_edge is None:
+            continue
+        second_rate, second_inverse = second_edge
+        candidates.append(
+            (
+                first_inverse + second_inverse,
+                pivot_currency,
+                first_rate * second_rate,
+            )
+        )
+
+    if not candidates:
+        return None
+
+    _, pivot_currency, rate_value = min(candidates)
+    return {
+        "rate_value": rate_value.quantize(RATE_PRECISION),
+        "derivation": {
+            "method": "pivot",
+            "pivot_currency": pivot_currency,
+            "legs": [
+                "{}->{}".format(from_currency, pivot_currency),
+                "{}->{}".format(pivot_currency, to_currency),
+            ],
+        },
+    }
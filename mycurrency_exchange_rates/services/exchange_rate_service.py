@@ -3,43 +3,82 @@
 import logging
 
 import arrow
-from pybreaker import CircuitBreaker
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from pybreaker import CircuitBreakerError
 
-from mycurrency_exchange_rates.models import ExchangeRateProvider
+from mycurrency_exchange_rates.services.cache_managers.managers import (
+    get_conversion_cache_key,
+)
+from mycurrency_exchange_rates.services.cache_managers.single_flight import (
+    single_flight,
+)
 from mycurrency_exchange_rates.services.database_managers.managers import (
+    astore_conversion_to_DB,
+    get_conversion_from_database,
+    get_missing_rates_intervals,
+    get_prefetch_currencies,
     set_next_provider_by_priority,
+    store_conversion_to_DB,
+    store_rates_list_to_DB,
+)
+from mycurrency_exchange_rates.services.database_managers.provider_registry import (
+    provider_registry,
 )
 
-from .providers_service import (
-    CURRENCY_BEACON_PROVIDER_NAME,
-    MOCK_PROVIDER_NAME,
-    currency_beacon_provider,
-    mock_provider,
+from .providers_service.hedging import ahedged_call, hedged_call
+from .providers_service.registry import (
+    get_adapter_of_provider,
+    get_provider_adapter,
 )
 
 logger = logging.getLogger(__name__)
 
 
 def get_current_provider_service():
-    """Determine the current active provider."""
-    current_provider_name = ExchangeRateProvider.objects.filter(
-        active_status=True
-    ).first()
-    logger.info("The current provider is {}".format(current_provider_name))
+    """Determine the current active provider.
+
+    The stored providers are read from the in-process provider registry.
+    """
+    return _get_provider_service(provider_registry.get_active_name())
+
+
+async def aget_current_provider_service():
+    """Determine the current active provider, as a coroutine function."""
+    return _get_provider_service(
+        await provider_registry.aget_active_name(), "aprovider"
+    )
+
 
-    if not current_provider_name:
+def get_hedge_provider_service():
+    """Determine the available provider of next priority, to hedge the calls of the active one."""
+    return _get_provider_service(provider_registry.get_next_name())
+
+
+async def aget_hedge_provider_service():
+    """Determine the available provider of next priority, as a coroutine function."""
+    return _get_provider_service(
+        await provider_registry.aget_next_name(), "aprovider"
+    )
+
+
+def _get_provider_service(provider_name, service="provider"):
+    logger.info("The current provider is {}".format(provider_name))
+
+    adapter = get_provider_adapter(provider_name)
+    if adapter is None:
         return None
 
-    if CURRENCY_BEACON_PROVIDER_NAME in current_provider_name.provider_name:
-        logger.info("Use of currency beacon provider")
-        return currency_beacon_provider
-    elif MOCK_PROVIDER_NAME in current_provider_name.provider_name:
-        logger.info("Use of mock provider")
-        return mock_provider
+    logger.info("Use of {} provider".format(adapter["name"]))
+    return adapter[service]
 
 
 def get_exchange_rate_data(
-    source_currency, exchanged_currency, valuation_date, provider
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    provider,
+    prefetch_currencies: list = None,
 ):
     """Declare the adapter to get a currency conversion."""
     if not provider:
@@ -57,12 +96,346 @@ def get_exchange_rate_data(
             "message": "A rate value cannot be read in the future",
         }
 
+    options = (
+        {"prefetch_currencies": prefetch_currencies}
+        if prefetch_currencies
+        else {}
+    )
     try:
-        return provider(source_currency, exchanged_currency, valuation_date)
-    except CircuitBreaker.Error:
+        if settings.PROVIDER_HEDGING_ENABLED:
+            return hedged_call(
+                provider,
+                get_hedge_provider_service,
+                source_currency,
+                exchanged_currency,
+                valuation_date,
+                **options,
+            )
+        return provider(
+            source_currency, exchanged_currency, valuation_date, **options
+        )
+    except CircuitBreakerError:
         set_next_provider_by_priority()
 
 
-def get_currency_rates_list(source_currency, from_date, to_date, provider):
+def fetch_and_store_exchange_rate(
+    source_currency, exchanged_currency, valuation_date, provider
+) -> dict:
+    """Get a currency conversion from the provider and store it in the database when it succeeds.
+
+    Args:
+        source_currency (str): The code of the base currency
+        exchanged_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        provider (function): The concrete provider function to call
+
+    Returns:
+        dict: The response of the provider.
+    """
+    prefetch_currencies = None
+    if provider and settings.PROVIDER_PREFETCH_ALL_SYMBOLS:
+        prefetch_currencies = get_prefetch_currencies(
+            source_currency, exchanged_currency, valuation_date
+        )
+
+    response = get_exchange_rate_data(
+        source_currency=source_currency,
+        exchanged_currency=exchanged_currency,
+        valuation_date=valuation_date,
+        provider=provider,
+        prefetch_currencies=prefetch_currencies,
+    )
+    if response is None:
+        return {
+            "status": "ko",
+            "message": (
+                "The rate exchange provider is not available at the moment !"
+            ),
+        }
+
+    if "ok" in response["status"]:
+        prefetched_rates = _pop_prefetched_rates(
+            response, exchanged_currency, prefetch_currencies
+        )
+        if prefetched_rates:
+            store_rates_list_to_DB(
+                source_currency, {valuation_date: prefetched_rates}
+            )
+        else:
+            store_conversion_to_DB(
+                from_currency_code=source_currency,
+                to_currency_code=exchanged_currency,
+                rate_value=response["rate_value"],
+                valuated_date=valuation_date,
+            )
+    return response
+
+
+async def aget_exchange_rate_data(
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    provider,
+    prefetch_currencies: list = None,
+):
+    """Declare the adapter to await a currency conversion."""
+    if not provider:
+        return {
+            "status": "ko",
+            "message": (
+                "No rate exchange provider is available at the moment !"
+            ),
+        }
+
+    a_now = arrow.utcnow()
+    if valuation_date >= a_now.shift(days=1).date():
+        return {
+            "status": "ko",
+            "message": "A rate value cannot be read in the future",
+        }
+
+    options = (
+        {"prefetch_currencies": prefetch_currencies}
+        if prefetch_currencies
+        else {}
+    )
+    try:
+        if settings.PROVIDER_HEDGING_ENABLED:
+            return await ahedged_call(
+                provider,
+                aget_hedge_provider_service,
+                source_currency,
+                exchanged_currency,
+                valuation_date,
+                **options,
+            )
+        return await provider(
+            source_currency, exchanged_currency, valuation_date, **options
+        )
+    except CircuitBreakerError:
+        await sync_to_async(set_next_provider_by_priority)()
+
+
+async def afetch_and_store_exchange_rate(
+    source_currency, exchanged_currency, valuation_date, provider
+) -> dict:
+    """Await a currency conversion from the provider and store it in the database when it succeeds.
+
+    Args:
+        source_currency (str): The code of the base currency
+        exchanged_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        provider (function): The concrete provider coroutine function to await
+
+    Returns:
+        dict: The response of the provider.
+    """
+    prefetch_currencies = None
+    if provider and settings.PROVIDER_PREFETCH_ALL_SYMBOLS:
+        prefetch_currencies = await sync_to_async(get_prefetch_currencies)(
+            source_currency, exchanged_currency, valuation_date
+        )
+
+    response = await aget_exchange_rate_data(
+        source_currency=source_currency,
+        exchanged_currency=exchanged_currency,
+        valuation_date=valuation_date,
+        provider=provider,
+        prefetch_currencies=prefetch_currencies,
+    )
+    if response is None:
+        return {
+            "status": "ko",
+            "message": (
+                "The rate exchange provider is not available at the moment !"
+            ),
+        }
+
+    if "ok" in response["status"]:
+        prefetched_rates = _pop_prefetched_rates(
+            response, exchanged_currency, prefetch_currencies
+        )
+        if prefetched_rates:
+            await sync_to_async(store_rates_list_to_DB)(
+                source_currency, {valuation_date: prefetched_rates}
+            )
+        else:
+            await astore_conversion_to_DB(
+                from_currency_code=source_currency,
+                to_currency_code=exchanged_currency,
+                rate_value=response["rate_value"],
+                valuated_date=valuation_date,
+            )
+    return response
+
+
+def _pop_prefetched_rates(
+    response, exchanged_currency, prefetch_currencies
+) -> dict:
+    """Take out of a provider response the rates of the prefetch currencies.
+
+    Args:
+        response (dict): The ok response of the provider. Its key "rates" is removed.
+        exchanged_currency (str): The code for the target currency
+        prefetch_currencies (list): The codes of the currencies requested along with the target currency.
+
+    Returns:
+        dict: The rate values to store indexed by currency code, including the target currency, or an empty dict when nothing was prefetched.
+    """
+    rates = response.pop("rates", None) or {}
+    prefetched_rates = {
+        currency_code: rate_value
+        for currency_code, rate_value in rates.items()
+        if currency_code in (prefetch_currencies or [])
+    }
+    if prefetched_rates:
+        prefetched_rates[exchanged_currency] = response["rate_value"]
+    return prefetched_rates
+
+
+def fetch_and_store_exchange_rate_once(
+    source_currency, exchanged_currency, valuation_date, provider
+) -> dict:
+    """Get a currency conversion from the provider with only one fetch in flight per conversion.
+
+    The concurrent requests of a same missing conversion, in this process
+    or in the other workers, share a single provider call and a single
+    stored rate.
+
+    Args:
+        source_currency (str): The code of the base currency
+        exchanged_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        provider (function): The concrete provider function to call
+
+    Returns:
+        dict: The response of the provider, or the rate stored by a concurrent fetch.
+    """
+
+    def lookup():
+        result = get_conversion_from_database(
+            from_currency=source_currency,
+            to_currency=exchanged_currency,
+            valuation_date=valuation_date,
+        )
+        return None if "message" in result.keys() else result
+
+    return single_flight(
+        get_conversion_cache_key(
+            source_currency, exchanged_currency, valuation_date
+        ),
+        fetch=lambda: fetch_and_store_exchange_rate(
+            source_currency, exchanged_currency, valuation_date, provider
+        ),
+        lookup=lookup,
+    )
+
+
+def get_time_series_provider(provider):
+    """Give the time series function of a provider.
+
+    Args:
+        provider (function): The concrete provider function for a conversion.
+
+    Returns:
+        function: The concrete provider function for a time series or None.
+    """
+    adapter = get_adapter_of_provider(provider)
+    return adapter and adapter["time_series_provider"]
+
+
+def get_currency_rates_list(
+    source_currency,
+    exchanged_currencies: list,
+    from_date: arrow.Arrow,
+    to_date: arrow.Arrow,
+    provider,
+) -> dict:
     """Declare the adapter to get a time series list of currency conversions."""
-    return provider(source_currency, from_date, to_date)
+    if not provider:
+        return {
+            "status": "ko",
+            "message": (
+                "No rate exchange provider is available at the moment !"
+            ),
+        }
+
+    try:
+        return provider(
+            source_currency, exchanged_currencies, from_date, to_date
+        )
+    except CircuitBreakerError:
+        set_next_provider_by_priority()
+        return {
+            "status": "ko",
+            "message": (
+                "The rate exchange provider is not available at the moment !"
+            ),
+        }
+
+
+def complete_currency_rates_list(
+    source_currency,
+    exchanged_currencies: list,
+    from_date,
+    to_date,
+    stored_rates,
+) -> dict:
+    """Request to the provider the rates missing in a stored time series and store them.
+
+    Only the sub-intervals of dates with missing rates are requested, with
+    one time series call for each of them.
+
+    Args:
+        source_currency (str): The code of the base currency
+        exchanged_currencies (list): The codes for the target currencies
+        from_date (date): The start date of the interval
+        to_date (date): The end date of the interval
+        stored_rates (dict): The rate values already stored, indexed by date, then by target currency code. It is completed in place.
+
+    Returns:
+        dict: A dictionary containing the status and the providers which were called.
+    """
+    missing_intervals = get_missing_rates_intervals(
+        stored_rates, exchanged_currencies, from_date, to_date
+    )
+    if not missing_intervals:
+        return {"status": "ok", "providers": []}
+
+    provider = get_time_series_provider(get_current_provider_service())
+    providers = []
+    for start_date, end_date, missing_currencies in missing_intervals:
+        response = get_currency_rates_list(
+            source_currency=source_currency,
+            exchanged_currencies=missing_currencies,
+            from_date=arrow.get(start_date),
+            to_date=arrow.get(end_date),
+            provider=provider,
+        )
+        if "ko" in response["status"]:
+            return response
+
+        new_rates = {}
+        for date_key, day_rates in response.items():
+            try:
+                valuation_date = arrow.get(date_key, "YYYY-MM-DD").date()
+            except (ValueError, TypeError):
+                continue
+            if not start_date <= valuation_date <= end_date:
+                continue
+
+            for exchanged_currency in missing_currencies:
+                if exchanged_currency in day_rates and (
+                    exchanged_currency
+                    not in stored_rates.get(valuation_date, {})
+                ):
+                    new_rates.setdefault(valuation_date, {})[
+                        exchanged_currency
+                    ] = day_rates[exchanged_currency]
+
+        store_rates_list_to_DB(source_currency, new_rates)
+        for valuation_date, day_rates in new_rates.items():
+            stored_rates.setdefault(valuation_date, {}).update(day_rates)
+        providers.append(response["provider"])
+
+    return {"status": "ok", "providers": sorted(set(providers))}
@@ -4,13 +4,16 @@ from .currency_beacon_provider import (
     PROVIDER_NAME as CURRENCY_BEACON_PROVIDER_NAME,
 )
 from .currency_beacon_provider import (
+    acurrency_beacon_provider,
     currency_beacon_provider,
+    currency_beacon_time_series_provider,
 )
 from .currency_beacon_provider import (
     request_time_series_api as request_time_series_currency_beacon_api,
 )
 from .mock_provider import PROVIDER_NAME as MOCK_PROVIDER_NAME
 from .mock_provider import (
+    amock_provider,
     mock_provider,
 )
 from .mock_provider import (
@@ -18,7 +21,10 @@ from .mock_provider import (
 )
 
 __all_ = [
+    "acurrency_beacon_provider",
+    "amock_provider",
     "currency_beacon_provider",
+    "currency_beacon_time_series_provider",
     "CURRENCY_BEACON_PROVIDER_NAME",
     "mock_provider",
     "MOCK_PROVIDER_NAME",
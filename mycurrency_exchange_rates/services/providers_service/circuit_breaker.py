@@ -0,0 +1,162 @@
+"""Define the circuit breakers of the providers, shared by the workers through Redis."""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from pybreaker import (
+    STATE_CLOSED,
+    CircuitBreaker,
+    CircuitBreakerStorage,
+    CircuitMemoryStorage,
+    CircuitRedisStorage,
+)
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKER_NAMESPACE = "circuit-breaker-{}"
+
+
+class SharedCircuitStorage(CircuitBreakerStorage):
+    """Keep the state of a circuit breaker in Redis, connected at the first call.
+
+    Until Redis is reached, the state is kept in the memory of the process,
+    and the connection is attempted again at most once per retry interval,
+    so the state is shared again as soon as Redis is back. With a cache
+    which is not a Redis one, the state always stays in memory.
+    """
+
+    def __init__(self, name: str, retry_interval: float):
+        """Init the storage without connecting to Redis.
+
+        Args:
+            name (str): the name of the circuit breaker, e.g. the name of its provider.
+            retry_interval (float): the seconds between two attempts to connect to Redis.
+        """
+        super().__init__("shared")
+        self.circuit_name = name
+        self.retry_interval = retry_interval
+        # the breaker reads its state when it is created, e.g. at import,
+        # this read is answered from memory without connecting
+        self.connect = False
+        self._memory_storage = CircuitMemoryStorage(STATE_CLOSED)
+        self._redis_storage = None
+        self._next_attempt = 0
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self) -> CircuitBreakerStorage:
+        """Give the Redis storage once connected, the memory storage otherwise."""
+        if self._redis_storage is not None:
+            return self._redis_storage
+        if not self.connect or time.monotonic() < self._next_attempt:
+            return self._memory_storage
+
+        with self._lock:
+            if self._redis_storage is None and (
+                time.monotonic() >= self._next_attempt
+            ):
+                self._redis_storage = self._create_redis_storage()
+        return self._redis_storage or self._memory_storage
+
+    def _create_redis_storage(self) -> CircuitRedisStorage | None:
+        try:
+            return CircuitRedisStorage(
+                STATE_CLOSED,
+                get_redis_connection("default"),
+                namespace=CIRCUIT_BREAKER_NAMESPACE.format(self.circuit_name),
+            )
+        except NotImplementedError:
+            # the default cache is not a Redis one, there is nothing to retry
+            logger.debug(
+                "The state of the circuit breaker {} is kept in memory.".format(
+                    self.circuit_name
+                )
+            )
+            self._next_attempt = float("inf")
+        except RedisError:
+            logger.warning(
+                "The state of the circuit breaker {} can not be shared, it is"
+                " kept in memory until Redis is reached.".format(
+                    self.circuit_name
+                )
+            )
+            self._next_attempt = time.monotonic() + self.retry_interval
+        return None
+
+    @property
+    def state(self) -> str:
+        """Give the state of the circuit breaker."""
+        return self.storage.state
+
+    @state.setter
+    def state(self, state: str):
+        """Set the state of the circuit breaker."""
+        self.storage.state = state
+
+    def increment_counter(self):
+        """Increase the failure counter by one."""
+        self.storage.increment_counter()
+
+    def reset_counter(self):
+        """Set the failure counter to zero."""
+        self.storage.reset_counter()
+
+    @property
+    def counter(self) -> int:
+        """Give the failure counter."""
+        return self.storage.counter
+
+    @property
+    def opened_at(self):
+        """Give the last time the circuit was opened."""
+        return self.storage.opened_at
+
+    @opened_at.setter
+    def opened_at(self, opened_at):
+        """Set the last time the circuit was opened."""
+        self.storage.opened_at = opened_at
+
+
+def get_circuit_breaker_storage(name: str) -> CircuitBreakerStorage:
+    """Give the storage of the state of a circuit breaker.
+
+    The state is kept in the Redis instance of the default cache, so that
+    all the workers open and close the circuit together. Redis is reached
+    at the first call of the breaker, not when the storage is created.
+
+    Args:
+        name (str): the name of the circuit breaker, e.g. the name of its provider.
+
+    Returns:
+        CircuitBreakerStorage: the storage of the state of the circuit breaker.
+    """
+    if settings.PROVIDER_CIRCUIT_BREAKER_SHARED:
+        return SharedCircuitStorage(
+            name, settings.PROVIDER_CIRCUIT_BREAKER_RETRY_INTERVAL
+        )
+    return CircuitMemoryStorage(STATE_CLOSED)
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Create the circuit breaker of a provider.
+
+    Args:
+        name (str): the name of the circuit breaker, e.g. the name of its provider.
+
+    Returns:
+        CircuitBreaker: the circuit breaker.
+    """
+    storage = get_circuit_breaker_storage(name)
+    circuit_breaker = CircuitBreaker(
+        fail_max=settings.PROVIDER_CIRCUIT_BREAKER_FAIL_MAX,
+        reset_timeout=settings.PROVIDER_CIRCUIT_BREAKER_RESET_TIMEOUT,
+        state_storage=storage,
+        name=name,
+    )
+    if isinstance(storage, SharedCircuitStorage):
+        storage.connect = True
+    return circuit_breaker
@@ -1,38 +1,99 @@
 """Define the provider currency beacon."""
 
-import asyncio
 import os
 
-import aiohttp
 import arrow
-from pybreaker import CircuitBreaker
+from django.conf import settings
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from mycurrency_exchange_rates.models import ExchangeRateProvider
 
+from .circuit_breaker import get_circuit_breaker
+from .http_session import get_session, run_in_provider_loop
+from .registry import register_provider
+
 PROVIDER_NAME = "currencybeacon"
-CURRENCY_RATES_URL = "https://api.currencybeacon.com/v1/timeseries?api_key={}&base={}&start_date={}&end_date={}&symbols={}"
-CONVERSION_URL = "https://api.currencybeacon.com/v1/convert?api_key={}&from={}&to={}&amount={}"
-CONVERSION_HISTORICAL_URL = "https://api.currencybeacon.com/v1/historical?api_key={}&base={}&date={}&symbols={}"
+CURRENCY_RATES_URL = (
+    settings.CURRENCY_BEACON_BASE_URL
+    + "/timeseries?api_key={}&base={}&start_date={}&end_date={}&symbols={}"
+)
+CONVERSION_URL = (
+    settings.CURRENCY_BEACON_BASE_URL
+    + "/convert?api_key={}&from={}&to={}&amount={}"
+)
+CONVERSION_HISTORICAL_URL = (
+    settings.CURRENCY_BEACON_BASE_URL
+    + "/historical?api_key={}&base={}&date={}&symbols={}"
+)
 
-circuit_breaker = CircuitBreaker(fail_max=5, reset_timeout=120)
+circuit_breaker = get_circuit_breaker(PROVIDER_NAME)
 
 
 @circuit_breaker
 def currency_beacon_provider(
-    source_currency, exchanged_currency, valuation_date
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    prefetch_currencies: list = None,
 ) -> dict:
-    """Define the concrete function when the currency beacon provider is called."""
+    """Define the concrete function when the currency beacon provider is called.
+
+    The historical rates of the prefetch currencies are requested in the
+    same call and given under the key "rates" of the response.
+    """
     if valuation_date == arrow.utcnow().date():
-        return asyncio.run(
+        return run_in_provider_loop(
             request_api_convert(source_currency, exchanged_currency)
         )
     else:
-        return asyncio.run(
+        return run_in_provider_loop(
             request_api_history(
-                source_currency, exchanged_currency, valuation_date
+                source_currency,
+                exchanged_currency,
+                valuation_date,
+                prefetch_currencies,
+            )
+        )
+
+
+async def acurrency_beacon_provider(
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    prefetch_currencies: list = None,
+) -> dict:
+    """Define the concrete coroutine when the currency beacon provider is awaited.
+
+    The provider requests are awaited in the running event loop, under the
+    same circuit breaker as currency_beacon_provider.
+    """
+    with circuit_breaker.calling():
+        if valuation_date == arrow.utcnow().date():
+            return await request_api_convert(
+                source_currency, exchanged_currency
             )
+        else:
+            return await request_api_history(
+                source_currency,
+                exchanged_currency,
+                valuation_date,
+                prefetch_currencies,
+            )
+
+
+@circuit_breaker
+def currency_beacon_time_series_provider(
+    from_currency,
+    to_currencies: list,
+    from_date: arrow.Arrow,
+    to_date: arrow.Arrow,
+) -> dict:
+    """Define the concrete function when the currency beacon provider is called for a time series."""
+    return run_in_provider_loop(
+        request_time_series_api(
+            from_currency, to_currencies, from_date, to_date
         )
+    )
 
 
 @retry(
@@ -41,16 +102,15 @@ def currency_beacon_provider(
 )
 async def request_api_convert(source_currency, exchanged_currency) -> dict:
     """Define the api request for standard conversion currency."""
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(
-            CONVERSION_URL.format(
-                os.getenv("CURRENCY_BEACON_API_KEY"),
-                source_currency,
-                exchanged_currency,
-                "1.0",
-            ),
-            ssl=False,
-        )
+    async with get_session().get(
+        CONVERSION_URL.format(
+            os.getenv("CURRENCY_BEACON_API_KEY"),
+            source_currency,
+            exchanged_currency,
+            "1.0",
+        ),
+        ssl=False,
+    ) as response:
         response_json = await response.json()
 
     return {
@@ -69,22 +129,35 @@ async def request_api_convert(source_currency, exchanged_currency) -> dict:
     wait=wait_exponential(multiplier=1, min=1, max=10),
 )
 async def request_api_history(
-    source_currency, exchanged_currency, valuation_date: arrow.Arrow
+    source_currency,
+    exchanged_currency,
+    valuation_date: arrow.Arrow,
+    prefetch_currencies: list = None,
 ) -> dict:
-    """Define the api request for standard conversion currency for a specific day."""
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(
-            CONVERSION_HISTORICAL_URL.format(
-                os.getenv("CURRENCY_BEACON_API_KEY"),
-                source_currency,
-                # valuation_date.format("YYYY-MM-DD"),
-                valuation_date,
-                exchanged_currency,
-            ),
-            ssl=False,
-        )
+    """Define the api request for standard conversion currency for a specific day.
+
+    The historical endpoint gives the rates of all the requested symbols at
+    once, so the prefetch currencies are added to the symbols of the call.
+    """
+    symbols = [exchanged_currency] + [
+        currency_code
+        for currency_code in prefetch_currencies or []
+        if currency_code != exchanged_currency
+    ]
+
+    async with get_session().get(
+        CONVERSION_HISTORICAL_URL.format(
+            os.getenv("CURRENCY_BEACON_API_KEY"),
+            source_currency,
+            # valuation_date.format("YYYY-MM-DD"),
+            valuation_date,
+            ",".join(symbols),
+        ),
+        ssl=False,
+    ) as response:
         response_json = await response.json()
 
+    rates = response_json["response"]["rates"]
     return {
         "status": "ok",
         "provider": PROVIDER_NAME,
@@ -92,7 +165,12 @@ async def request_api_history(
         "from_currency": source_currency,
         "to_currency": exchanged_currency,
         "valuation_date": response_json["response"]["date"],
-        "rate_value": response_json["response"]["rates"][exchanged_currency],
+        "rate_value": rates[exchanged_currency],
+        "rates": {
+            currency_code: rates[currency_code]
+            for currency_code in symbols
+            if currency_code in rates
+        },
     }
 
 
@@ -105,17 +183,16 @@ async def request_time_series_api(
     """Define the currency beacon request for time series currency call."""
     symbols = ",".join(to_currencies)
 
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(
-            CURRENCY_RATES_URL.format(
-                os.getenv("CURRENCY_BEACON_API_KEY"),
-                from_currency,
-                from_date.format("YYYY-MM-DD"),
-                to_date.format("YYYY-MM-DD"),
-                symbols,
-            ),
-            ssl=False,
-        )
+    async with get_session().get(
+        CURRENCY_RATES_URL.format(
+            os.getenv("CURRENCY_BEACON_API_KEY"),
+            from_currency,
+            from_date.format("YYYY-MM-DD"),
+            to_date.format("YYYY-MM-DD"),
+            symbols,
+        ),
+        ssl=False,
+    ) as response:
         response_json = await response.json()
 
     result = response_json["response"]
@@ -124,3 +201,11 @@ async def request_time_series_api(
     result["from_currency"] = from_currency
 
     return result
+
+
+register_provider(
+    PROVIDER_NAME,
+    currency_beacon_provider,
+    aprovider=acurrency_beacon_provider,
+    time_series_provider=currency_beacon_time_series_provider,
+)
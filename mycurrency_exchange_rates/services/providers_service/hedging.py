@@ -0,0 +1,228 @@
+"""Define the hedged calls of the providers, to cut their tail latency."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent import futures
+
+from django.conf import settings
+
+
+class LatencyWindow:
+    """Keep the latencies of the last successful calls of a provider."""
+
+    def __init__(self, size: int):
+        """Init the window.
+
+        Args:
+            size (int): the maximum number of latencies kept.
+        """
+        self._latencies = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        """Add the latency of a call, the oldest one leaves a full window.
+
+        Args:
+            latency (float): the duration of the call in seconds.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percent: float) -> float | None:
+        """Give a percentile of the latencies of the window.
+
+        Args:
+            percent (float): the percentile, e.g. 95.
+
+        Returns:
+            float: the latency in seconds, None while the window holds less than the setting PROVIDER_HEDGING_MIN_SAMPLES latencies.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies or len(latencies) < (
+            settings.PROVIDER_HEDGING_MIN_SAMPLES
+        ):
+            return None
+        return latencies[
+            min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        ]
+
+
+_latency_windows = {}
+_latency_windows_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_latency_window(provider) -> LatencyWindow:
+    """Give the latency window of a provider, created at the first call.
+
+    Args:
+        provider (function): the concrete provider function or coroutine function.
+
+    Returns:
+        LatencyWindow: the latencies of the last calls of the provider.
+    """
+    with _latency_windows_lock:
+        if provider not in _latency_windows:
+            _latency_windows[provider] = LatencyWindow(
+                settings.PROVIDER_HEDGING_WINDOW_SIZE
+            )
+        return _latency_windows[provider]
+
+
+def get_hedge_delay(provider) -> float:
+    """Give the time to wait for a provider before hedging its call.
+
+    The delay is the PROVIDER_HEDGING_PERCENTILE of the last latencies of
+    the provider, bounded by PROVIDER_HEDGING_MIN_DELAY and
+    PROVIDER_HEDGING_MAX_DELAY. It is the maximal delay until enough
+    latencies are known.
+
+    Args:
+        provider (function): the concrete provider function or coroutine function.
+
+    Returns:
+        float: the delay in seconds.
+    """
+    latency = get_latency_window(provider).percentile(
+        settings.PROVIDER_HEDGING_PERCENTILE
+    )
+    if latency is None:
+        return settings.PROVIDER_HEDGING_MAX_DELAY
+    return min(
+        max(latency, settings.PROVIDER_HEDGING_MIN_DELAY),
+        settings.PROVIDER_HEDGING_MAX_DELAY,
+    )
+
+
+def _get_executor() -> futures.ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(
+                max_workers=settings.PROVIDER_HEDGING_MAX_WORKERS,
+                thread_name_prefix="provider-hedging",
+            )
+        return _executor
+
+
+def _call_provider(provider, args: tuple, kwargs: dict) -> dict:
+    start_time = time.perf_counter()
+    response = provider(*args, **kwargs)
+    get_latency_window(provider).record(time.perf_counter() - start_time)
+    return response
+
+
+async def _acall_provider(provider, args: tuple, kwargs: dict) -> dict:
+    start_time = time.perf_counter()
+    response = await provider(*args, **kwargs)
+    get_latency_window(provider).record(time.perf_counter() - start_time)
+    return response
+
+
+def _is_ok(call) -> bool:
+    return (
+        call.exception() is None
+        and isinstance(call.result(), dict)
+        and "ok" in call.result().get("status", "")
+    )
+
+
+def _get_answer(primary, hedge) -> dict:
+    # the ok answers first, then the ko ones, the failure of the primary call
+    # is raised when both calls failed
+    for call in [primary, hedge]:
+        if _is_ok(call):
+            return call.result()
+    for call in [primary, hedge]:
+        if call.exception() is None:
+            return call.result()
+    return primary.result()
+
+
+def hedged_call(provider, get_hedge_provider, *args, **kwargs) -> dict:
+    """Call a provider, and a second one when the first is slower than usual.
+
+    The calls run in the pool of the hedged calls, so the calling thread
+    leaves a slow call as soon as another one answers ok. When the provider
+    has not answered within its hedge delay, the same call is sent to the
+    hedge provider and the first ok answer is returned. The slower call is
+    not interrupted, its latency is still recorded.
+
+    Args:
+        provider (function): the concrete provider function to call.
+        get_hedge_provider (function): gives the concrete provider function of the hedged call, or None. It is only called when the call is hedged.
+        *args: the positional arguments of the call.
+        **kwargs: the keyword arguments of the call.
+
+    Returns:
+        dict: The first ok answer, else the answer of the provider, else the one of the hedge provider.
+    """
+    executor = _get_executor()
+    primary = executor.submit(_call_provider, provider, args, kwargs)
+    done, _ = futures.wait([primary], timeout=get_hedge_delay(provider))
+    if done:
+        return primary.result()
+
+    hedge_provider = get_hedge_provider()
+    if hedge_provider is None or hedge_provider is provider:
+        return primary.result()
+
+    hedge = executor.submit(_call_provider, hedge_provider, args, kwargs)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = futures.wait(
+            pending, return_when=futures.FIRST_COMPLETED
+        )
+        for call in done:
+            if _is_ok(call):
+                return call.result()
+    return _get_answer(primary, hedge)
+
+
+async def ahedged_call(provider, aget_hedge_provider, *args, **kwargs) -> dict:
+    """Await a provider, and a second one when the first is slower than usual.
+
+    When the provider has not answered within its hedge delay, the same call
+    is sent to the hedge provider and the first ok answer is returned. The
+    slower call is not interrupted, its latency is still recorded.
+
+    Args:
+        provider (function): the concrete provider coroutine function to await.
+        aget_hedge_provider (function): the coroutine function giving the concrete provider coroutine function of the hedged call, or None. It is only awaited when the call is hedged.
+        *args: the positional arguments of the call.
+        **kwargs: the keyword arguments of the call.
+
+    Returns:
+        dict: The first ok answer, else the answer of the provider, else the one of the hedge provider.
+    """
+    primary = asyncio.ensure_future(_acall_provider(provider, args, kwargs))
+    done, _ = await asyncio.wait({primary}, timeout=get_hedge_delay(provider))
+    if done:
+        return primary.result()
+
+    hedge_provider = await aget_hedge_provider()
+    if hedge_provider is None or hedge_provider is provider:
+        return await primary
+
+    hedge = asyncio.ensure_future(
+        _acall_provider(hedge_provider, args, kwargs)
+    )
+    pending = {primary, hedge}
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED
+        )
+        for call in done:
+            if _is_ok(call):
+                for slower_call in pending:
+                    # the slower call goes on, its failure is not reported
+                    slower_call.add_done_callback(
+                        lambda call: call.cancelled() or call.exception()
+                    )
+                return call.result()
+    return _get_answer(primary, hedge)
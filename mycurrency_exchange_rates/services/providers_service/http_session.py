@@ -0,0 +1,136 @@
+"""Define the pooled HTTP sessions shared by the provider requests."""
+
+import asyncio
+import atexit
+import logging
+import threading
+import weakref
+from concurrent import futures
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_sessions = weakref.WeakKeyDictionary()
+_provider_loop = None
+_provider_loop_lock = threading.Lock()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Give the pooled session of the running event loop, created at the first call.
+
+    The session keeps its connections alive between the requests, so the
+    TCP and TLS handshakes with a provider are paid once per connection of
+    the pool instead of once per request.
+
+    Returns:
+        aiohttp.ClientSession: the session bound to the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.PROVIDER_HTTP_POOL_LIMIT,
+                limit_per_host=settings.PROVIDER_HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=settings.PROVIDER_HTTP_KEEPALIVE_TIMEOUT,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=settings.PROVIDER_HTTP_TIMEOUT,
+                connect=settings.PROVIDER_HTTP_CONNECT_TIMEOUT,
+            ),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def aclose_session():
+    """Close the pooled session of the running event loop, if any.
+
+    To be awaited before the end of an event loop using get_session, e.g.
+    at the end of asyncio.run or in the shutdown hook of an ASGI server.
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _get_provider_loop() -> asyncio.AbstractEventLoop:
+    global _provider_loop
+
+    with _provider_loop_lock:
+        if _provider_loop is None or _provider_loop.is_closed():
+            _provider_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_provider_loop.run_forever,
+                name="provider-http-loop",
+                daemon=True,
+            ).start()
+        return _provider_loop
+
+
+def run_in_provider_loop(coroutine, timeout: float = None):
+    """Run a provider coroutine from synchronous code and wait for its result.
+
+    The coroutines run in an event loop living as long as the process, in a
+    background thread, so that their pooled session outlives each call.
+
+    Args:
+        coroutine (coroutine): the provider request to run.
+        timeout (float, optional): the seconds to wait for the result, the coroutine is cancelled beyond. Defaults to the setting PROVIDER_HTTP_CALL_TIMEOUT.
+
+    Raises:
+        TimeoutError: if the coroutine did not end in time.
+
+    Returns:
+        The result of the coroutine.
+    """
+    timeout = timeout or settings.PROVIDER_HTTP_CALL_TIMEOUT
+    future = asyncio.run_coroutine_threadsafe(coroutine, _get_provider_loop())
+    try:
+        return future.result(timeout=timeout)
+    except futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(
+            "The provider call did not end within {} seconds.".format(timeout)
+        )
+
+
+async def handle_lifespan(receive, send):
+    """Answer the lifespan events of an ASGI server.
+
+    At the shutdown of the server, the pooled session of its event loop is
+    closed before the shutdown is acknowledged.
+
+    Args:
+        receive (function): the ASGI coroutine giving the lifespan events.
+        send (function): the ASGI coroutine answering them.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_session()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+@atexit.register
+def close_sessions():
+    """Close the pooled session of the background event loop and stop it."""
+    global _provider_loop
+
+    with _provider_loop_lock:
+        loop, _provider_loop = _provider_loop, None
+    if loop is None or loop.is_closed():
+        return
+
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_session(), loop).result(
+            timeout=settings.PROVIDER_HTTP_CONNECT_TIMEOUT
+        )
+    except Exception:
+        logger.warning("The provider HTTP session was not closed cleanly.")
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,126 @@
+"""Define the incremental parsing of the JSON responses of the providers."""
+
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACES = " \t\n\r"
+
+
+class _JsonStream:
+    """Hold the decoded text of a JSON document received by chunks.
+
+    Only the text not parsed yet is kept, so the memory used does not
+    depend on the size of the document.
+    """
+
+    def __init__(self, chunks):
+        """Init the stream.
+
+        Args:
+            chunks (async iterable): the bytes of the document.
+        """
+        self._chunks = chunks.__aiter__()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.exhausted = False
+
+    async def read_more(self):
+        """Append the next chunk to the text not parsed yet."""
+        if self.exhausted:
+            raise ValueError("The JSON document is truncated.")
+
+        try:
+            text = self._utf8.decode(await self._chunks.__anext__())
+        except StopAsyncIteration:
+            self.exhausted = True
+            text = self._utf8.decode(b"", final=True)
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+
+    async def peek(self) -> str:
+        """Skip the whitespaces and give the next character without consuming it."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in _WHITESPACES
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            await self.read_more()
+
+    async def expect(self, character: str):
+        """Consume the next character, which must be the given one."""
+        if await self.peek() != character:
+            raise ValueError(
+                "The JSON document is invalid, {} was expected.".format(
+                    character
+                )
+            )
+        self.position += 1
+
+    async def decode_value(self):
+        """Consume and give the next JSON value."""
+        await self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise ValueError("The JSON document is invalid.")
+                await self.read_more()
+                continue
+
+            if end == len(self.buffer) and not self.exhausted:
+                # a number may go on in the next chunk
+                await self.read_more()
+                continue
+
+            self.position = end
+            return value
+
+
+async def iter_json_object_items(chunks, key: str):
+    """Yield one by one the items of an object of a JSON document received by chunks.
+
+    The object is the value of a key of the top-level object. Each of its
+    items is decoded as soon as it is received, and the rest of the
+    document is not read.
+
+    Args:
+        chunks (async iterable): the bytes of the document, e.g. response.content.iter_chunked(size).
+        key (str): the key of the object in the top-level object.
+
+    Yields:
+        tuple: the key and the decoded value of each item of the object.
+    """
+    stream = _JsonStream(chunks)
+    await stream.expect("{")
+    while True:
+        character = await stream.peek()
+        if character == "}":
+            raise ValueError("The JSON document has no key {}.".format(key))
+        if character == ",":
+            stream.position += 1
+            continue
+
+        name = await stream.decode_value()
+        await stream.expect(":")
+        if name != key:
+            await stream.decode_value()
+            continue
+
+        await stream.expect("{")
+        while True:
+            character = await stream.peek()
+            if character == "}":
+                return
+            if character == ",":
+                stream.position += 1
+                continue
+
+            item_key = await stream.decode_value()
+            await stream.expect(":")
+            yield item_key, await stream.decode_value()
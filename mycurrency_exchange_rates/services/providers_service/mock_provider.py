@@ -1,12 +1,97 @@
 """Define the provider mock."""
 
+import asyncio
+import hashlib
+import random
+import time
+from array import array
+
 import arrow
-from faker import Faker
+from django.conf import settings
+
+from .registry import register_provider
 
 PROVIDER_NAME = "mock"
 
+# the random generator of the non deterministic rates and of the injected faults
+_random = random.Random(settings.MOCK_PROVIDER_SEED)
+
+
+class MockProviderError(ConnectionError):
+    """Raised by the mock provider when a failure is injected."""
+
+
+def get_currency_value(currency_code: str, valuation_date) -> float:
+    """Give the deterministic value of a currency at a date, against an imaginary reference currency.
+
+    The value only depends on the setting MOCK_PROVIDER_SEED, the currency
+    and the date, so the rates given by the mock are reproducible, and the
+    inverse and cross rates are consistent.
+
+    Args:
+        currency_code (str): The code of the currency
+        valuation_date (date): The date of the value
+
+    Returns:
+        float: The value, between 0.2 and 5.
+    """
+    digest = hashlib.blake2b(
+        "{}:{}:{}".format(
+            settings.MOCK_PROVIDER_SEED, currency_code, valuation_date
+        ).encode(),
+        digest_size=8,
+    ).digest()
+    return 0.2 + 4.8 * int.from_bytes(digest, "big") / 2**64
+
+
+def get_rate_value(
+    source_currency, exchanged_currency, valuation_date, source_value=None
+) -> str:
+    """Give the rate value of a pair of currencies at a date.
+
+    Args:
+        source_currency (str): The code of the base currency
+        exchanged_currency (str): The code for the target currency
+        valuation_date (date): The date of the rate value
+        source_value (float, optional): The value of the base currency given by get_currency_value, to compute it once for several target currencies. Defaults to None.
 
-def mock_provider(source_currency, exchanged_currency, valuation_date) -> dict:
+    Returns:
+        str: The rate value with 6 decimals, deterministic if the setting MOCK_PROVIDER_DETERMINISTIC is set, random otherwise.
+    """
+    if not settings.MOCK_PROVIDER_DETERMINISTIC:
+        return "{}.{:06d}".format(*divmod(_random.randrange(10**7), 10**6))
+
+    if source_value is None:
+        source_value = get_currency_value(source_currency, valuation_date)
+    return "{:.6f}".format(
+        get_currency_value(exchanged_currency, valuation_date) / source_value
+    )
+
+
+def get_injected_fault() -> tuple:
+    """Draw the latency and the failure injected in a call of the mock provider.
+
+    Returns:
+        tuple: the latency in seconds, between MOCK_PROVIDER_LATENCY and MOCK_PROVIDER_LATENCY plus MOCK_PROVIDER_LATENCY_JITTER, and whether the call fails, with a probability of MOCK_PROVIDER_FAILURE_RATE.
+    """
+    latency = settings.MOCK_PROVIDER_LATENCY
+    if settings.MOCK_PROVIDER_LATENCY_JITTER:
+        latency += _random.uniform(0, settings.MOCK_PROVIDER_LATENCY_JITTER)
+    return latency, _random.random() < settings.MOCK_PROVIDER_FAILURE_RATE
+
+
+def raise_injected_failure(failed: bool):
+    """Raise the failure injected in a call of the mock provider, if any."""
+    if failed:
+        raise MockProviderError("The mock provider failed on purpose !")
+
+
+def mock_provider(
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    prefetch_currencies: list = None,
+) -> dict:
     """Define the concrete function when the mock provider is called."""
     if valuation_date >= arrow.Arrow.utcnow().shift(days=1).date():
         return {
@@ -15,15 +100,64 @@ def mock_provider(source_currency, exchanged_currency, valuation_date) -> dict:
             "message": "The rate cant be retrieved from the future !",
         }
 
-    return request_api(source_currency, exchanged_currency, valuation_date)
+    latency, failed = get_injected_fault()
+    if latency:
+        time.sleep(latency)
+    raise_injected_failure(failed)
+
+    return request_api(
+        source_currency,
+        exchanged_currency,
+        valuation_date,
+        prefetch_currencies,
+    )
+
+
+async def amock_provider(
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    prefetch_currencies: list = None,
+) -> dict:
+    """Define the concrete coroutine when the mock provider is awaited.
+
+    The injected latency is awaited, it does not block the event loop.
+    """
+    if valuation_date >= arrow.Arrow.utcnow().shift(days=1).date():
+        return {
+            "status": "ko",
+            "provider": PROVIDER_NAME,
+            "message": "The rate cant be retrieved from the future !",
+        }
+
+    latency, failed = get_injected_fault()
+    if latency:
+        await asyncio.sleep(latency)
+    raise_injected_failure(failed)
+
+    return request_api(
+        source_currency,
+        exchanged_currency,
+        valuation_date,
+        prefetch_currencies,
+    )
 
 
-def request_api(source_currency, exchanged_currency, valuation_date) -> dict:
+def request_api(
+    source_currency,
+    exchanged_currency,
+    valuation_date,
+    prefetch_currencies: list = None,
+) -> dict:
     """Define the mock request for standard conversion currency call."""
-    fake = Faker()
-    rate_value = fake.numerify("#.######")
+    source_value = None
+    if settings.MOCK_PROVIDER_DETERMINISTIC:
+        source_value = get_currency_value(source_currency, valuation_date)
+    rate_value = get_rate_value(
+        source_currency, exchanged_currency, valuation_date, source_value
+    )
 
-    return {
+    response = {
         "status": "ok",
         "provider": PROVIDER_NAME,
         "from_currency": source_currency,
@@ -31,6 +165,15 @@ def request_api(source_currency, exchanged_currency, valuation_date) -> dict:
         "valuation_date": valuation_date,
         "rate_value": rate_value,
     }
+    if prefetch_currencies:
+        response["rates"] = {
+            currency_code: get_rate_value(
+                source_currency, currency_code, valuation_date, source_value
+            )
+            for currency_code in prefetch_currencies
+        }
+        response["rates"][exchanged_currency] = rate_value
+    return response
 
 
 def request_time_series_api(
@@ -39,18 +182,59 @@ def request_time_series_api(
     from_date: arrow.Arrow,
     to_date: arrow.Arrow,
 ) -> dict:
-    """Define the mock request for time series currency call."""
+    """Define the mock request for time series currency call.
+
+    In the deterministic mode, the values of each currency over the range
+    of dates are computed once into an array, then divided day by day.
+    """
     response = {
         "status": "ok",
         "provider": PROVIDER_NAME,
         "from_currency": from_currency,
     }
-    fake = Faker()
 
-    for a in arrow.Arrow.span_range("day", from_date, to_date):
-        response[a[0].format("YYYY-MM-DD")] = {}
-        for target_currency in to_currencies:
-            response[a[0].format("YYYY-MM-DD")][target_currency] = (
-                fake.numerify("#.######")
+    latency, failed = get_injected_fault()
+    if latency:
+        time.sleep(latency)
+    raise_injected_failure(failed)
+
+    dates = [
+        span[0].date()
+        for span in arrow.Arrow.span_range("day", from_date, to_date)
+    ]
+    if not settings.MOCK_PROVIDER_DETERMINISTIC:
+        for valuation_date in dates:
+            response[valuation_date.isoformat()] = {
+                target_currency: get_rate_value(
+                    from_currency, target_currency, valuation_date
+                )
+                for target_currency in to_currencies
+            }
+        return response
+
+    source_values = array(
+        "d", (get_currency_value(from_currency, date) for date in dates)
+    )
+    target_values = {
+        target_currency: array(
+            "d",
+            (get_currency_value(target_currency, date) for date in dates),
+        )
+        for target_currency in to_currencies
+    }
+    for index, valuation_date in enumerate(dates):
+        response[valuation_date.isoformat()] = {
+            target_currency: "{:.6f}".format(
+                values[index] / source_values[index]
             )
+            for target_currency, values in target_values.items()
+        }
     return response
+
+
+register_provider(
+    PROVIDER_NAME,
+    mock_provider,
+    aprovider=amock_provider,
+    time_series_provider=request_time_series_api,
+)
@@ -0,0 +1,59 @@
+"""Define the registry of the provider adapters, each adapter registers itself at import."""
+
+_adapters = {}
+
+
+def register_provider(
+    name: str, provider, aprovider=None, time_series_provider=None
+):
+    """Register the functions of a provider adapter under its name.
+
+    Args:
+        name (str): the name of the provider, matched against the names of the stored ExchangeRateProvider.
+        provider (function): the concrete provider function for a conversion.
+        aprovider (function, optional): the concrete provider coroutine function for a conversion. Defaults to None.
+        time_series_provider (function, optional): the concrete provider function for a time series. Defaults to None.
+    """
+    _adapters[name] = {
+        "name": name,
+        "provider": provider,
+        "aprovider": aprovider,
+        "time_series_provider": time_series_provider,
+    }
+
+
+def get_provider_adapter(provider_name: str) -> dict | None:
+    """Give the adapter of a stored provider.
+
+    The stored names may be suffixed, e.g. "currencybeacon 2" is served by
+    the adapter "currencybeacon". The longest registered name contained in
+    the stored name is chosen.
+
+    Args:
+        provider_name (str): the name of the stored ExchangeRateProvider.
+
+    Returns:
+        dict: the name and the functions of the adapter, None if no adapter serves the provider.
+    """
+    if not provider_name:
+        return None
+    if provider_name in _adapters:
+        return _adapters[provider_name]
+
+    names = [name for name in _adapters if name in provider_name]
+    return _adapters[max(names, key=len)] if names else None
+
+
+def get_adapter_of_provider(provider) -> dict | None:
+    """Give the adapter of a concrete provider function.
+
+    Args:
+        provider (function): the concrete provider function for a conversion.
+
+    Returns:
+        dict: the name and the functions of the adapter, None if the function is not registered.
+    """
+    for adapter in _adapters.values():
+        if adapter["provider"] is provider:
+            return adapter
+    return None
@@ -0,0 +1,43 @@
+"""Declare the receivers of the signals sent by the models."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from mycurrency_exchange_rates.models import (
+    Currency,
+    CurrencyExchangeRate,
+    ExchangeRateProvider,
+)
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    currency_registry,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    rate_cache,
+)
+from mycurrency_exchange_rates.services.database_managers.provider_registry import (
+    provider_registry,
+)
+
+
+@receiver(post_delete, sender=CurrencyExchangeRate)
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+def invalidate_rate_cache(sender, instance, **kwargs):
+    """Empty the rate cache of all the workers when a stored rate or a currency is removed or changed."""
+    if kwargs.get("created"):
+        return
+    rate_cache.invalidate()
+
+
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+def invalidate_currency_registry(sender, instance, **kwargs):
+    """Reload the currency registry of all the workers when a currency is added, changed or removed."""
+    currency_registry.invalidate()
+
+
+@receiver(post_save, sender=ExchangeRateProvider)
+@receiver(post_delete, sender=ExchangeRateProvider)
+def invalidate_provider_registry(sender, instance, **kwargs):
+    """Reload the provider registry of all the workers when a provider is added, changed or removed."""
+    provider_registry.invalidate()
@@ -2,11 +2,24 @@
 
 import json
 
+import arrow
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from mycurrency_exchange_rates.models import Currency
+from mycurrency_exchange_rates.models import (
+    Currency,
+    CurrencyExchangeRate,
+    ExchangeRateProvider,
+)
+from mycurrency_exchange_rates.services.cache_managers.managers import (
+    get_conversion_cache_key,
+)
+from mycurrency_exchange_rates.services.database_managers.managers import (
+    rate_cache,
+)
 
 
 class CurrencyExchangeRateTest(APITestCase):
@@ -63,6 +76,564 @@ class CurrencyExchangeRateTest(APITestCase):
         )
 
 
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class CurrencyExchangeRateCacheTest(APITestCase):
+    """Declare the tests for the cache of the currency converter answers."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        cache.clear()
+        rate_cache.clear()
+        self.gbp = Currency.objects.create(
+            code="GBP", name="Pound Sterling", symbol="£"
+        )
+        self.chf = Currency.objects.create(
+            code="CHF", name="Swiss franc", symbol="Fr."
+        )
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.gbp,
+            exchanged_currency=self.chf,
+            valuation_date=arrow.Arrow(2025, 4, 1).date(),
+            rate_value="1.141472",
+        )
+        self.url = reverse("currencyexchangerate-list")
+
+    def test_cache_key_is_normalized(self):
+        """Verify that every spelling of the same conversion shares one cache entry."""
+        response = self.client.get(
+            self.url,
+            data={
+                "to_currency": "chf",
+                "from_currency": "gbp",
+                "valuation_date": "2025-4-1",
+            },
+        )
+
+        self.assertEqual(json.loads(response.content)[0]["provider"], "BDD")
+        self.assertEqual(
+            get_conversion_cache_key("GBP", "CHF", arrow.Arrow(2025, 4, 1)),
+            get_conversion_cache_key(" gbp", "chf ", arrow.Arrow(2025, 4, 1)),
+        )
+        self.assertIsNotNone(
+            cache.get(
+                get_conversion_cache_key(
+                    "GBP", "CHF", arrow.Arrow(2025, 4, 1).date()
+                )
+            ),
+            "The conversion should be cached !",
+        )
+
+        CurrencyExchangeRate.objects.all().delete()
+        response = self.client.get(
+            self.url,
+            data={
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-04-01",
+            },
+        )
+        self.assertEqual(
+            json.loads(response.content)[0]["rate_value"],
+            "1.141472",
+            "The conversion should be answered by the cache !",
+        )
+
+    def test_errors_are_not_cached(self):
+        """Verify that an answer without rate value is not cached."""
+        response = self.client.get(
+            self.url,
+            data={
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-2",
+            },
+        )
+
+        self.assertEqual(json.loads(response.content)[0]["status"], "ko")
+        self.assertIsNone(
+            cache.get(
+                get_conversion_cache_key(
+                    "GBP", "CHF", arrow.Arrow(2025, 4, 2).date()
+                )
+            ),
+            "An error should not be cached !",
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class AsyncCurrencyConverterTest(APITestCase):
+    """Declare the tests for the asynchronous currency converter endpoint."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        cache.clear()
+        rate_cache.clear()
+        self.gbp = Currency.objects.create(
+            code="GBP", name="Pound Sterling", symbol="£"
+        )
+        self.chf = Currency.objects.create(
+            code="CHF", name="Swiss franc", symbol="Fr."
+        )
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.gbp,
+            exchanged_currency=self.chf,
+            valuation_date=arrow.Arrow(2025, 4, 1).date(),
+            rate_value="1.141472",
+        )
+        ExchangeRateProvider.objects.create(
+            provider_name="mock 1",
+            priority=10,
+            active_flag=True,
+            active_status=True,
+        )
+        self.url = reverse("async-currency-converter")
+
+    async def test_async_conversion_not_possible_without_currency_source(self):
+        """Verify that the asynchronous endpoint cannot answer if the source currency is missing."""
+        response = await self.async_client.get(
+            self.url, {"to_currency": "CHF"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            "The currency code source must be specified !"
+            in response.content.decode()
+        )
+
+    async def test_async_conversion_from_database(self):
+        """Verify that the asynchronous endpoint reads the rates stored in the backend."""
+        response = await self.async_client.get(
+            self.url,
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+            },
+        )
+
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["provider"], "BDD")
+        self.assertEqual(result["rate_value"], "1.141472")
+
+    async def test_async_conversion_missing_rate_uses_the_provider(self):
+        """Verify that the asynchronous endpoint awaits the provider and stores its rate."""
+        response = await self.async_client.get(
+            self.url,
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-2",
+            },
+        )
+
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["provider"], "mock")
+        self.assertEqual(
+            await CurrencyExchangeRate.objects.filter(
+                valuation_date=arrow.Arrow(2025, 4, 2).date()
+            ).acount(),
+            1,
+            "The rate of the provider should be stored !",
+        )
+
+    async def test_async_conversion_of_unknown_currency(self):
+        """Verify that an unknown currency is answered ko without calling the provider."""
+        response = await self.async_client.get(
+            self.url,
+            {
+                "from_currency": "ZZZ",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-2",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["status"], "ko")
+        self.assertTrue("ZZZ" in result["message"])
+        self.assertEqual(await CurrencyExchangeRate.objects.acount(), 1)
+
+
+class CurrencyExchangeRateBatchTest(APITestCase):
+    """Declare the tests for the endpoint converting a batch of amounts."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        rate_cache.clear()
+        self.gbp = Currency.objects.create(
+            code="GBP", name="Pound Sterling", symbol="£"
+        )
+        self.chf = Currency.objects.create(
+            code="CHF", name="Swiss franc", symbol="Fr."
+        )
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.gbp,
+            exchanged_currency=self.chf,
+            valuation_date=arrow.Arrow(2025, 4, 1).date(),
+            rate_value="1.141472",
+        )
+        ExchangeRateProvider.objects.create(
+            provider_name="mock 1",
+            priority=10,
+            active_flag=True,
+            active_status=True,
+        )
+        self.url = reverse("currencyexchangerate-batch")
+
+    def test_batch_conversion_from_database(self):
+        """Verify that the rates stored in the backend are used for each conversion."""
+        payload = [
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+                "amount": 2,
+            },
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-04-01",
+            },
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = json.loads(response.content)
+        self.assertEqual(len(results), 2, "A result is expected per item !")
+        self.assertEqual(results[0]["provider"], "BDD")
+        self.assertEqual(results[0]["converted_amount"], "2.282944")
+        self.assertEqual(results[1]["converted_amount"], "1.141472")
+
+    def test_batch_conversion_missing_rates_use_the_provider(self):
+        """Verify that only the missing rates are requested to the provider and stored."""
+        payload = [
+            {
+                "from_currency": "CHF",
+                "to_currency": "GBP",
+                "valuation_date": "2025-4-2",
+            },
+            {
+                "from_currency": "CHF",
+                "to_currency": "GBP",
+                "valuation_date": "2025-4-2",
+                "amount": 10,
+            },
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        results = json.loads(response.content)
+        self.assertEqual(results[0]["provider"], "mock")
+        self.assertEqual(results[1]["provider"], "mock")
+        self.assertEqual(
+            CurrencyExchangeRate.objects.filter(
+                source_currency=self.chf, exchanged_currency=self.gbp
+            ).count(),
+            1,
+            "The same missing rate must be requested only once !",
+        )
+
+    def test_batch_conversion_derived_from_stored_rates(self):
+        """Verify that a missing rate is derived from the inverse stored rate."""
+        payload = [
+            {
+                "from_currency": "CHF",
+                "to_currency": "GBP",
+                "valuation_date": "2025-4-1",
+            },
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        results = json.loads(response.content)
+        self.assertEqual(results[0]["provider"], "BDD")
+        self.assertTrue(results[0]["derived"])
+        self.assertEqual(results[0]["derivation"]["method"], "inverse")
+        self.assertEqual(results[0]["rate_value"], "0.876062")
+        self.assertFalse(
+            CurrencyExchangeRate.objects.filter(
+                source_currency=self.chf, exchanged_currency=self.gbp
+            ).exists(),
+            "A derived rate must not be stored !",
+        )
+
+    def test_batch_conversion_reports_invalid_items(self):
+        """Verify that an invalid item does not prevent the others to be converted."""
+        payload = [
+            {"from_currency": "GBP", "valuation_date": "2025-4-1"},
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+                "amount": "abc",
+            },
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+            },
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        results = json.loads(response.content)
+        self.assertEqual(results[0]["status"], "ko")
+        self.assertEqual(results[1]["message"], "The amount is incorrect !")
+        self.assertEqual(results[2]["status"], "ok")
+
+    def test_batch_conversion_reports_unknown_currencies(self):
+        """Verify that a conversion of an unknown currency is answered ko without calling the provider."""
+        payload = [
+            {
+                "from_currency": "ZZZ",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+            },
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+            },
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = json.loads(response.content)
+        self.assertEqual(results[0]["status"], "ko")
+        self.assertTrue("ZZZ" in results[0]["message"])
+        self.assertEqual(results[1]["status"], "ok")
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 1)
+
+    def test_batch_conversion_rejects_non_finite_amounts(self):
+        """Verify that the amounts NaN and Infinity are reported as incorrect."""
+        payload = [
+            {
+                "from_currency": "GBP",
+                "to_currency": "CHF",
+                "valuation_date": "2025-4-1",
+                "amount": amount,
+            }
+            for amount in ["NaN", "Infinity"]
+        ]
+
+        response = self.client.post(self.url, payload, format="json")
+
+        for result in json.loads(response.content):
+            self.assertEqual(result["message"], "The amount is incorrect !")
+
+    def test_batch_conversion_not_possible_without_list(self):
+        """Verify that the batch endpoint expects a list of conversions."""
+        response = self.client.post(self.url, {}, format="json")
+
+        self.assertTrue(
+            "A list of conversions must be specified !"
+            in response.content.decode()
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class CurrencyExchangeRatePrefetchTest(APITestCase):
+    """Declare the tests for the prefetch of all the currencies on a provider miss."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        cache.clear()
+        rate_cache.clear()
+        currencies = {}
+        for code, name, symbol in [
+            ("EUR", "Euro", "€"),
+            ("USD", "US Dollar", "$"),
+            ("GBP", "Pound Sterling", "£"),
+            ("CHF", "Swiss franc", "Fr."),
+        ]:
+            currencies[code] = Currency.objects.create(
+                code=code, name=name, symbol=symbol
+            )
+        self.eur = currencies["EUR"]
+        self.valuation_date = arrow.Arrow(2025, 4, 2).date()
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.eur,
+            exchanged_currency=currencies["USD"],
+            valuation_date=self.valuation_date,
+            rate_value="1.080000",
+        )
+        ExchangeRateProvider.objects.create(
+            provider_name="mock 1",
+            priority=10,
+            active_flag=True,
+            active_status=True,
+        )
+        self.url = reverse("currencyexchangerate-list")
+
+    def test_provider_miss_stores_the_row_of_the_base_currency(self):
+        """Verify that a provider miss stores the missing rates of all the currencies for the date."""
+        response = self.client.get(
+            self.url,
+            {
+                "from_currency": "EUR",
+                "to_currency": "GBP",
+                "valuation_date": "2025-04-02",
+            },
+        )
+
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["provider"], "mock")
+        self.assertNotIn("rates", result)
+        stored_codes = sorted(
+            CurrencyExchangeRate.objects.filter(
+                source_currency=self.eur, valuation_date=self.valuation_date
+            ).values_list("exchanged_currency__code", flat=True)
+        )
+        self.assertEqual(
+            stored_codes,
+            ["CHF", "GBP", "USD"],
+            "Each missing rate must be stored once !",
+        )
+
+        response = self.client.get(
+            self.url,
+            {
+                "from_currency": "EUR",
+                "to_currency": "CHF",
+                "valuation_date": "2025-04-02",
+            },
+        )
+        self.assertEqual(json.loads(response.content)[0]["provider"], "BDD")
+
+    @override_settings(PROVIDER_PREFETCH_ALL_SYMBOLS=False)
+    def test_provider_miss_without_prefetch(self):
+        """Verify that only the requested rate is stored when the prefetch is disabled."""
+        self.client.get(
+            self.url,
+            {
+                "from_currency": "EUR",
+                "to_currency": "GBP",
+                "valuation_date": "2025-04-02",
+            },
+        )
+
+        self.assertEqual(
+            CurrencyExchangeRate.objects.filter(
+                source_currency=self.eur, valuation_date=self.valuation_date
+            ).count(),
+            2,
+        )
+
+
+class CurrencyExchangeRateTimeSeriesTest(APITestCase):
+    """Declare the tests for the endpoint giving the rates over an interval of dates."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        rate_cache.clear()
+        self.gbp = Currency.objects.create(
+            code="GBP", name="Pound Sterling", symbol="£"
+        )
+        self.chf = Currency.objects.create(
+            code="CHF", name="Swiss franc", symbol="Fr."
+        )
+        self.usd = Currency.objects.create(
+            code="USD", name="US Dollar", symbol="$"
+        )
+        for a_tuple in arrow.Arrow.span_range(
+            "day", arrow.Arrow(2025, 3, 1), arrow.Arrow(2025, 3, 10)
+        ):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.gbp,
+                exchanged_currency=self.chf,
+                valuation_date=a_tuple[0].date(),
+                rate_value="1.141472",
+            )
+        ExchangeRateProvider.objects.create(
+            provider_name="mock 1",
+            priority=10,
+            active_flag=True,
+            active_status=True,
+        )
+        self.url = reverse("currencyexchangerate-timeseries")
+
+    def test_time_series_from_database(self):
+        """Verify that a time series fully stored in the backend does not call the provider."""
+        response = self.client.get(
+            self.url,
+            data={
+                "from_currency": "GBP",
+                "to_currencies": "CHF",
+                "from_date": "2025-3-1",
+                "to_date": "2025-3-10",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["providers"], ["BDD"])
+        self.assertEqual(len(result["rates"]), 10)
+        self.assertEqual(result["rates"]["2025-03-01"]["CHF"], "1.141472")
+
+    def test_time_series_completed_by_the_provider(self):
+        """Verify that only the missing rates are requested to the provider and stored."""
+        response = self.client.get(
+            self.url,
+            data={
+                "from_currency": "GBP",
+                "to_currencies": "CHF,USD",
+                "from_date": "2025-3-6",
+                "to_date": "2025-3-15",
+            },
+        )
+
+        result = json.loads(response.content)[0]
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["providers"], ["BDD", "mock"])
+        self.assertEqual(len(result["rates"]), 10)
+        self.assertEqual(result["rates"]["2025-03-06"]["CHF"], "1.141472")
+        self.assertTrue("USD" in result["rates"]["2025-03-06"])
+        self.assertEqual(
+            CurrencyExchangeRate.objects.filter(
+                source_currency=self.gbp
+            ).count(),
+            25,
+            "Only the missing rates must be stored !",
+        )
+
+    def test_time_series_not_possible_with_reversed_dates(self):
+        """Verify that the start date must be before the end date."""
+        response = self.client.get(
+            self.url,
+            data={
+                "from_currency": "GBP",
+                "to_currencies": "CHF",
+                "from_date": "2025-3-10",
+                "to_date": "2025-3-1",
+            },
+        )
+
+        self.assertTrue(
+            "The start date can not be higher than the end date !"
+            in response.content.decode()
+        )
+
+
 class CurrencyTest(APITestCase):
     """Declare the tests for endpoints related to currency."""
 
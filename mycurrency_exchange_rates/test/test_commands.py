@@ -0,0 +1,464 @@
+"""Define the test suites for the management commands."""
+
+import collections
+import datetime
+import os
+import random
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+import aiohttp
+import arrow
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from mycurrency_exchange_rates.management.commands.benchmark_api import (
+    get_converter_urls,
+    get_pairs,
+    get_percentiles,
+    get_workload,
+    run_scenario,
+    seed_database,
+)
+from mycurrency_exchange_rates.management.commands.benchmark_managers import (
+    generate_exchange_rates,
+    get_benchmarks,
+    get_dataset_shape,
+    measure,
+)
+from mycurrency_exchange_rates.management.commands.bulk_import_exchange_rates_dataset import (
+    Command as BulkImportCommand,
+)
+from mycurrency_exchange_rates.management.commands.bulk_import_exchange_rates_dataset import (
+    get_api_calls,
+    get_date_windows,
+    import_bulk_data,
+    record_data,
+)
+from mycurrency_exchange_rates.management.commands.import_exchange_rates_files import (
+    import_files,
+)
+from mycurrency_exchange_rates.management.commands.sync_exchange_rates import (
+    Command as SyncCommand,
+)
+from mycurrency_exchange_rates.models import (
+    Currency,
+    CurrencyExchangeRate,
+    ImportCheckpoint,
+)
+
+
+class TestBulkImportCommand(TestCase):
+    """Declare the tests suite for the bulk import of historical rates."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        for code, name, symbol in [
+            ("EUR", "Euro", "€"),
+            ("USD", "US Dollar", "$"),
+            ("GBP", "Pound Sterling", "£"),
+        ]:
+            Currency.objects.create(code=code, name=name, symbol=symbol)
+
+    def test_blank_currencies_are_ignored(self):
+        """Verify that the blank codes of the option currencies are dropped and the others normalized."""
+        for command in [BulkImportCommand(), SyncCommand()]:
+            with self.subTest(command=command.__module__):
+                options = command.create_parser("manage.py", "").parse_args(
+                    ["--currencies", "eur, ,usd ,"]
+                )
+                self.assertEqual(options.currencies, ["EUR", "USD"])
+
+    def test_range_is_split_into_windows(self):
+        """Verify that a long range of dates is split into provider-sized windows."""
+        windows = get_date_windows(
+            arrow.Arrow(2024, 1, 1), arrow.Arrow(2024, 3, 5), 30
+        )
+
+        self.assertEqual(
+            [(start.date(), end.date()) for start, end in windows],
+            [
+                (
+                    arrow.Arrow(2024, 1, 1).date(),
+                    arrow.Arrow(2024, 1, 30).date(),
+                ),
+                (
+                    arrow.Arrow(2024, 1, 31).date(),
+                    arrow.Arrow(2024, 2, 29).date(),
+                ),
+                (
+                    arrow.Arrow(2024, 3, 1).date(),
+                    arrow.Arrow(2024, 3, 5).date(),
+                ),
+            ],
+        )
+
+    def test_one_api_call_per_currency_and_window(self):
+        """Verify that each currency is requested against the others for each window."""
+        api_calls = get_api_calls(
+            ["EUR", "USD", "GBP"],
+            arrow.Arrow(2015, 1, 1),
+            arrow.Arrow(2024, 12, 31),
+            366,
+        )
+
+        self.assertEqual(len(api_calls), 3 * 10)
+        self.assertEqual(api_calls[0][0], "EUR")
+        self.assertEqual(api_calls[0][1], ["USD", "GBP"])
+
+    def test_only_missing_api_calls(self):
+        """Verify that only the dates and currencies without stored rates are requested."""
+        record_data(
+            [
+                (
+                    "EUR",
+                    {
+                        "response": {
+                            "2024-03-01": {"USD": 1.08, "GBP": 0.85},
+                            "2024-03-02": {"USD": 1.09},
+                        }
+                    },
+                ),
+            ]
+        )
+
+        api_calls = get_api_calls(
+            ["EUR", "USD"],
+            arrow.Arrow(2024, 3, 1),
+            arrow.Arrow(2024, 3, 3),
+            30,
+            only_missing=True,
+        )
+
+        self.assertEqual(
+            [
+                (source, symbols, start.date(), end.date())
+                for source, symbols, start, end in api_calls
+            ],
+            [
+                (
+                    "EUR",
+                    ["USD"],
+                    arrow.Arrow(2024, 3, 3).date(),
+                    arrow.Arrow(2024, 3, 3).date(),
+                ),
+                (
+                    "USD",
+                    ["EUR"],
+                    arrow.Arrow(2024, 3, 1).date(),
+                    arrow.Arrow(2024, 3, 3).date(),
+                ),
+            ],
+        )
+
+    def test_record_data(self):
+        """Verify that the responses of the provider are stored, without duplicates."""
+        responses = [
+            (
+                "EUR",
+                {
+                    "response": {
+                        "2024-03-01": {"USD": 1.08, "GBP": 0.85},
+                        "2024-03-02": {"USD": 1.09, "GBP": 0.86},
+                    }
+                },
+            ),
+            ("USD", {"response": {"2024-03-01": {"EUR": 0.92}}}),
+        ]
+
+        self.assertEqual(record_data(responses, batch_size=2), 5)
+        self.assertEqual(record_data(responses), 5)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 5)
+
+
+class TestResumableBulkImport(TransactionTestCase):
+    """Declare the tests suite for the checkpoints of the bulk import.
+
+    The chunks are stored from the thread of sync_to_async, the data must be
+    committed to be shared with it.
+    """
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        for code, name, symbol in [
+            ("EUR", "Euro", "€"),
+            ("USD", "US Dollar", "$"),
+        ]:
+            Currency.objects.create(code=code, name=name, symbol=symbol)
+
+    def test_rerun_resumes_the_failed_chunks(self):
+        """Verify that the chunks stored before a failure are not requested again."""
+        provider_failures = [True]
+
+        async def fake_stream_time_series(
+            src_currency, symbols, from_date, to_date
+        ):
+            if src_currency == "USD" and provider_failures:
+                provider_failures.pop()
+                raise aiohttp.ClientError("The provider timed out.")
+            for day in arrow.Arrow.range("day", from_date, to_date):
+                yield day.format("YYYY-MM-DD"), {
+                    symbol: 1.1 for symbol in symbols
+                }
+
+        with mock.patch(
+            "mycurrency_exchange_rates.management.commands"
+            ".bulk_import_exchange_rates_dataset.stream_time_series",
+            side_effect=fake_stream_time_series,
+        ) as stream_time_series:
+            import_options = {
+                "source_currencies": ["EUR", "USD"],
+                "from_date": arrow.Arrow(2024, 3, 1),
+                "to_date": arrow.Arrow(2024, 3, 4),
+                "chunk_days": 2,
+                "retries": 1,
+            }
+            report = import_bulk_data(**import_options)
+
+            self.assertEqual(report["api_calls"], 4)
+            self.assertEqual(report["failed_api_calls"], 1)
+            self.assertEqual(report["stored_rates"], 6)
+            self.assertEqual(ImportCheckpoint.objects.count(), 3)
+
+            stream_time_series.reset_mock()
+            report = import_bulk_data(**import_options)
+
+        self.assertEqual(report["resumed_api_calls"], 3)
+        self.assertEqual(report["failed_api_calls"], 0)
+        self.assertEqual(stream_time_series.call_count, 1)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 8)
+        self.assertEqual(ImportCheckpoint.objects.count(), 0)
+
+    def test_rerun_with_other_windows_resumes_the_stored_dates(self):
+        """Verify that a rerun with other chunks only requests the dates of the interrupted calls."""
+        provider_failures = [True]
+
+        async def fake_stream_time_series(
+            src_currency, symbols, from_date, to_date
+        ):
+            for day in arrow.Arrow.range("day", from_date, to_date):
+                yield day.format("YYYY-MM-DD"), {
+                    symbol: 1.1 for symbol in symbols
+                }
+                if src_currency == "USD" and provider_failures:
+                    provider_failures.pop()
+                    raise aiohttp.ClientError("The provider timed out.")
+
+        with mock.patch(
+            "mycurrency_exchange_rates.management.commands"
+            ".bulk_import_exchange_rates_dataset.stream_time_series",
+            side_effect=fake_stream_time_series,
+        ) as stream_time_series:
+            import_options = {
+                "source_currencies": ["EUR", "USD"],
+                "from_date": arrow.Arrow(2024, 3, 1),
+                "to_date": arrow.Arrow(2024, 3, 4),
+                "batch_size": 1,
+                "retries": 1,
+            }
+            report = import_bulk_data(chunk_days=2, **import_options)
+
+            self.assertEqual(report["failed_api_calls"], 1)
+            # the first day of the interrupted call is stored, not its checkpoint
+            self.assertEqual(CurrencyExchangeRate.objects.count(), 7)
+            self.assertFalse(
+                ImportCheckpoint.objects.filter(
+                    source_currency_code="USD",
+                    from_date=datetime.date(2024, 3, 1),
+                ).exists()
+            )
+
+            stream_time_series.reset_mock()
+            report = import_bulk_data(chunk_days=4, **import_options)
+
+        self.assertEqual(report["resumed_api_calls"], 1)
+        self.assertEqual(report["failed_api_calls"], 0)
+        stream_time_series.assert_called_once_with(
+            "USD", ["EUR"], arrow.Arrow(2024, 3, 1), arrow.Arrow(2024, 3, 4)
+        )
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 8)
+        self.assertEqual(ImportCheckpoint.objects.count(), 0)
+
+
+class TestImportExchangeRatesFiles(TestCase):
+    """Declare the tests suite for the import of rates from local files."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        for code, name, symbol in [
+            ("EUR", "Euro", "€"),
+            ("USD", "US Dollar", "$"),
+            ("GBP", "Pound Sterling", "£"),
+        ]:
+            Currency.objects.create(code=code, name=name, symbol=symbol)
+
+    def write_file(self, suffix: str, content: str) -> str:
+        """Write a temporary file removed after the test."""
+        file_descriptor, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def get_rate(self, from_code: str, to_code: str, valuation_date: str):
+        """Give the stored rate of a pair of currencies at a date."""
+        return CurrencyExchangeRate.objects.get(
+            source_currency__code=from_code,
+            exchanged_currency__code=to_code,
+            valuation_date=valuation_date,
+        ).rate_value
+
+    def test_import_csv_file(self):
+        """Verify that the known currencies of a CSV file are stored, without the missing rates."""
+        path = self.write_file(
+            ".csv",
+            "Date,USD,JPY,GBP,\n"
+            "2024-03-04,1.0850,162.5,0.8550,\n"
+            "2024-03-01,1.0800,161.9,N/A,\n",
+        )
+
+        report = import_files([path], batch_size=2)
+
+        self.assertEqual(report["days"], 2)
+        self.assertEqual(report["stored_rates"], 3)
+        self.assertEqual(
+            self.get_rate("EUR", "GBP", "2024-03-04"), Decimal("0.855")
+        )
+
+    def test_import_ecb_file_with_cross_rates(self):
+        """Verify that the inverse and cross rates are derived from an ECB XML file."""
+        path = self.write_file(
+            ".xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01"'
+            ' xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">'
+            "<gesmes:subject>Reference rates</gesmes:subject>"
+            '<Cube><Cube time="2024-03-01">'
+            '<Cube currency="USD" rate="1.0800"/>'
+            '<Cube currency="JPY" rate="161.90"/>'
+            '<Cube currency="GBP" rate="0.8500"/>'
+            "</Cube></Cube></gesmes:Envelope>",
+        )
+
+        report = import_files([path], derive_cross=True)
+        import_files([path], derive_cross=True)
+
+        self.assertEqual(report["days"], 1)
+        self.assertEqual(report["stored_rates"], 6)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 6)
+        self.assertEqual(
+            self.get_rate("USD", "EUR", "2024-03-01"), Decimal("0.925926")
+        )
+        self.assertEqual(
+            self.get_rate("GBP", "USD", "2024-03-01"), Decimal("1.270588")
+        )
+
+
+@override_settings(MOCK_PROVIDER_DETERMINISTIC=True)
+class TestBenchmarkApi(TestCase):
+    """Declare the tests suite for the load test of the endpoints."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        yesterday = arrow.utcnow().shift(days=-1)
+        self.stored_dates = [
+            yesterday.shift(days=-day).date() for day in range(10)
+        ]
+        self.stored_rates = seed_database(self.stored_dates)
+
+    def test_workload_is_skewed_and_reproducible(self):
+        """Verify that the workload is seeded and that its hottest pair and date are requested the most."""
+        pairs = get_pairs(["EUR", "USD", "GBP", "CHF"])
+        workload = get_workload(
+            pairs, self.stored_dates, 2000, 1.1, random.Random(3)
+        )
+
+        self.assertEqual(self.stored_rates, 12 * 10)
+        self.assertEqual(len(pairs), 12)
+        self.assertEqual(
+            workload,
+            get_workload(
+                pairs, self.stored_dates, 2000, 1.1, random.Random(3)
+            ),
+        )
+        date_counts = collections.Counter(key[2] for key in workload)
+        self.assertEqual(
+            date_counts.most_common(1)[0][0], self.stored_dates[0]
+        )
+        pair_counts = collections.Counter(key[:2] for key in workload)
+        self.assertGreater(
+            pair_counts.most_common()[0][1],
+            4 * pair_counts.most_common()[-1][1],
+        )
+
+    def test_scenarios_are_measured_without_errors(self):
+        """Verify that the stored rates and the provider misses are served and measured."""
+        workload_urls = get_converter_urls(
+            get_workload(
+                get_pairs(["EUR", "USD", "GBP", "CHF"]),
+                self.stored_dates,
+                50,
+                1.1,
+                random.Random(0),
+            )
+        )
+        miss_date = arrow.Arrow(2020, 1, 2).date()
+        # the inverse rate is requested to the provider, not derived
+        miss_urls = get_converter_urls(
+            [("EUR", "USD", miss_date), ("USD", "EUR", miss_date)]
+        )
+
+        for scenario in ["warm-cache", "db-only", "provider-miss"]:
+            measures = run_scenario(
+                scenario, workload_urls, miss_urls, "locmem", 1
+            )
+            expected_requests = 2 if scenario == "provider-miss" else 50
+            self.assertEqual(measures["requests"], expected_requests)
+            self.assertEqual(measures["errors"], 0)
+            self.assertLessEqual(measures["p50_ms"], measures["p99_ms"])
+        self.assertEqual(measures["provider_calls"], 2)
+
+    def test_percentiles(self):
+        """Verify the percentiles of the latencies in milliseconds."""
+        percentiles = get_percentiles([index / 1000 for index in range(101)])
+
+        self.assertEqual(
+            percentiles, {"p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0}
+        )
+
+
+class TestBenchmarkManagers(TestCase):
+    """Declare the tests suite for the micro-benchmarks of the managers."""
+
+    def test_dataset_shape(self):
+        """Verify that enough currencies are added for the pairs to hold the largest dataset."""
+        self.assertEqual(get_dataset_shape(10_000, 3650), 4)
+        currencies = get_dataset_shape(10_000_000, 3650)
+        self.assertGreaterEqual(currencies * (currencies - 1) * 3650, 10**7)
+        self.assertLess((currencies - 1) * (currencies - 2) * 3650, 10**7)
+
+    def test_benchmarks_measure_the_queries(self):
+        """Verify that the benchmarks hit the most recent stored rates and count their queries."""
+        for code, name, symbol in [
+            ("EUR", "Euro", "€"),
+            ("USD", "US Dollar", "$"),
+            ("GBP", "Pound Sterling", "£"),
+        ]:
+            Currency.objects.create(code=code, name=name, symbol=symbol)
+        CurrencyExchangeRate.objects.bulk_create(
+            generate_exchange_rates(
+                dict(Currency.objects.values_list("code", "id")), 30
+            )
+        )
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 6 * 30)
+
+        benchmarks = get_benchmarks()
+        function, setup = benchmarks["get_conversion_from_database"]
+        self.assertEqual(function()["status"], "ok")
+        measures = measure(function, 3, setup)
+        self.assertEqual(measures["calls"], 3)
+        self.assertEqual(measures["queries"], 1)
+        self.assertLessEqual(measures["min_ms"], measures["median_ms"])
+
+        function, setup = benchmarks["validate_arrow_date"]
+        self.assertEqual(measure(function, 3, setup)["queries"], 0)
@@ -1,22 +1,57 @@
 """Define the test suites for the service managers (cache, db, circuit breaker...)."""
 
+import asyncio
+import threading
+import time
 from decimal import Decimal
+from unittest import mock
 
 import arrow
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
+from redis.exceptions import RedisError
 
 from mycurrency_exchange_rates.models import (
     Currency,
     CurrencyExchangeRate,
     ExchangeRateProvider,
 )
+from mycurrency_exchange_rates.services.cache_managers.managers import (
+    aget_cached_conversion,
+    aset_cached_conversion,
+    bump_cache_version,
+    get_cache_version,
+    get_cached_conversion,
+    set_cached_conversion,
+)
+from mycurrency_exchange_rates.services.cache_managers.single_flight import (
+    single_flight,
+)
+from mycurrency_exchange_rates.services.database_managers.coverage import (
+    get_missing_intervals,
+    get_missing_intervals_by_source,
+)
+from mycurrency_exchange_rates.services.database_managers.currency_registry import (
+    CURRENCY_REGISTRY_VERSION_NAME,
+    CurrencyRegistry,
+    currency_registry,
+)
 from mycurrency_exchange_rates.services.database_managers.managers import (
+    RATE_CACHE_VERSION_NAME,
+    RateCache,
+    bulk_store_exchange_rates,
     exists_currency_rates_during_interval_for_pair_of_currencies,
     get_conversion_from_database,
+    get_conversions_from_database,
+    get_missing_rates_intervals,
     get_number_of_consecutive_days,
     is_valid_currency,
+    rate_cache,
     set_next_provider_by_priority,
+    store_conversion_to_DB,
+    upsert_exchange_rates,
 )
 
 
@@ -25,6 +60,7 @@ class TestDbManagers(TestCase):
 
     def setUp(self):
         """Prepare the dataset before each test."""
+        rate_cache.clear()
         self.source_currency = Currency.objects.create(
             code="FRA", name="Franc", symbol="F"
         )
@@ -152,6 +188,351 @@ class TestDbManagers(TestCase):
             "The returned message is invalid !",
         )
 
+    def test_conversion_from_database_in_one_query(self):
+        """Verify that a stored rate is read with a single query and no join."""
+        currency_registry.get_ids()
+
+        with CaptureQueriesContext(connection) as queries:
+            result = get_conversion_from_database(
+                from_currency=self.source_currency.code,
+                to_currency=self.dest_currency.code,
+                valuation_date=self.valuation_date,
+            )
+
+        self.assertEqual(result["rate_value"], self.rate_value)
+        self.assertEqual(len(queries), 1, "A single query is expected !")
+        self.assertNotIn("JOIN", queries[0]["sql"].upper())
+
+        with self.assertNumQueries(0):
+            result = get_conversion_from_database(
+                from_currency="GBP",
+                to_currency=self.dest_currency.code,
+                valuation_date=self.valuation_date,
+            )
+        self.assertEqual(result["status"], "ko")
+
+    def test_conversions_from_database_in_one_query(self):
+        """Verify that a list of conversions is resolved with a constant number of queries.
+
+        1 query for the stored rates and 1 to derive the missing ones, the
+        currencies are checked in the loaded currency registry.
+        """
+        currency_registry.get_ids()
+        conversions = [
+            {
+                "from_currency": self.source_currency.code,
+                "to_currency": self.dest_currency.code,
+                "valuation_date": self.valuation_date,
+                "amount": 2,
+            },
+            {
+                "from_currency": self.source_currency.code,
+                "to_currency": self.dest_currency.code,
+                "valuation_date": arrow.utcnow().shift(days=-3).date(),
+            },
+            {
+                "from_currency": "GBP",
+                "to_currency": self.dest_currency.code,
+                "valuation_date": self.valuation_date,
+            },
+        ]
+
+        with self.assertNumQueries(2) as context:
+            results = get_conversions_from_database(conversions)
+
+        self.assertNotIn(
+            "JOIN",
+            context.captured_queries[0]["sql"],
+            "The stored rates must be filtered on the currency ids !",
+        )
+        self.assertEqual(
+            results[0]["converted_amount"],
+            str(Decimal(self.rate_value) * 2),
+            "The converted amount is incorrect !",
+        )
+        self.assertTrue(
+            "No rate available" in results[1]["message"],
+            "The returned message is invalid !",
+        )
+        self.assertEqual(
+            results[2]["status"], "ko", "The currency GBP does not exist !"
+        )
+
+    def test_conversion_from_database_derived_from_inverse_rate(self):
+        """Verify that a missing rate is derived from the inverse stored rate."""
+        result = get_conversion_from_database(
+            from_currency=self.dest_currency.code,
+            to_currency=self.source_currency.code,
+            valuation_date=self.valuation_date,
+            amount=2,
+        )
+
+        self.assertEqual(result["status"], "ok")
+        self.assertTrue(result["derived"], "The rate should be derived !")
+        self.assertEqual(result["derivation"]["method"], "inverse")
+        self.assertEqual(
+            result["rate_value"],
+            str((1 / Decimal(self.rate_value)).quantize(Decimal("0.000001"))),
+            "The inverse rate is incorrect !",
+        )
+
+    def test_conversion_from_database_derived_through_pivot_currency(self):
+        """Verify that a missing rate is derived from two stored rates through a pivot currency."""
+        pivot_currency = Currency.objects.create(
+            code="USD", name="US Dollar", symbol="$"
+        )
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.dest_currency,
+            exchanged_currency=pivot_currency,
+            rate_value="0.5",
+            valuation_date=self.valuation_date,
+        )
+
+        result = get_conversion_from_database(
+            from_currency=self.source_currency.code,
+            to_currency=pivot_currency.code,
+            valuation_date=self.valuation_date,
+        )
+
+        self.assertTrue(result["derived"], "The rate should be derived !")
+        self.assertEqual(result["derivation"]["method"], "pivot")
+        self.assertEqual(result["derivation"]["pivot_currency"], "CFA")
+        self.assertEqual(result["rate_value"], "50.150010")
+
+    def test_conversion_from_database_served_by_rate_cache(self):
+        """Verify that a rate read once is then answered without any query."""
+        get_conversion_from_database(
+            from_currency=self.source_currency.code,
+            to_currency=self.dest_currency.code,
+            valuation_date=self.valuation_date,
+        )
+
+        with self.assertNumQueries(0):
+            result = get_conversion_from_database(
+                from_currency=self.source_currency.code,
+                to_currency=self.dest_currency.code,
+                valuation_date=self.valuation_date,
+                amount=2,
+            )
+
+        self.assertEqual(
+            result["converted_amount"],
+            str(Decimal(self.rate_value) * 2),
+            "The converted amount is incorrect !",
+        )
+        self.assertEqual(rate_cache.stats()["hits"], 1)
+        self.assertEqual(rate_cache.stats()["misses"], 1)
+
+    def test_store_conversion_populates_rate_cache(self):
+        """Verify that a stored rate is answered by the cache."""
+        valuation_date = arrow.Arrow(2025, 1, 1).date()
+        store_conversion_to_DB(
+            from_currency_code=self.dest_currency.code,
+            to_currency_code=self.source_currency.code,
+            rate_value=0.0099700876,
+            valuated_date=valuation_date,
+        )
+
+        with self.assertNumQueries(0):
+            result = get_conversion_from_database(
+                from_currency=self.dest_currency.code,
+                to_currency=self.source_currency.code,
+                valuation_date=valuation_date,
+            )
+
+        self.assertEqual(result["rate_value"], "0.009970")
+
+    def test_store_conversion_updates_the_stored_rate(self):
+        """Verify that storing a rate already stored updates it instead of duplicating it."""
+        store_conversion_to_DB(
+            from_currency_code=self.source_currency.code,
+            to_currency_code=self.dest_currency.code,
+            rate_value="101.000001",
+            valuated_date=self.valuation_date,
+        )
+
+        exchange_rates = CurrencyExchangeRate.objects.filter(
+            source_currency=self.source_currency,
+            exchanged_currency=self.dest_currency,
+            valuation_date=self.valuation_date,
+        )
+        self.assertEqual(exchange_rates.count(), 1)
+        self.assertEqual(
+            exchange_rates.first().rate_value, Decimal("101.000001")
+        )
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            }
+        }
+    )
+    def test_upserted_rate_is_not_served_from_the_rate_cache(self):
+        """Verify that a rate of the past updated by an upsert is read again, and that the other workers are told."""
+        valuation_date = arrow.Arrow(2025, 1, 1).date()
+
+        def get_exchange_rate(rate_value):
+            return CurrencyExchangeRate(
+                source_currency=self.source_currency,
+                exchanged_currency=self.dest_currency,
+                valuation_date=valuation_date,
+                rate_value=rate_value,
+            )
+
+        upsert_exchange_rates([get_exchange_rate("1.100000")])
+        self.assertEqual(
+            get_conversion_from_database("FRA", "CFA", valuation_date)[
+                "rate_value"
+            ],
+            "1.100000",
+        )
+        version = get_cache_version(RATE_CACHE_VERSION_NAME)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_store_exchange_rates([get_exchange_rate("1.100000")])
+        self.assertEqual(get_cache_version(RATE_CACHE_VERSION_NAME), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_exchange_rates([get_exchange_rate("1.250000")])
+
+        self.assertEqual(
+            get_conversion_from_database("FRA", "CFA", valuation_date)[
+                "rate_value"
+            ],
+            "1.250000",
+        )
+        self.assertEqual(
+            get_cache_version(RATE_CACHE_VERSION_NAME), version + 1
+        )
+
+    def test_bulk_store_exchange_rates_by_batches(self):
+        """Verify that the rates are stored by batches, the stored ones being kept when conflicts are ignored."""
+        exchange_rates = (
+            CurrencyExchangeRate(
+                source_currency=self.source_currency,
+                exchanged_currency=self.dest_currency,
+                valuation_date=arrow.Arrow(2024, 1, day).date(),
+                rate_value="1.000000",
+            )
+            for day in range(1, 6)
+        )
+
+        stored_rates = bulk_store_exchange_rates(exchange_rates, batch_size=2)
+
+        self.assertEqual(stored_rates, 5)
+        self.assertEqual(
+            CurrencyExchangeRate.objects.filter(
+                valuation_date__year=2024
+            ).count(),
+            5,
+        )
+
+        bulk_store_exchange_rates(
+            [
+                CurrencyExchangeRate(
+                    source_currency=self.source_currency,
+                    exchanged_currency=self.dest_currency,
+                    valuation_date=self.valuation_date,
+                    rate_value="1.000000",
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        self.assertEqual(
+            CurrencyExchangeRate.objects.get(
+                source_currency=self.source_currency,
+                exchanged_currency=self.dest_currency,
+                valuation_date=self.valuation_date,
+            ).rate_value,
+            Decimal(self.rate_value),
+        )
+
+    def test_exchange_rate_is_unique_per_day(self):
+        """Verify that a pair of currencies can not have two rates for a same date."""
+        with self.assertRaises(IntegrityError):
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.source_currency,
+                exchanged_currency=self.dest_currency,
+                rate_value="99.000000",
+                valuation_date=self.valuation_date,
+            )
+
+    def test_rate_cache_evicts_least_recently_used_rates(self):
+        """Verify that the rate cache keeps a bounded number of rates."""
+        cache = RateCache(max_size=2, ttl=60, check_interval=60)
+        past_date = arrow.Arrow(2025, 1, 1).date()
+        cache.set(("A", "B", past_date), Decimal(1))
+        cache.set(("A", "C", past_date), Decimal(2))
+        cache.get(("A", "B", past_date))
+        cache.set(("A", "D", past_date), Decimal(3))
+
+        self.assertIsNotNone(cache.get(("A", "B", past_date)))
+        self.assertIsNone(cache.get(("A", "C", past_date)))
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_rate_cache_expires_rates_of_the_current_day(self):
+        """Verify that only the rates of the current day expire."""
+        cache = RateCache(max_size=10, ttl=0, check_interval=60)
+        past_date = arrow.Arrow(2025, 1, 1).date()
+        cache.set(("A", "B", past_date), Decimal(1))
+        cache.set(("A", "B", self.valuation_date), Decimal(1))
+        time.sleep(0.01)
+
+        self.assertIsNotNone(cache.get(("A", "B", past_date)))
+        self.assertIsNone(cache.get(("A", "B", self.valuation_date)))
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            }
+        }
+    )
+    def test_rate_cache_is_emptied_by_the_other_workers(self):
+        """Verify that the rates cached by a worker leave its cache once another worker invalidates its own."""
+        worker_cache = RateCache(max_size=10, ttl=60, check_interval=0)
+        other_worker_cache = RateCache(max_size=10, ttl=60, check_interval=0)
+        key = ("A", "B", arrow.Arrow(2025, 1, 1).date())
+        worker_cache.get(key)
+        worker_cache.set(key, Decimal(1))
+        self.assertIsNotNone(worker_cache.get(key))
+
+        other_worker_cache.invalidate()
+
+        self.assertIsNone(worker_cache.get(key))
+
+    def test_get_missing_rates_intervals(self):
+        """Verify that the incomplete days of a time series are grouped in intervals."""
+        stored_rates = {
+            arrow.Arrow(2025, 1, 1).date(): {"CHF": 1, "USD": 1},
+            arrow.Arrow(2025, 1, 2).date(): {"CHF": 1},
+            arrow.Arrow(2025, 1, 4).date(): {"CHF": 1, "USD": 1},
+        }
+
+        intervals = get_missing_rates_intervals(
+            stored_rates,
+            ["CHF", "USD"],
+            arrow.Arrow(2025, 1, 1).date(),
+            arrow.Arrow(2025, 1, 6).date(),
+        )
+
+        self.assertEqual(
+            intervals,
+            [
+                (
+                    arrow.Arrow(2025, 1, 2).date(),
+                    arrow.Arrow(2025, 1, 3).date(),
+                    ["CHF", "USD"],
+                ),
+                (
+                    arrow.Arrow(2025, 1, 5).date(),
+                    arrow.Arrow(2025, 1, 6).date(),
+                    ["CHF", "USD"],
+                ),
+            ],
+        )
+
     def test_get_number_of_consecutive_days_available_for_a_pair_of_currencies(
         self,
     ):
@@ -204,6 +585,78 @@ class TestDbManagers(TestCase):
             )
         )
 
+    def test_get_missing_intervals(self):
+        """Verify the exact missing intervals of pairs fully, partially and not covered."""
+        for day in [1, 2, 5, 6, 9]:
+            CurrencyExchangeRate.objects.create(
+                source_currency=self.dest_currency,
+                exchanged_currency=self.source_currency,
+                valuation_date=arrow.Arrow(2025, 2, day).date(),
+                rate_value="0.009970",
+            )
+        from_date = arrow.Arrow(2025, 2, 1).date()
+        to_date = arrow.Arrow(2025, 2, 10).date()
+        currency_registry.get_ids()
+
+        with self.assertNumQueries(2):
+            missing_intervals = get_missing_intervals(
+                [("CFA", "FRA"), ("FRA", "CFA")], from_date, to_date
+            )
+
+        self.assertEqual(
+            missing_intervals[("CFA", "FRA")],
+            [
+                (
+                    arrow.Arrow(2025, 2, 3).date(),
+                    arrow.Arrow(2025, 2, 4).date(),
+                ),
+                (
+                    arrow.Arrow(2025, 2, 7).date(),
+                    arrow.Arrow(2025, 2, 8).date(),
+                ),
+                (to_date, to_date),
+            ],
+        )
+        self.assertEqual(
+            missing_intervals[("FRA", "CFA")], [(from_date, to_date)]
+        )
+
+        # a fully covered pair is answered by the grouped query alone
+        with self.assertNumQueries(1):
+            missing_intervals = get_missing_intervals(
+                [("FRA", "CFA")], self.valuation_date, self.valuation_date
+            )
+        self.assertEqual(missing_intervals[("FRA", "CFA")], [])
+
+    def test_get_missing_intervals_by_source(self):
+        """Verify that the missing intervals of the targets of a base currency are merged."""
+        CurrencyExchangeRate.objects.create(
+            source_currency=self.source_currency,
+            exchanged_currency=self.dest_currency,
+            valuation_date=arrow.Arrow(2025, 2, 2).date(),
+            rate_value="100.300021",
+        )
+
+        intervals = get_missing_intervals_by_source(
+            ["FRA"],
+            ["FRA", "CFA", "GBP"],
+            arrow.Arrow(2025, 2, 1).date(),
+            arrow.Arrow(2025, 2, 3).date(),
+        )
+
+        self.assertEqual(
+            intervals,
+            {
+                "FRA": [
+                    (
+                        arrow.Arrow(2025, 2, 1).date(),
+                        arrow.Arrow(2025, 2, 3).date(),
+                        ["CFA", "GBP"],
+                    )
+                ]
+            },
+        )
+
     def __generate_bulk_currencies_in_DB(self) -> None:
         fake = Faker()
         fakes = []
@@ -271,3 +724,197 @@ class TestDbManagers(TestCase):
             response["provider-prioritized"] == "mock 1",
             "The priotized provider is unexpected !",
         )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class TestCurrencyRegistry(TestCase):
+    """Declare the tests suite for the in-process currency registry."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        self.currency = Currency.objects.create(
+            code="FRA", name="Franc", symbol="F"
+        )
+
+    def test_lookups_without_query(self):
+        """Verify that a loaded registry validates the currencies without any query."""
+        currency_registry.get_ids()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(is_valid_currency("FRA"), self.currency.id)
+            self.assertIsNone(is_valid_currency("GBP"))
+
+    def test_reloaded_when_a_currency_is_saved(self):
+        """Verify that the registry of the process is emptied by the signals of the currencies."""
+        self.assertIsNone(is_valid_currency("GBP"))
+
+        currency = Currency.objects.create(
+            code="GBP", name="Pound Sterling", symbol="£"
+        )
+
+        self.assertEqual(is_valid_currency("GBP"), currency.id)
+
+    def test_reloaded_when_the_shared_version_changes(self):
+        """Verify that the registry of another worker is reloaded when the shared version is bumped."""
+        registry = CurrencyRegistry(check_interval=0)
+        self.assertIsNone(registry.get_id("GBP"))
+
+        # bulk_create sends no signal, as a write from another worker
+        Currency.objects.bulk_create(
+            [Currency(code="GBP", name="Pound Sterling", symbol="£")]
+        )
+        self.assertIsNone(registry.get_id("GBP"))
+
+        bump_cache_version(CURRENCY_REGISTRY_VERSION_NAME)
+        self.assertIsNotNone(registry.get_id("GBP"))
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class TestSingleFlight(SimpleTestCase):
+    """Declare the tests suite for the coalescing of the concurrent fetches."""
+
+    def test_concurrent_fetches_are_coalesced(self):
+        """Verify that the concurrent callers of a same key share a single fetch."""
+        calls = []
+        results = []
+        started = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {"status": "ok", "rate_value": "1.1"}
+
+        def call():
+            results.append(single_flight("GBP-CHF-2025-04-01", fetch))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=call) for _ in range(5)]
+        for follower in followers:
+            follower.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1, "The fetch must run only once !")
+        self.assertEqual(len(results), 6)
+        self.assertTrue(
+            all(result["rate_value"] == "1.1" for result in results)
+        )
+
+    def test_error_of_the_fetch_is_shared(self):
+        """Verify that the callers waiting for a failed fetch get its error."""
+        started = threading.Event()
+        errors = []
+
+        def fetch():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError("provider down")
+
+        def call():
+            try:
+                single_flight("GBP-USD-2025-04-01", fetch)
+            except ValueError as error:
+                errors.append(error)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(errors), 2)
+
+    def test_successive_fetches_are_not_coalesced(self):
+        """Verify that a key is fetched again once the previous fetch is over."""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(single_flight("EUR-CHF-2025-04-01", fetch), 1)
+        self.assertEqual(single_flight("EUR-CHF-2025-04-01", fetch), 2)
+
+    def test_lookup_after_a_released_lock(self):
+        """Verify that a worker taking the lock just released by another one reads the stored data instead of fetching."""
+        stored = {}
+        lock = mock.Mock()
+        lock.acquire.return_value = True
+
+        def fetch():
+            stored["rate"] = {"status": "ok", "rate_value": "1.1"}
+            return stored["rate"]
+
+        fetch = mock.Mock(side_effect=fetch)
+        with mock.patch(
+            "mycurrency_exchange_rates.services.cache_managers.single_flight"
+            ".cache"
+        ) as shared_cache:
+            shared_cache.lock.return_value = lock
+            first_worker = single_flight(
+                "EUR-USD-2025-04-01", fetch, lookup=lambda: stored.get("rate")
+            )
+            second_worker = single_flight(
+                "EUR-USD-2025-04-01", fetch, lookup=lambda: stored.get("rate")
+            )
+
+        self.assertEqual(second_worker, first_worker)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(lock.release.call_count, 2)
+
+
+class TestConversionCache(SimpleTestCase):
+    """Declare the tests suite for the cache of the conversions."""
+
+    def test_unreachable_cache_is_a_miss(self):
+        """Verify that the conversions are computed again when the cache is not reachable."""
+        valuation_date = arrow.Arrow(2025, 4, 1).date()
+        result = {"status": "ok", "rate_value": "1.1"}
+        with mock.patch(
+            "mycurrency_exchange_rates.services.cache_managers.managers.cache"
+        ) as shared_cache, self.assertLogs(
+            "mycurrency_exchange_rates.services.cache_managers.managers",
+            level="WARNING",
+        ) as logs:
+            shared_cache.get.side_effect = RedisError("Connection refused")
+            shared_cache.set.side_effect = RedisError("Connection refused")
+            shared_cache.aget.side_effect = RedisError("Connection refused")
+            shared_cache.aset.side_effect = RedisError("Connection refused")
+
+            self.assertIsNone(
+                get_cached_conversion("EUR", "USD", valuation_date)
+            )
+            self.assertFalse(
+                set_cached_conversion("EUR", "USD", valuation_date, result)
+            )
+            self.assertIsNone(
+                asyncio.run(
+                    aget_cached_conversion("EUR", "USD", valuation_date)
+                )
+            )
+            self.assertFalse(
+                asyncio.run(
+                    aset_cached_conversion(
+                        "EUR", "USD", valuation_date, result
+                    )
+                )
+            )
+
+        self.assertEqual(len(logs.records), 4)
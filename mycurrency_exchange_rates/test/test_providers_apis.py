@@ -1,23 +1,72 @@
 """Define the tests suits for the raw APIs."""
 
 import asyncio
+import importlib
+import json
+import threading
+import time
 from decimal import Decimal
+from unittest import mock
 
 import arrow
 import vcr
-from django.test import TestCase
+from aiohttp.test_utils import TestClient, TestServer
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from pybreaker import (
+    STATE_CLOSED,
+    STATE_OPEN,
+    CircuitBreakerError,
+    CircuitMemoryStorage,
+    CircuitRedisStorage,
+)
+from redis.exceptions import RedisError
 
 from mycurrency_exchange_rates.models import ExchangeRateProvider
+from mycurrency_exchange_rates.services.database_managers.provider_registry import (
+    provider_registry,
+)
 from mycurrency_exchange_rates.services.exchange_rate_service import (
     get_current_provider_service,
     get_exchange_rate_data,
 )
 from mycurrency_exchange_rates.services.providers_service import (
+    amock_provider,
     currency_beacon_provider,
     mock_provider,
     request_time_series_currency_beacon_api,
     request_time_series_mock_api,
 )
+from mycurrency_exchange_rates.services.providers_service.circuit_breaker import (
+    get_circuit_breaker,
+)
+from mycurrency_exchange_rates.services.providers_service.currency_beacon_provider import (
+    circuit_breaker,
+)
+from mycurrency_exchange_rates.services.providers_service.hedging import (
+    LatencyWindow,
+    ahedged_call,
+    hedged_call,
+)
+from mycurrency_exchange_rates.services.providers_service.http_session import (
+    aclose_session,
+    get_session,
+    handle_lifespan,
+    run_in_provider_loop,
+)
+from mycurrency_exchange_rates.services.providers_service.json_stream import (
+    iter_json_object_items,
+)
+from mycurrency_exchange_rates.services.providers_service.mock_provider import (
+    MockProviderError,
+)
+from mycurrency_exchange_rates.services.providers_service.registry import (
+    get_provider_adapter,
+)
+from mycurrency_exchange_rates.tools.currency_beacon_stub import (
+    STATS_KEY,
+    create_stub_app,
+)
 
 
 class TestCurrencyBeaconProvider(TestCase):
@@ -85,6 +134,424 @@ class TestCurrencyBeaconProvider(TestCase):
         )
 
 
+@override_settings(MOCK_PROVIDER_SEED=3)
+class TestCurrencyBeaconStub(SimpleTestCase):
+    """Define the tests suite for the local stand-in server of currency beacon."""
+
+    beacon_module = importlib.import_module(
+        "mycurrency_exchange_rates.services.providers_service"
+        ".currency_beacon_provider"
+    )
+
+    def run_with_stub(self, coroutine_function, **stub_options):
+        """Run a coroutine function with a test client of a stub server."""
+
+        async def run():
+            async with TestClient(
+                TestServer(create_stub_app(**stub_options))
+            ) as client:
+                try:
+                    return await coroutine_function(client)
+                finally:
+                    await aclose_session()
+
+        return asyncio.run(run())
+
+    def test_provider_requests_the_stub(self):
+        """Verify that the currency beacon requests are answered by the stub."""
+
+        async def request_stub(client):
+            base_url = str(client.make_url("/v1"))
+            with mock.patch.multiple(
+                self.beacon_module,
+                CONVERSION_HISTORICAL_URL=base_url
+                + "/historical?api_key={}&base={}&date={}&symbols={}",
+                CURRENCY_RATES_URL=base_url
+                + "/timeseries?api_key={}&base={}&start_date={}&end_date={}"
+                "&symbols={}",
+            ):
+                history = await self.beacon_module.request_api_history(
+                    "CHF", "EUR", arrow.Arrow(2024, 3, 1).date(), ["USD"]
+                )
+                time_series = await self.beacon_module.request_time_series_api(
+                    "CHF",
+                    ["EUR", "USD"],
+                    arrow.Arrow(2024, 3, 1),
+                    arrow.Arrow(2024, 3, 3),
+                )
+            return history, time_series
+
+        history, time_series = self.run_with_stub(request_stub)
+
+        self.assertEqual(history["status"], "ok")
+        self.assertEqual(history["valuation_date"], "2024-03-01")
+        self.assertEqual(set(history["rates"]), {"EUR", "USD"})
+        self.assertEqual(
+            time_series["2024-03-01"],
+            {"EUR": history["rate_value"], "USD": history["rates"]["USD"]},
+        )
+        self.assertIn("2024-03-03", time_series)
+
+    def test_errors_and_rate_limit_are_injected(self):
+        """Verify that the stub answers with the configured errors and rate limit."""
+
+        async def request_stub(client):
+            statuses = []
+            for _ in range(2):
+                async with client.get(
+                    "/v1/convert?api_key=key&from=CHF&to=EUR&amount=1"
+                ) as response:
+                    statuses.append(response.status)
+            return statuses, client.server.app[STATS_KEY]
+
+        self.assertEqual(
+            self.run_with_stub(request_stub, error_rate=1)[0], [500, 500]
+        )
+        statuses, stats = self.run_with_stub(request_stub, rate_limit=1)
+        self.assertEqual(statuses, [200, 429])
+        self.assertEqual(stats["rate_limited"], 1)
+
+
+class TestProviderHttpSession(SimpleTestCase):
+    """Define the tests suite for the pooled HTTP session of the providers."""
+
+    def test_session_is_shared_by_the_sync_calls(self):
+        """Verify that the successive provider calls reuse the same pooled session."""
+
+        async def current_session():
+            return get_session()
+
+        first_session = run_in_provider_loop(current_session())
+        second_session = run_in_provider_loop(current_session())
+
+        self.assertIs(first_session, second_session)
+        self.assertFalse(first_session.closed)
+        self.assertEqual(
+            first_session.connector.limit, settings.PROVIDER_HTTP_POOL_LIMIT
+        )
+        self.assertEqual(
+            first_session.connector.limit_per_host,
+            settings.PROVIDER_HTTP_POOL_LIMIT_PER_HOST,
+        )
+
+    def test_session_is_closed_with_its_event_loop(self):
+        """Verify that the session of an event loop is closed on demand."""
+
+        async def open_and_close_session():
+            session = get_session()
+            self.assertIs(session, get_session())
+            await aclose_session()
+            return session
+
+        session = asyncio.run(open_and_close_session())
+
+        self.assertTrue(session.closed)
+
+    def test_stuck_call_is_cancelled(self):
+        """Verify that a synchronous caller stops waiting for a stuck provider call."""
+        cancelled = threading.Event()
+
+        async def stuck_call():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(TimeoutError):
+            run_in_provider_loop(stuck_call(), timeout=0.05)
+        self.assertTrue(cancelled.wait(1), "The call must be cancelled !")
+
+    def test_session_is_closed_at_the_server_shutdown(self):
+        """Verify that the lifespan shutdown closes the session of the server loop."""
+
+        async def serve_lifespan():
+            session = get_session()
+            events = asyncio.Queue()
+            for event in ["lifespan.startup", "lifespan.shutdown"]:
+                events.put_nowait({"type": event})
+            sent = []
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await handle_lifespan(events.get, send)
+            return session, sent
+
+        session, sent = asyncio.run(serve_lifespan())
+
+        self.assertTrue(session.closed)
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+
+
+class FakeRedis:
+    """Hold the keys of a Redis server in memory, for the commands used by the circuit breakers."""
+
+    def __init__(self):
+        """Init the keys."""
+        self.keys = {}
+
+    def get(self, key):
+        """Give the value of a key."""
+        return self.keys.get(key)
+
+    def set(self, key, value):
+        """Set the value of a key."""
+        self.keys[key] = str(value).encode()
+
+    def setnx(self, key, value):
+        """Set the value of a key if it does not exist."""
+        if key not in self.keys:
+            self.set(key, value)
+
+    def incr(self, key):
+        """Increment the value of a key."""
+        self.set(key, int(self.keys.get(key, 0)) + 1)
+
+    def multi(self):
+        """Start a transaction, the commands are run at once here."""
+
+    def transaction(self, function, *keys):
+        """Run a function in a transaction."""
+        function(self)
+
+
+class TestProviderCircuitBreaker(SimpleTestCase):
+    """Define the tests suite for the circuit breakers of the providers."""
+
+    def test_state_is_shared_through_redis(self):
+        """Verify that a circuit opened by a worker is open for the others."""
+        redis = FakeRedis()
+        with mock.patch(
+            "mycurrency_exchange_rates.services.providers_service"
+            ".circuit_breaker.get_redis_connection",
+            return_value=redis,
+        ) as get_redis_connection:
+            first_worker_breaker = get_circuit_breaker("provider")
+            second_worker_breaker = get_circuit_breaker("provider")
+            self.assertFalse(
+                get_redis_connection.called,
+                "Redis must not be reached before the first call !",
+            )
+
+            first_worker_breaker.open()
+
+            self.assertIsInstance(
+                first_worker_breaker._state_storage.storage,
+                CircuitRedisStorage,
+            )
+            self.assertEqual(second_worker_breaker.current_state, STATE_OPEN)
+            with self.assertRaises(CircuitBreakerError):
+                second_worker_breaker.call(lambda: None)
+
+    @override_settings(PROVIDER_CIRCUIT_BREAKER_RETRY_INTERVAL=0)
+    def test_state_is_shared_once_redis_is_back(self):
+        """Verify that the state is kept in memory while Redis is down, then shared when it is back."""
+        redis = FakeRedis()
+        with mock.patch(
+            "mycurrency_exchange_rates.services.providers_service"
+            ".circuit_breaker.get_redis_connection",
+            side_effect=[RedisError("Redis is down"), redis],
+        ):
+            circuit_breaker = get_circuit_breaker("provider")
+
+            self.assertEqual(circuit_breaker.current_state, STATE_CLOSED)
+            self.assertIsInstance(
+                circuit_breaker._state_storage.storage, CircuitRedisStorage
+            )
+            circuit_breaker.open()
+
+        self.assertEqual(
+            redis.get("circuit-breaker-provider:pybreaker:state"), b"open"
+        )
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_state_is_kept_in_memory_without_redis(self):
+        """Verify that the state falls back to the memory of the process without Redis."""
+        storage = get_circuit_breaker("provider")._state_storage
+
+        self.assertIsInstance(storage.storage, CircuitMemoryStorage)
+        self.assertEqual(storage.state, STATE_CLOSED)
+
+
+@override_settings(
+    PROVIDER_HEDGING_MIN_SAMPLES=20,
+    PROVIDER_HEDGING_MIN_DELAY=0.01,
+    PROVIDER_HEDGING_MAX_DELAY=0.05,
+)
+class TestHedgedProviderCalls(SimpleTestCase):
+    """Define the tests suite for the hedged calls of the providers."""
+
+    def test_latency_percentile(self):
+        """Verify the percentile of a window, unknown until it has enough latencies."""
+        latency_window = LatencyWindow(100)
+        for latency in range(1, 20):
+            latency_window.record(latency)
+        self.assertIsNone(latency_window.percentile(95))
+
+        for latency in range(20, 201):
+            latency_window.record(latency)
+        self.assertEqual(latency_window.percentile(95), 196)
+
+    def test_slow_provider_is_hedged(self):
+        """Verify that the answer of the hedge provider is kept when the provider is slow."""
+
+        async def slow_provider(source_currency):
+            await asyncio.sleep(0.5)
+            return {"status": "ok", "provider": "slow"}
+
+        async def fast_provider(source_currency):
+            return {"status": "ok", "provider": "fast"}
+
+        async def get_fast_provider():
+            return fast_provider
+
+        start_time = time.perf_counter()
+        response = asyncio.run(
+            ahedged_call(slow_provider, get_fast_provider, "EUR")
+        )
+
+        self.assertEqual(response["provider"], "fast")
+        self.assertLess(time.perf_counter() - start_time, 0.4)
+
+    def test_ko_answer_does_not_win(self):
+        """Verify that a ko answer of the provider gives way to a later ok answer of the hedge provider."""
+
+        async def ko_provider(source_currency):
+            await asyncio.sleep(0.1)
+            return {"status": "ko", "provider": "ko"}
+
+        async def slower_provider(source_currency):
+            await asyncio.sleep(0.1)
+            return {"status": "ok", "provider": "slower"}
+
+        async def get_slower_provider():
+            return slower_provider
+
+        response = asyncio.run(
+            ahedged_call(ko_provider, get_slower_provider, "EUR")
+        )
+
+        self.assertEqual(response["provider"], "slower")
+
+    def test_fast_hedge_beats_a_slow_ok_answer(self):
+        """Verify that the calling thread gets the ok answer of the hedge provider without waiting for the slow provider."""
+
+        def slow_provider(source_currency):
+            time.sleep(0.5)
+            return {"status": "ok", "provider": "slow"}
+
+        def fast_provider(source_currency):
+            return {"status": "ok", "provider": "fast"}
+
+        start_time = time.perf_counter()
+        response = hedged_call(slow_provider, lambda: fast_provider, "EUR")
+
+        self.assertEqual(response["provider"], "fast")
+        self.assertLess(time.perf_counter() - start_time, 0.4)
+
+    def test_slow_ko_answer_falls_back_to_the_hedge(self):
+        """Verify that a slow ko answer of the provider is replaced by the hedged one."""
+
+        def slow_ko_provider(source_currency):
+            time.sleep(0.2)
+            return {"status": "ko", "provider": "slow"}
+
+        def hedge_provider(source_currency):
+            return {"status": "ok", "provider": "hedge"}
+
+        response = hedged_call(slow_ko_provider, lambda: hedge_provider, "EUR")
+
+        self.assertEqual(response["provider"], "hedge")
+
+    def test_fast_provider_is_not_hedged(self):
+        """Verify that the hedge provider is not called when the provider answers in time."""
+        get_hedge_provider = mock.Mock()
+
+        def fast_provider(source_currency):
+            return {"status": "ok", "provider": "fast"}
+
+        response = hedged_call(fast_provider, get_hedge_provider, "EUR")
+
+        self.assertEqual(response["provider"], "fast")
+        get_hedge_provider.assert_not_called()
+
+    def test_failed_hedge_waits_for_the_provider(self):
+        """Verify that the slow answer is kept when the hedge provider fails."""
+
+        async def slow_provider(source_currency):
+            await asyncio.sleep(0.2)
+            return {"status": "ok", "provider": "slow"}
+
+        async def failing_provider(source_currency):
+            raise ConnectionError("The hedge provider is down.")
+
+        async def get_failing_provider():
+            return failing_provider
+
+        response = asyncio.run(
+            ahedged_call(slow_provider, get_failing_provider, "EUR")
+        )
+
+        self.assertEqual(response["provider"], "slow")
+
+
+class TestJsonStream(SimpleTestCase):
+    """Define the tests suite for the incremental parsing of the provider responses."""
+
+    document = json.dumps(
+        {
+            "meta": {"code": 200, "disclaimer": "Taux de référence"},
+            "response": {
+                "2024-03-01": {"USD": 1.0812345678, "GBP": 0.85},
+                "2024-03-02": {"USD": 1.09, "GBP": 0.86, "JPY": 162},
+            },
+            "rates": {"2024-03-01": {"USD": 1.08}},
+        },
+        ensure_ascii=False,
+    ).encode()
+
+    def read_items(self, document: bytes, chunk_size: int, key: str) -> list:
+        """Parse a document received by chunks of the given size."""
+
+        async def chunks():
+            for start in range(0, len(document), chunk_size):
+                yield document[start : start + chunk_size]
+
+        async def read():
+            return [
+                item async for item in iter_json_object_items(chunks(), key)
+            ]
+
+        return asyncio.run(read())
+
+    def test_items_are_parsed_across_chunks(self):
+        """Verify that the items are the same whatever the size of the chunks."""
+        expected_items = list(json.loads(self.document)["response"].items())
+
+        for chunk_size in [1, 3, 7, 64, len(self.document)]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(
+                    self.read_items(self.document, chunk_size, "response"),
+                    expected_items,
+                )
+
+    def test_invalid_documents_are_rejected(self):
+        """Verify that a missing key or a truncated document raises a ValueError."""
+        with self.assertRaises(ValueError):
+            self.read_items(self.document, 5, "timeseries")
+        with self.assertRaises(ValueError):
+            self.read_items(self.document[:-60], 5, "response")
+
+
 class TestMockProvider(TestCase):
     """Define the tests suite for the provider mock."""
 
@@ -141,6 +608,117 @@ class TestMockProvider(TestCase):
             "The rates time series is incorrect !",
         )
 
+    @override_settings(MOCK_PROVIDER_DETERMINISTIC=True, MOCK_PROVIDER_SEED=7)
+    def test_deterministic_rates(self):
+        """Verify that the deterministic rates are reproducible and consistent with the time series."""
+        valuation_date = arrow.Arrow(2025, 1, 2).date()
+        response = mock_provider(
+            source_currency="CHF",
+            exchanged_currency="EUR",
+            valuation_date=valuation_date,
+            prefetch_currencies=["USD"],
+        )
+        inverse_response = mock_provider(
+            source_currency="EUR",
+            exchanged_currency="CHF",
+            valuation_date=valuation_date,
+        )
+        time_series = request_time_series_mock_api(
+            from_currency="CHF",
+            to_currencies=["EUR", "USD"],
+            from_date=arrow.Arrow(2025, 1, 1),
+            to_date=arrow.Arrow(2025, 1, 3),
+        )
+
+        self.assertEqual(
+            mock_provider("CHF", "EUR", valuation_date)["rate_value"],
+            response["rate_value"],
+        )
+        self.assertAlmostEqual(
+            float(response["rate_value"])
+            * float(inverse_response["rate_value"]),
+            1,
+            places=4,
+        )
+        self.assertEqual(
+            [key for key in time_series if key.startswith("2025")],
+            ["2025-01-01", "2025-01-02", "2025-01-03"],
+        )
+        self.assertEqual(
+            time_series["2025-01-02"],
+            {"EUR": response["rate_value"], "USD": response["rates"]["USD"]},
+        )
+
+    @override_settings(
+        MOCK_PROVIDER_LATENCY=0.05, MOCK_PROVIDER_FAILURE_RATE=1
+    )
+    def test_injected_latency_and_failure(self):
+        """Verify that the mock provider waits and fails as configured."""
+        start_time = time.perf_counter()
+
+        with self.assertRaises(MockProviderError):
+            asyncio.run(
+                amock_provider(
+                    self.source_currency,
+                    self.destination_currency,
+                    self.valuation_date,
+                )
+            )
+        self.assertGreaterEqual(time.perf_counter() - start_time, 0.05)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class TestProviderRegistry(TestCase):
+    """Define the tests suite for the resolution of the active provider."""
+
+    def setUp(self):
+        """Prepare the dataset before each test."""
+        self.currency_beacon_provider = ExchangeRateProvider.objects.create(
+            provider_name="currencybeacon 1",
+            priority=1,
+            active_flag=True,
+            active_status=True,
+        )
+        ExchangeRateProvider.objects.create(
+            provider_name="mock 1",
+            priority=10,
+            active_flag=True,
+            active_status=False,
+        )
+
+    def test_adapters_are_registered(self):
+        """Verify that the stored providers are served by the adapter of their name."""
+        self.assertIs(
+            get_provider_adapter("currencybeacon 2")["provider"],
+            currency_beacon_provider,
+        )
+        self.assertIs(get_provider_adapter("mock")["provider"], mock_provider)
+        self.assertIsNone(get_provider_adapter("unknown provider"))
+
+    def test_active_provider_is_resolved_without_query(self):
+        """Verify that the active provider is read from the registry once loaded."""
+        self.assertIs(get_current_provider_service(), currency_beacon_provider)
+
+        with self.assertNumQueries(0):
+            self.assertIs(
+                get_current_provider_service(), currency_beacon_provider
+            )
+            self.assertEqual(provider_registry.get_next_name(), "mock 1")
+
+    def test_registry_is_invalidated_by_a_provider_change(self):
+        """Verify that a change of the active provider is seen at the next lookup."""
+        get_current_provider_service()
+
+        self.currency_beacon_provider.active_status = False
+        self.currency_beacon_provider.save()
+
+        self.assertIsNone(get_current_provider_service())
+        self.assertEqual(provider_registry.get_next_name(), "currencybeacon 1")
+
 
 class TestAdapterProvider(TestCase):
     """Define the tests suite for the adapter calls."""
@@ -220,6 +798,40 @@ class TestAdapterProvider(TestCase):
             response["rate_value"], 0, "The rate value is incorrect !"
         )
 
+    def test_open_circuit_sets_the_next_provider(self):
+        """Verify that an open circuit activates the provider of next priority."""
+        self.currency_beacon_provider.active_status = True
+        self.currency_beacon_provider.save()
+        circuit_breaker.open()
+        self.addCleanup(circuit_breaker.close)
+
+        response = get_exchange_rate_data(
+            source_currency=self.source_currency,
+            exchanged_currency=self.destination_currency,
+            valuation_date=self.valuation_date,
+            provider=get_current_provider_service(),
+        )
+
+        self.assertIsNone(response)
+        self.mock_provider.refresh_from_db()
+        self.assertTrue(self.mock_provider.active_status)
+
+    @override_settings(PROVIDER_HEDGING_ENABLED=True)
+    def test_exchange_rate_data_hedged_call(self):
+        """Verify the conversion of a currency with the hedged calls of the active provider."""
+        self.mock_provider.active_status = True
+        self.mock_provider.save()
+
+        response = get_exchange_rate_data(
+            source_currency=self.source_currency,
+            exchanged_currency=self.destination_currency,
+            valuation_date=self.valuation_date,
+            provider=get_current_provider_service(),
+        )
+
+        self.assertEqual(response["status"], "ok")
+        self.assertEqual(response["provider"], "mock")
+
     def test_exchange_rate_data_mock_provider_set(self):
         """Verify the endpoint for the conversion of a currency with mock as the active provider."""
         self.mock_provider.active_status = True
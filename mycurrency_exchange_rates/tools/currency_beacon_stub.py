@@ -0,0 +1,234 @@
+"""Define a local stand-in server of the currency beacon api, for the end-to-end benchmarks."""
+
+import asyncio
+import random
+import time
+
+import arrow
+from aiohttp import web
+
+from mycurrency_exchange_rates.services.providers_service.mock_provider import (
+    get_currency_value,
+)
+
+LATENCY_DISTRIBUTIONS = ["constant", "uniform", "exponential", "lognormal"]
+STATS_KEY = web.AppKey("stats", dict)
+
+
+def draw_latency(
+    generator: random.Random,
+    distribution: str,
+    latency: float,
+    sigma: float = 0.5,
+) -> float:
+    """Draw the latency of a response.
+
+    Args:
+        generator (random.Random): the random generator of the server.
+        distribution (str): constant, uniform (between 0 and twice the latency), exponential (of mean latency) or lognormal (of median latency).
+        latency (float): the typical latency in seconds.
+        sigma (float, optional): the shape of the lognormal distribution, the higher the longer its tail. Defaults to 0.5.
+
+    Returns:
+        float: the latency in seconds.
+    """
+    if latency <= 0:
+        return 0
+    if distribution == "uniform":
+        return generator.uniform(0, 2 * latency)
+    if distribution == "exponential":
+        return generator.expovariate(1 / latency)
+    if distribution == "lognormal":
+        return latency * generator.lognormvariate(0, sigma)
+    return latency
+
+
+class TokenBucket:
+    """Allow a number of requests per second, with bursts of the same size."""
+
+    def __init__(self, rate: float):
+        """Init a full bucket.
+
+        Args:
+            rate (float): the number of requests allowed per second.
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+
+    def consume(self) -> bool:
+        """Take a token for a request.
+
+        Returns:
+            bool: False if the request exceeds the rate limit.
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.rate, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def get_rates(base: str, symbols: list, valuation_date) -> dict:
+    """Give the rates of a base currency at a date, deterministic like the mock provider.
+
+    Args:
+        base (str): the code of the base currency.
+        symbols (list): the codes of the target currencies.
+        valuation_date (date): the date of the rates.
+
+    Returns:
+        dict: the rate values rounded to 6 decimals, indexed by target currency code.
+    """
+    base_value = get_currency_value(base, valuation_date)
+    return {
+        symbol: round(
+            get_currency_value(symbol, valuation_date) / base_value, 6
+        )
+        for symbol in symbols
+    }
+
+
+def error_response(code: int, error_type: str, error_detail: str):
+    """Give an error response shaped like the ones of the currency beacon api."""
+    return web.json_response(
+        {
+            "meta": {
+                "code": code,
+                "error_type": error_type,
+                "error_detail": error_detail,
+            },
+            "response": [],
+        },
+        status=code,
+    )
+
+
+def create_stub_app(
+    latency: float = 0,
+    latency_distribution: str = "constant",
+    latency_sigma: float = 0.5,
+    error_rate: float = 0,
+    rate_limit: float = 0,
+    seed: int = 0,
+) -> web.Application:
+    """Create the application serving the convert, historical and timeseries endpoints.
+
+    Args:
+        latency (float, optional): the typical latency of the responses in seconds. Defaults to 0.
+        latency_distribution (str, optional): one of LATENCY_DISTRIBUTIONS. Defaults to constant.
+        latency_sigma (float, optional): the shape of the lognormal distribution. Defaults to 0.5.
+        error_rate (float, optional): the probability of a response to be an error 500. Defaults to 0.
+        rate_limit (float, optional): the number of requests allowed per second, the others get an error 429. Defaults to 0, without limit.
+        seed (int, optional): the seed of the latencies and the errors. Defaults to 0.
+
+    Returns:
+        web.Application: the application, to run with web.run_app. Its counters of requests, errors and rate limited requests are under STATS_KEY.
+    """
+    generator = random.Random(seed)
+    bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    @web.middleware
+    async def inject_faults(request, handler):
+        stats["requests"] += 1
+        if bucket is not None and not bucket.consume():
+            stats["rate_limited"] += 1
+            return error_response(
+                429, "rate_limit_exceeded", "Too many requests."
+            )
+
+        await asyncio.sleep(
+            draw_latency(
+                generator, latency_distribution, latency, latency_sigma
+            )
+        )
+        if generator.random() < error_rate:
+            stats["errors"] += 1
+            return error_response(
+                500, "server_error", "The server failed on purpose."
+            )
+        try:
+            return await handler(request)
+        except (KeyError, ValueError, arrow.parser.ParserError):
+            return error_response(
+                422, "invalid_parameters", "A parameter is missing or invalid."
+            )
+
+    def get_symbols(request) -> list:
+        return [
+            symbol.strip().upper()
+            for symbol in request.query["symbols"].split(",")
+            if symbol.strip()
+        ]
+
+    def get_date(request, name: str):
+        return arrow.get(request.query[name], "YYYY-MM-DD").date()
+
+    async def convert(request):
+        base = request.query["from"].upper()
+        symbol = request.query["to"].upper()
+        amount = float(request.query.get("amount", 1))
+        valuation_date = arrow.utcnow().date()
+        rate_value = get_rates(base, [symbol], valuation_date)[symbol]
+        return web.json_response(
+            {
+                "meta": {"code": 200},
+                "response": {
+                    "timestamp": int(time.time()),
+                    "date": valuation_date.isoformat(),
+                    "from": base,
+                    "to": symbol,
+                    "amount": amount,
+                    "value": round(amount * rate_value, 6),
+                },
+            }
+        )
+
+    async def historical(request):
+        base = request.query["base"].upper()
+        valuation_date = get_date(request, "date")
+        return web.json_response(
+            {
+                "meta": {"code": 200},
+                "response": {
+                    "date": valuation_date.isoformat(),
+                    "base": base,
+                    "rates": get_rates(
+                        base, get_symbols(request), valuation_date
+                    ),
+                },
+            }
+        )
+
+    async def timeseries(request):
+        base = request.query["base"].upper()
+        symbols = get_symbols(request)
+        start_date = get_date(request, "start_date")
+        end_date = get_date(request, "end_date")
+        return web.json_response(
+            {
+                "meta": {"code": 200},
+                "response": {
+                    day.format("YYYY-MM-DD"): get_rates(
+                        base, symbols, day.date()
+                    )
+                    for day in arrow.Arrow.range(
+                        "day",
+                        arrow.Arrow.fromdate(start_date),
+                        arrow.Arrow.fromdate(end_date),
+                    )
+                },
+            }
+        )
+
+    app = web.Application(middlewares=[inject_faults])
+    app.router.add_get("/v1/convert", convert)
+    app.router.add_get("/v1/historical", historical)
+    app.router.add_get("/v1/timeseries", timeseries)
+    app[STATS_KEY] = stats
+    return app
@@ -3,7 +3,11 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import CurrencyExchangeRateViewSet, CurrencyViewSet
+from .views import (
+    AsyncCurrencyConverterView,
+    CurrencyExchangeRateViewSet,
+    CurrencyViewSet,
+)
 
 router = routers.DefaultRouter()
 router.register("currency", CurrencyViewSet)
@@ -11,4 +15,9 @@ router.register("currency-converter", CurrencyExchangeRateViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "async/currency-converter/",
+        AsyncCurrencyConverterView.as_view(),
+        name="async-currency-converter",
+    ),
 ]
@@ -1,18 +1,34 @@
 """Declare the views and endpoints."""
 
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from pybreaker import CircuitBreaker
+from decimal import Decimal, InvalidOperation
+
+import arrow
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from mycurrency_exchange_rates.services.cache_managers.managers import (
+    aget_cached_conversion,
+    aset_cached_conversion,
+    get_cached_conversion,
+    set_cached_conversion,
+)
 from mycurrency_exchange_rates.services.database_managers.managers import (
+    aget_conversion_from_database,
     get_conversion_from_database,
-    store_conversion_to_DB,
+    get_conversions_from_database,
+    get_currency_rates_from_database,
+    is_valid_currency,
 )
 from mycurrency_exchange_rates.services.exchange_rate_service import (
+    afetch_and_store_exchange_rate,
+    aget_current_provider_service,
+    complete_currency_rates_list,
+    fetch_and_store_exchange_rate_once,
     get_current_provider_service,
-    get_exchange_rate_data,
 )
 from mycurrency_exchange_rates.tools import validate_arrow_date
 
@@ -20,68 +36,85 @@ from .models import Currency, CurrencyExchangeRate
 from .serializers import CurrencyExchangeRateSerializer, CurrencySerializer
 
 
+def _is_valid_query(from_currency, to_currency, valuation_date) -> dict:
+    if not from_currency:
+        return {
+            "status": "ko",
+            "message": "The currency code source must be specified !",
+        }
+    if not to_currency:
+        return {
+            "status": "ko",
+            "mesage": "The currency code destination must be specified !",
+        }
+
+    if not valuation_date:
+        return {
+            "status": "ko",
+            "mesage": "The valuation date must be specified !",
+        }
+    try:
+        valuation_year = int(valuation_date.split("-")[0])
+    except:
+        return {
+            "status": "ko",
+            "mesage": "The valuation date is incorrect !",
+        }
+    try:
+        valuation_month = int(valuation_date.split("-")[1])
+    except:
+        return {
+            "status": "ko",
+            "mesage": "The valuation date is incorrect !",
+        }
+    try:
+        valuation_day = int(valuation_date.split("-")[2])
+    except:
+        return {
+            "status": "ko",
+            "mesage": "The valuation date is incorrect !",
+        }
+
+    return {
+        "status": "ok",
+        "valuation_year": valuation_year,
+        "valuation_month": valuation_month,
+        "valuation_day": valuation_day,
+    }
+
+
+def _is_missing_rate(result: dict) -> bool:
+    """Indicate if a lookup knows the currencies but has no rate, which is then requested to the provider.
+
+    The lookups answer "ko" for an unknown currency or a future date, these
+    results are returned as is, a provider cannot complete them.
+    """
+    return "ok" in result["status"] and "message" in result
+
+
+def _normalize_currency_code(currency_code):
+    if not isinstance(currency_code, str):
+        return currency_code
+    return currency_code.strip().upper()
+
+
 class CurrencyExchangeRateViewSet(viewsets.ModelViewSet):
     """Define API endpoint to get the value exchange for a currency."""
 
     queryset = CurrencyExchangeRate.objects.all()
     serializer_class = CurrencyExchangeRateSerializer
 
-    def __is_valid_query(
-        self, from_currency, to_currency, valuation_date
-    ) -> dict:
-        if not from_currency:
-            return {
-                "status": "ko",
-                "message": "The currency code source must be specified !",
-            }
-        if not to_currency:
-            return {
-                "status": "ko",
-                "mesage": "The currency code destination must be specified !",
-            }
-
-        if not valuation_date:
-            return {
-                "status": "ko",
-                "mesage": "The valuation date must be specified !",
-            }
-        try:
-            valuation_year = int(valuation_date.split("-")[0])
-        except:
-            return {
-                "status": "ko",
-                "mesage": "The valuation date is incorrect !",
-            }
-        try:
-            valuation_month = int(valuation_date.split("-")[1])
-        except:
-            return {
-                "status": "ko",
-                "mesage": "The valuation date is incorrect !",
-            }
-        try:
-            valuation_day = int(valuation_date.split("-")[2])
-        except:
-            return {
-                "status": "ko",
-                "mesage": "The valuation date is incorrect !",
-            }
-
-        return {
-            "status": "ok",
-            "valuation_year": valuation_year,
-            "valuation_month": valuation_month,
-            "valuation_day": valuation_day,
-        }
-
-    @method_decorator(cache_page(60 * 30, key_prefix="c-exchange_rates-"))
     def list(self, request, *args, **kwargs):
         """Get all the CurrencyExchangeRates."""
-        from_currency = request.query_params.get("from_currency", None)
-        to_currency = request.query_params.get("to_currency", None)
+        from_currency = _normalize_currency_code(
+            request.query_params.get("from_currency", None)
+        )
+        to_currency = _normalize_currency_code(
+            request.query_params.get("to_currency", None)
+        )
         valuation_date = request.query_params.get("valuation_date", None)
 
-        valid_params = self.__is_valid_query(
+        valid_params = _is_valid_query(
             from_currency, to_currency, valuation_date
         )
         if "ko" in valid_params["status"]:
@@ -96,31 +129,373 @@ class CurrencyExchangeRateViewSet(viewsets.ModelViewSet):
         if "ko" in arrow_date["status"]:
             return Response([arrow_date])
 
+        # data available in the cache ?
+        result = get_cached_conversion(
+            from_currency, to_currency, arrow_date["arrow_date"]
+        )
+        if result is not None:
+            return Response([result])
+
         # data available in the backend ?
         result = get_conversion_from_database(
             from_currency=from_currency,
             to_currency=to_currency,
             valuation_date=arrow_date["arrow_date"],
         )
-        if "message" in result.keys():
+        if _is_missing_rate(result):
             # go to search data in the active current provider
             provider = get_current_provider_service()
-            response = get_exchange_rate_data(
+            result = fetch_and_store_exchange_rate_once(
                 source_currency=from_currency,
                 exchanged_currency=to_currency,
                 valuation_date=arrow_date["arrow_date"],
                 provider=provider,
             )
+
+        set_cached_conversion(
+            from_currency, to_currency, arrow_date["arrow_date"], result
+        )
+        return Response([result])
+
+    def __parse_conversion_item(self, item) -> dict:
+        if not isinstance(item, dict):
+            return {
+                "status": "ko",
+                "message": "A conversion must be a JSON object !",
+            }
+
+        from_currency = _normalize_currency_code(
+            item.get("from_currency", None)
+        )
+        to_currency = _normalize_currency_code(item.get("to_currency", None))
+        valid_params = _is_valid_query(
+            from_currency, to_currency, item.get("valuation_date", None)
+        )
+        if "ko" in valid_params["status"]:
+            return valid_params
+
+        arrow_date = validate_arrow_date(
+            valid_params["valuation_year"],
+            valid_params["valuation_month"],
+            valid_params["valuation_day"],
+        )
+        if "ko" in arrow_date["status"]:
+            return arrow_date
+
+        try:
+            amount = Decimal(str(item.get("amount", 1)))
+        except InvalidOperation:
+            return {"status": "ko", "message": "The amount is incorrect !"}
+        if not amount.is_finite():
+            return {"status": "ko", "message": "The amount is incorrect !"}
+
+        return {
+            "status": "ok",
+            "from_currency": from_currency,
+            "to_currency": to_currency,
+            "valuation_date": arrow_date["arrow_date"],
+            "amount": amount,
+        }
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request, *args, **kwargs):
+        """Convert a list of amounts for many pairs of currencies and dates at once.
+
+        The body is a JSON list of objects with the keys from_currency,
+        to_currency, valuation_date and amount (optional, 1 by default).
+        The rates available in the backend are read at once, and only the
+        missing ones are requested to the active provider.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": "A list of conversions must be specified !",
+                    }
+                ]
+            )
+        if len(items) > settings.CONVERTER_BATCH_MAX_SIZE:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": (
+                            "A batch is limited to {} conversions !".format(
+                                settings.CONVERTER_BATCH_MAX_SIZE
+                            )
+                        ),
+                    }
+                ]
+            )
+
+        parsed_items = [self.__parse_conversion_item(item) for item in items]
+        valid_items = [
+            parsed_item
+            for parsed_item in parsed_items
+            if "ok" in parsed_item["status"]
+        ]
+
+        # data available in the backend ?
+        database_results = iter(get_conversions_from_database(valid_items))
+
+        provider = None
+        provider_responses = {}
+        results = []
+        for parsed_item in parsed_items:
+            if "ko" in parsed_item["status"]:
+                results.append(parsed_item)
+                continue
+
+            result = next(database_results)
+            if "ko" in result["status"]:
+                results.append(result)
+                continue
+            if not _is_missing_rate(result):
+                result["amount"] = str(parsed_item["amount"])
+                results.append(result)
+                continue
+
+            # go to search data in the active current provider, once per key
+            key = (
+                parsed_item["from_currency"],
+                parsed_item["to_currency"],
+                parsed_item["valuation_date"],
+            )
+            if key not in provider_responses:
+                if provider is None:
+                    provider = get_current_provider_service()
+                provider_responses[key] = fetch_and_store_exchange_rate_once(
+                    source_currency=key[0],
+                    exchanged_currency=key[1],
+                    valuation_date=key[2],
+                    provider=provider,
+                )
+
+            response = dict(provider_responses[key])
             if "ok" in response["status"]:
-                store_conversion_to_DB(
-                    from_currency_code=from_currency,
-                    to_currency_code=to_currency,
-                    rate_value=response["rate_value"],
-                    valuated_date=arrow_date["arrow_date"],
+                response["amount"] = str(parsed_item["amount"])
+                response["converted_amount"] = str(
+                    Decimal(str(response["rate_value"]))
+                    * parsed_item["amount"]
                 )
+            results.append(response)
+
+        return Response(results)
+
+    def __parse_date(self, date_param) -> dict:
+        try:
+            year, month, day = [int(value) for value in date_param.split("-")]
+        except (AttributeError, ValueError):
+            return {
+                "status": "ko",
+                "message": "The date {} is incorrect !".format(date_param),
+            }
+
+        return validate_arrow_date(year, month, day)
+
+    @action(detail=False, methods=["get"], url_path="timeseries")
+    def timeseries(self, request, *args, **kwargs):
+        """Get the rates of a base currency for many target currencies over an interval of dates.
+
+        The query parameters are from_currency, to_currencies (codes
+        separated by commas), from_date and to_date. The rates stored in the
+        backend are read at once, and only the missing sub-intervals are
+        requested to the active provider.
+        """
+        from_currency = _normalize_currency_code(
+            request.query_params.get("from_currency", None)
+        )
+        to_currencies = _normalize_currency_code(
+            request.query_params.get("to_currencies", None)
+        )
+        if not from_currency:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": (
+                            "The currency code source must be specified !"
+                        ),
+                    }
+                ]
+            )
+        if not to_currencies:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": (
+                            "The currency codes destination must be specified"
+                            " !"
+                        ),
+                    }
+                ]
+            )
+
+        from_date = self.__parse_date(
+            request.query_params.get("from_date", None)
+        )
+        if "ko" in from_date["status"]:
+            return Response([from_date])
+        to_date = self.__parse_date(request.query_params.get("to_date", None))
+        if "ko" in to_date["status"]:
+            return Response([to_date])
+        from_date = from_date["arrow_date"]
+        to_date = to_date["arrow_date"]
+
+        if from_date > to_date:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": (
+                            "The start date can not be higher than the end"
+                            " date !"
+                        ),
+                    }
+                ]
+            )
+        if to_date >= arrow.utcnow().shift(days=1).date():
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": "A rate value cannot be read in the future",
+                    }
+                ]
+            )
+        if (
+            to_date - from_date
+        ).days >= settings.CONVERTER_TIME_SERIES_MAX_DAYS:
+            return Response(
+                [
+                    {
+                        "status": "ko",
+                        "message": (
+                            "A time series is limited to {} days !".format(
+                                settings.CONVERTER_TIME_SERIES_MAX_DAYS
+                            )
+                        ),
+                    }
+                ]
+            )
+
+        to_currencies = sorted(
+            {code.strip() for code in to_currencies.split(",") if code.strip()}
+        )
+        for currency_code in [from_currency] + to_currencies:
+            if not is_valid_currency(currency_code):
+                return Response(
+                    [
+                        {
+                            "status": "ko",
+                            "message": (
+                                "The specified currency code {} is not"
+                                " available at the moment.".format(
+                                    currency_code
+                                )
+                            ),
+                        }
+                    ]
+                )
+
+        # data available in the backend ?
+        rates = get_currency_rates_from_database(
+            from_currency, to_currencies, from_date, to_date
+        )
+        providers = ["BDD"] if rates else []
+
+        # go to search the missing data in the active current provider
+        response = complete_currency_rates_list(
+            from_currency, to_currencies, from_date, to_date, rates
+        )
+        if "ko" in response["status"]:
             return Response([response])
-        else:
-            return Response([result])
+
+        return Response(
+            [
+                {
+                    "status": "ok",
+                    "providers": providers + response["providers"],
+                    "from_currency": from_currency,
+                    "to_currencies": to_currencies,
+                    "from_date": str(from_date),
+                    "to_date": str(to_date),
+                    "rates": {
+                        str(valuation_date): {
+                            exchanged_code: str(rate_value)
+                            for exchanged_code, rate_value in sorted(
+                                rates[valuation_date].items()
+                            )
+                        }
+                        for valuation_date in sorted(rates)
+                    },
+                }
+            ]
+        )
+
+
+class AsyncCurrencyConverterView(View):
+    """Define the asynchronous API endpoint to get the value exchange for a currency.
+
+    It answers like the currency-converter endpoint, but awaits the cache,
+    the database and the provider calls: served by an ASGI worker, the
+    requests waiting for a slow provider do not hold a thread each.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """Get the CurrencyExchangeRate of a couple of currencies at a date."""
+        from_currency = _normalize_currency_code(
+            request.GET.get("from_currency", None)
+        )
+        to_currency = _normalize_currency_code(
+            request.GET.get("to_currency", None)
+        )
+        valuation_date = request.GET.get("valuation_date", None)
+
+        valid_params = _is_valid_query(
+            from_currency, to_currency, valuation_date
+        )
+        if "ko" in valid_params["status"]:
+            return JsonResponse([valid_params], safe=False)
+
+        arrow_date = validate_arrow_date(
+            valid_params["valuation_year"],
+            valid_params["valuation_month"],
+            valid_params["valuation_day"],
+        )
+        if "ko" in arrow_date["status"]:
+            return JsonResponse([arrow_date], safe=False)
+
+        # data available in the cache ?
+        result = await aget_cached_conversion(
+            from_currency, to_currency, arrow_date["arrow_date"]
+        )
+        if result is not None:
+            return JsonResponse([result], safe=False)
+
+        # data available in the backend ?
+        result = await aget_conversion_from_database(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            valuation_date=arrow_date["arrow_date"],
+        )
+        if _is_missing_rate(result):
+            # go to search data in the active current provider
+            provider = await aget_current_provider_service()
+            result = await afetch_and_store_exchange_rate(
+                source_currency=from_currency,
+                exchanged_currency=to_currency,
+                valuation_date=arrow_date["arrow_date"],
+                provider=provider,
+            )
+
+        await aset_cached_conversion(
+            from_currency, to_currency, arrow_date["arrow_date"], result
+        )
+        return JsonResponse([result], safe=False)
 
 
 class CurrencyViewSet(viewsets.ModelViewSet):